@@ -7,11 +7,16 @@ Returns: HTTP response dict с данными заявок
 
 import json
 import os
+import re
 import psycopg2
 from psycopg2.extras import RealDictCursor
-from datetime import datetime
+from datetime import datetime, timedelta
+from decimal import Decimal, InvalidOperation
 from typing import Dict, Any, List, Optional
 
+from encoding import dumps_text
+from compression import with_compression
+
 def get_db_connection():
     dsn = os.environ.get('DATABASE_URL')
     return psycopg2.connect(dsn, cursor_factory=RealDictCursor)
@@ -20,6 +25,307 @@ def generate_application_number() -> str:
     now = datetime.now()
     return f"APP-{now.strftime('%Y%m%d-%H%M%S')}"
 
+# customer_phone_normalized VARCHAR(20)
+PHONE_MAX_DIGITS = 20
+NON_DIGITS = re.compile(r'[^0-9]')
+
+class InvalidPhone(ValueError):
+    pass
+
+def normalize_phone(phone: Any) -> Optional[str]:
+    '''
+    Только цифры 0-9, 8XXXXXXXXXX и XXXXXXXXXX приводятся к 7XXXXXXXXXX (как normalize_phone в БД).
+    Номер длиннее колонки - InvalidPhone, handler отвечает 400.
+    '''
+    digits = NON_DIGITS.sub('', str(phone or ''))
+    if len(digits) == 11 and digits.startswith('8'):
+        return '7' + digits[1:]
+    if len(digits) == 10:
+        return '7' + digits
+    if len(digits) > PHONE_MAX_DIGITS:
+        raise InvalidPhone(f'phone must contain at most {PHONE_MAX_DIGITS} digits')
+    return digits or None
+
+# Раскладывает items заявок из источника `a` в application_items одним INSERT
+APPLICATION_ITEMS_INSERT = """
+    INSERT INTO application_items (application_id, service_id, title, qty, price, total, created_at)
+    SELECT
+        a.id,
+        NULLIF(NULLIF(item->>'service_id', ''), '0')::integer,
+        LEFT(COALESCE(item->>'title', ''), 255),
+        COALESCE(NULLIF(item->>'qty', '')::numeric, 1),
+        COALESCE(NULLIF(item->>'price', '')::numeric, 0),
+        COALESCE(NULLIF(item->>'total', '')::numeric, 0),
+        COALESCE(a.created_at, CURRENT_TIMESTAMP)
+    FROM {source} a
+    CROSS JOIN LATERAL jsonb_array_elements(
+        CASE WHEN jsonb_typeof(a.items::jsonb) = 'array' THEN a.items::jsonb ELSE '[]'::jsonb END
+    ) AS item
+"""
+
+# Индекс цен видимых услуг, живёт между вызовами тёплого инстанса.
+# Перечитывается, когда меняется content_versions['services'] (триггер на services).
+PRICE_INDEX: Dict[str, Any] = {'version': None, 'by_id': {}, 'by_title': {}}
+
+def normalize_title(title: str) -> str:
+    return ' '.join(str(title).lower().split())
+
+def get_price_index(cur) -> Dict[str, Any]:
+    cur.execute("SELECT version FROM content_versions WHERE name = 'services'")
+    row = cur.fetchone()
+    version = row['version'] if row else 0
+
+    if PRICE_INDEX['version'] != version:
+        cur.execute(
+            "SELECT id, title, price FROM services "
+            "WHERE removed_at IS NULL AND COALESCE(visible, TRUE) AND price IS NOT NULL"
+        )
+        by_id = {}
+        by_title = {}
+        for service in cur.fetchall():
+            by_id[service['id']] = service
+            by_title[normalize_title(service['title'])] = service
+        PRICE_INDEX.update({'version': version, 'by_id': by_id, 'by_title': by_title})
+
+    return PRICE_INDEX
+
+def to_decimal(value: Any, default: str = '0') -> Decimal:
+    try:
+        return Decimal(str(value)) if value not in (None, '') else Decimal(default)
+    except InvalidOperation:
+        return Decimal(default)
+
+def to_number(value: Decimal) -> Any:
+    return int(value) if value == value.to_integral_value() else float(value)
+
+def find_service(price_index: Dict[str, Any], item: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    try:
+        service_id = int(item.get('service_id') or 0)
+    except (TypeError, ValueError):
+        service_id = 0
+
+    if service_id and service_id in price_index['by_id']:
+        return price_index['by_id'][service_id]
+
+    # С сайта приходит "Название (Категория)" и service_id = 0
+    title = normalize_title(item.get('title', ''))
+    return price_index['by_title'].get(title) or price_index['by_title'].get(title.split(' (')[0])
+
+class InvalidItems(ValueError):
+    pass
+
+def price_items(items: List[Dict[str, Any]], client_total: Any, price_index: Dict[str, Any]) -> tuple:
+    '''
+    Пересчитывает строки и итог заявки по индексу цен, возвращает (items, total, mismatches).
+    client_total = None - клиент итог не присылал, сверять не с чем.
+    '''
+    if not isinstance(items, list) or not all(isinstance(item, dict) for item in items):
+        raise InvalidItems('items must be a list of objects')
+
+    priced_items = []
+    mismatches = []
+    grand_total = Decimal('0')
+
+    for position, item in enumerate(items):
+        qty = to_decimal(item.get('qty'), '1')
+        client_price = to_decimal(item.get('price'))
+        service = find_service(price_index, item)
+
+        if service:
+            price = Decimal(service['price'])
+        else:
+            price = client_price
+            mismatches.append({'position': position, 'title': item.get('title'), 'reason': 'unknown_service'})
+
+        line_total = (price * qty).quantize(Decimal('0.01'))
+        grand_total += line_total
+
+        if service and client_price != price:
+            mismatches.append({
+                'position': position, 'title': item.get('title'), 'reason': 'price',
+                'client': to_number(client_price), 'expected': to_number(price)
+            })
+        if 'total' in item and to_decimal(item.get('total')) != line_total:
+            mismatches.append({
+                'position': position, 'title': item.get('title'), 'reason': 'line_total',
+                'client': to_number(to_decimal(item.get('total'))), 'expected': to_number(line_total)
+            })
+
+        priced_items.append({
+            **item,
+            'service_id': service['id'] if service else item.get('service_id'),
+            'qty': to_number(qty),
+            'price': to_number(price),
+            'total': to_number(line_total)
+        })
+
+    if client_total is not None and to_decimal(client_total) != grand_total:
+        mismatches.append({
+            'reason': 'total_amount',
+            'client': to_number(to_decimal(client_total)), 'expected': to_number(grand_total)
+        })
+
+    return priced_items, grand_total, mismatches
+
+def parse_datetime(query_params: Dict[str, Any], name: str) -> Optional[datetime]:
+    value = query_params.get(name)
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f'{name} must be an ISO 8601 date')
+
+def parse_limit(query_params: Dict[str, Any], default: int, maximum: int) -> int:
+    try:
+        limit = int(query_params.get('limit', default))
+    except (TypeError, ValueError):
+        raise ValueError('limit must be an integer')
+    if limit < 1:
+        raise ValueError('limit must be positive')
+    return min(limit, maximum)
+
+def parse_period(query_params: Dict[str, Any]) -> tuple:
+    '''Период from/to (по умолчанию с начала месяца до сейчас); ValueError при неверных датах'''
+    now = datetime.now()
+    start = parse_datetime(query_params, 'from') or now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    end = parse_datetime(query_params, 'to') or now
+    return start, end
+
+# Запросы, общие для index и index_async (плейсхолдеры psycopg2, aiodb переводит их в $n)
+CUSTOMER_PROFILE_QUERY = """
+    WITH customer_applications AS (
+        SELECT id, number, customer_name, customer_phone, customer_address,
+               status, total_amount, created_at
+        FROM applications
+        WHERE customer_phone_normalized = %s
+    ), customer_orders AS (
+        SELECT id, number, from_application_id, customer_name, customer_address,
+               status, total_amount, created_at
+        FROM orders
+        WHERE customer_phone_normalized = %s
+    )
+    SELECT
+        (SELECT COUNT(*) FROM customer_applications) AS applications_count,
+        (SELECT COUNT(*) FROM customer_orders) AS orders_count,
+        (SELECT COALESCE(SUM(total_amount), 0) FROM customer_orders) AS orders_total,
+        (SELECT MIN(created_at) FROM customer_applications) AS first_seen,
+        (SELECT MAX(created_at) FROM customer_applications) AS last_seen,
+        (SELECT COALESCE(json_agg(DISTINCT customer_name), '[]'::json) FROM customer_applications) AS names,
+        (SELECT COALESCE(json_agg(a ORDER BY a.created_at DESC), '[]'::json) FROM customer_applications a) AS applications,
+        (SELECT COALESCE(json_agg(o ORDER BY o.created_at DESC), '[]'::json) FROM customer_orders o) AS orders
+"""
+
+# Топ услуг за период: (start, end, limit)
+SERVICE_ANALYTICS_TOP_QUERY = """
+    SELECT
+        MIN(service_id) AS service_id,
+        MIN(title) AS title,
+        COUNT(DISTINCT application_id) AS applications,
+        SUM(qty) AS qty,
+        SUM(total) AS revenue
+    FROM application_items
+    WHERE created_at >= %s AND created_at < %s
+    GROUP BY COALESCE(service_id::text, title)
+    ORDER BY applications DESC, revenue DESC
+    LIMIT %s
+"""
+
+# Заявки, конверсия в заказ и средний чек за период: (start, end)
+SERVICE_ANALYTICS_TOTALS_QUERY = """
+    SELECT
+        COUNT(*) AS applications,
+        COUNT(*) FILTER (WHERE EXISTS (
+            SELECT 1 FROM orders o WHERE o.from_application_id = a.id
+        )) AS converted,
+        AVG(a.total_amount) AS average_basket
+    FROM applications a
+    WHERE a.created_at >= %s AND a.created_at < %s
+"""
+
+# Подзапрос query целиком превращается в JSON-массив на стороне Postgres
+JSON_LIST_QUERY = "SELECT COALESCE(json_agg(t ORDER BY {order_by}), '[]'::json)::text AS body FROM ({query}) t"
+
+def get_customer_profile(cur, phone: str) -> Dict[str, Any]:
+    '''Все заявки и заказы клиента по нормализованному телефону - один запрос по индексу'''
+    cur.execute(CUSTOMER_PROFILE_QUERY, (phone, phone))
+    profile = dict(cur.fetchone())
+    profile['phone'] = phone
+    profile['orders_total'] = float(profile['orders_total'])
+    return profile
+
+def parse_analytics_params(query_params: Dict[str, Any]) -> tuple:
+    '''(start, end, limit) для view=analytics; ValueError - ответ 400'''
+    start, end = parse_period(query_params)
+    return start, end, parse_limit(query_params, 10, 100)
+
+def get_service_analytics(cur, start: datetime, end: datetime, limit: int) -> Dict[str, Any]:
+
+    cur.execute(SERVICE_ANALYTICS_TOP_QUERY, (start, end, limit))
+    top_services = [dict(row) for row in cur.fetchall()]
+
+    cur.execute(SERVICE_ANALYTICS_TOTALS_QUERY, (start, end))
+    return build_service_analytics(start, end, top_services, cur.fetchone())
+
+def build_service_analytics(start: datetime, end: datetime, top_services: List[Dict[str, Any]],
+                            totals: Dict[str, Any]) -> Dict[str, Any]:
+    applications_count = totals['applications'] or 0
+    converted = totals['converted'] or 0
+
+    return {
+        'from': start.isoformat(),
+        'to': end.isoformat(),
+        'top_services': top_services,
+        'applications': applications_count,
+        'converted_to_order': converted,
+        'conversion_rate': round(converted / applications_count, 4) if applications_count else 0,
+        'average_basket': float(totals['average_basket'] or 0)
+    }
+
+def parse_days(query_params: Dict[str, Any]) -> Optional[int]:
+    value = query_params.get('days')
+    if not value:
+        return None
+    try:
+        days = int(value)
+    except (TypeError, ValueError):
+        raise ValueError('days must be an integer')
+    if days < 0:
+        raise ValueError('days must not be negative')
+    return days
+
+def build_created_at_filter(query_params: Dict[str, Any]) -> tuple:
+    '''
+    Условия по created_at из from/to/days - по ним Postgres отсекает лишние месячные партиции.
+    ValueError при неверных значениях - ответ 400
+    '''
+    conditions = []
+    values = []
+
+    days = parse_days(query_params)
+    start = datetime.now() - timedelta(days=days) if days is not None else parse_datetime(query_params, 'from')
+    end = parse_datetime(query_params, 'to')
+
+    if start:
+        conditions.append('created_at >= %s')
+        values.append(start)
+
+    if end:
+        conditions.append('created_at < %s')
+        values.append(end)
+
+    return conditions, values
+
+def render_json_list(cur, query: str, values: List[Any], order_by: str) -> str:
+    '''
+    Готовый JSON-массив от Postgres (json_agg): строки не превращаются
+    в dict и не проходят через энкодер, текст уходит в ответ как есть.
+    order_by ссылается на колонки подзапроса через алиас t.
+    '''
+    cur.execute(JSON_LIST_QUERY.format(order_by=order_by, query=query), values)
+    return cur.fetchone()['body']
+
+@with_compression
 def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     method: str = event.get('httpMethod', 'GET')
     path_params = event.get('pathParams', {})
@@ -54,32 +360,88 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                     return {
                         'statusCode': 404,
                         'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                        'body': json.dumps({'error': 'Application not found'})
+                        'body': dumps_text({'error': 'Application not found'})
                     }
                 
                 return {
                     'statusCode': 200,
                     'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                    'body': json.dumps(dict(application), default=str)
+                    'body': dumps_text(dict(application))
                 }
             else:
                 query_params = event.get('queryStringParameters', {}) or {}
+
+                if query_params.get('view') == 'customer':
+                    phone = normalize_phone(query_params.get('phone'))
+                    
+                    if not phone:
+                        return {
+                            'statusCode': 400,
+                            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                            'body': dumps_text({'error': 'phone is required'})
+                        }
+                    
+                    return {
+                        'statusCode': 200,
+                        'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                        'body': dumps_text(get_customer_profile(cur, phone))
+                    }
+
+                if query_params.get('view') == 'analytics':
+                    try:
+                        start, end, limit = parse_analytics_params(query_params)
+                    except ValueError as e:
+                        return {
+                            'statusCode': 400,
+                            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                            'body': dumps_text({'error': str(e)})
+                        }
+                    
+                    return {
+                        'statusCode': 200,
+                        'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                        'body': dumps_text(get_service_analytics(cur, start, end, limit))
+                    }
+
                 status = query_params.get('status')
+                try:
+                    conditions, values = build_created_at_filter(query_params)
+                except ValueError as e:
+                    return {
+                        'statusCode': 400,
+                        'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                        'body': dumps_text({'error': str(e)})
+                    }
                 
                 if status:
-                    cur.execute(
-                        "SELECT * FROM applications WHERE status = %s ORDER BY created_at DESC",
-                        (status,)
-                    )
-                else:
-                    cur.execute("SELECT * FROM applications ORDER BY created_at DESC")
+                    conditions.insert(0, 'status = %s')
+                    values.insert(0, status)
+                
+                if query_params.get('phone'):
+                    conditions.insert(0, 'customer_phone_normalized = %s')
+                    values.insert(0, normalize_phone(query_params['phone']))
+                
+                query = "SELECT * FROM applications"
+                if conditions:
+                    query += " WHERE " + " AND ".join(conditions)
+                
+                if query_params.get('render') == 'db':
+                    return {
+                        'statusCode': 200,
+                        'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                        'body': render_json_list(cur, query, values, 't.created_at DESC')
+                    }
+                
+                query += " ORDER BY created_at DESC"
+                
+                cur.execute(query, values)
                 
                 applications = cur.fetchall()
                 
                 return {
                     'statusCode': 200,
                     'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                    'body': json.dumps([dict(app) for app in applications], default=str)
+                    'body': dumps_text([dict(app) for app in applications])
                 }
         
         elif method == 'POST':
@@ -90,20 +452,32 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             customer_phone = body.get('customer_phone', '')
             customer_address = body.get('customer_address', '')
             customer_comment = body.get('customer_comment', '')
-            items = json.dumps(body.get('items', []))
-            total_amount = body.get('total_amount', 0)
+            client_total_amount = body.get('total_amount', 0)
             source = body.get('source', 'website')
             
+            priced_items, total_amount, mismatches = price_items(
+                body.get('items', []), client_total_amount, get_price_index(cur)
+            )
+            items = json.dumps(priced_items)
+            
             cur.execute(
                 """
-                INSERT INTO applications 
-                (number, customer_name, customer_phone, customer_address, customer_comment, 
-                 items, total_amount, source, status)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, 'new')
-                RETURNING *
+                WITH new_application AS (
+                    INSERT INTO applications
+                    (number, customer_name, customer_phone, customer_address, customer_comment,
+                     items, total_amount, client_total_amount, price_mismatches, source, status,
+                     customer_phone_normalized)
+                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, 'new', %s)
+                    RETURNING *
+                ), new_items AS (
+                """ + APPLICATION_ITEMS_INSERT.format(source='new_application') + """
+                )
+                SELECT * FROM new_application
                 """,
                 (number, customer_name, customer_phone, customer_address, customer_comment,
-                 items, total_amount, source)
+                 items, total_amount, to_decimal(client_total_amount),
+                 json.dumps(mismatches) if mismatches else None, source,
+                 normalize_phone(customer_phone))
             )
             
             new_application = cur.fetchone()
@@ -112,7 +486,7 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             return {
                 'statusCode': 201,
                 'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                'body': json.dumps(dict(new_application), default=str)
+                'body': dumps_text(dict(new_application))
             }
         
         elif method == 'PUT':
@@ -122,7 +496,7 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                 return {
                     'statusCode': 400,
                     'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                    'body': json.dumps({'error': 'Application ID is required'})
+                    'body': dumps_text({'error': 'Application ID is required'})
                 }
             
             body = json.loads(event.get('body', '{}'))
@@ -137,6 +511,8 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             if 'customer_phone' in body:
                 update_fields.append('customer_phone = %s')
                 values.append(body['customer_phone'])
+                update_fields.append('customer_phone_normalized = %s')
+                values.append(normalize_phone(body['customer_phone']))
             
             if 'customer_address' in body:
                 update_fields.append('customer_address = %s')
@@ -146,13 +522,29 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                 update_fields.append('customer_comment = %s')
                 values.append(body['customer_comment'])
             
-            if 'items' in body:
+            # Строки и итог пересчитываются по прайсу, как при создании; без items - сохранённые строки
+            reprice = 'items' in body or 'total_amount' in body
+            if reprice:
+                if 'items' in body:
+                    items = body['items']
+                else:
+                    cur.execute("SELECT items FROM applications WHERE id = %s", (app_id,))
+                    row = cur.fetchone()
+                    items = (row['items'] if row else None) or []
+                    if isinstance(items, str):
+                        items = json.loads(items)
+                
+                client_total_amount = body.get('total_amount')
+                priced_items, total_amount, mismatches = price_items(items, client_total_amount, get_price_index(cur))
                 update_fields.append('items = %s')
-                values.append(json.dumps(body['items']))
-            
-            if 'total_amount' in body:
+                values.append(json.dumps(priced_items))
                 update_fields.append('total_amount = %s')
-                values.append(body['total_amount'])
+                values.append(total_amount)
+                update_fields.append('price_mismatches = %s')
+                values.append(json.dumps(mismatches) if mismatches else None)
+                if client_total_amount is not None:
+                    update_fields.append('client_total_amount = %s')
+                    values.append(to_decimal(client_total_amount))
             
             if 'status' in body:
                 update_fields.append('status = %s')
@@ -166,14 +558,26 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                 return {
                     'statusCode': 400,
                     'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                    'body': json.dumps({'error': 'No fields to update'})
+                    'body': dumps_text({'error': 'No fields to update'})
                 }
             
             update_fields.append('updated_at = CURRENT_TIMESTAMP')
             values.append(app_id)
             
             query = f"UPDATE applications SET {', '.join(update_fields)} WHERE id = %s RETURNING *"
-            
+
+            if reprice:
+                query = f"""
+                    WITH updated_application AS ({query}),
+                    old_items AS (
+                        DELETE FROM application_items
+                        WHERE application_id IN (SELECT id FROM updated_application)
+                    ), new_items AS (
+                    {APPLICATION_ITEMS_INSERT.format(source='updated_application')}
+                    )
+                    SELECT * FROM updated_application
+                """
+
             cur.execute(query, values)
             updated_application = cur.fetchone()
             conn.commit()
@@ -182,13 +586,13 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                 return {
                     'statusCode': 404,
                     'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                    'body': json.dumps({'error': 'Application not found'})
+                    'body': dumps_text({'error': 'Application not found'})
                 }
             
             return {
                 'statusCode': 200,
                 'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                'body': json.dumps(dict(updated_application), default=str)
+                'body': dumps_text(dict(updated_application))
             }
         
         elif method == 'DELETE':
@@ -198,10 +602,21 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                 return {
                     'statusCode': 400,
                     'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                    'body': json.dumps({'error': 'Application ID is required'})
+                    'body': dumps_text({'error': 'Application ID is required'})
                 }
             
-            cur.execute("DELETE FROM applications WHERE id = %s RETURNING id", (app_id,))
+            cur.execute(
+                """
+                WITH deleted_application AS (
+                    DELETE FROM applications WHERE id = %s RETURNING id
+                ), deleted_items AS (
+                    DELETE FROM application_items
+                    WHERE application_id IN (SELECT id FROM deleted_application)
+                )
+                SELECT id FROM deleted_application
+                """,
+                (app_id,)
+            )
             deleted = cur.fetchone()
             conn.commit()
             
@@ -209,27 +624,34 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                 return {
                     'statusCode': 404,
                     'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                    'body': json.dumps({'error': 'Application not found'})
+                    'body': dumps_text({'error': 'Application not found'})
                 }
             
             return {
                 'statusCode': 200,
                 'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                'body': json.dumps({'success': True, 'id': deleted['id']})
+                'body': dumps_text({'success': True, 'id': deleted['id']})
             }
         
         else:
             return {
                 'statusCode': 405,
                 'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                'body': json.dumps({'error': 'Method not allowed'})
+                'body': dumps_text({'error': 'Method not allowed'})
             }
     
+    except (InvalidPhone, InvalidItems) as e:
+        return {
+            'statusCode': 400,
+            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+            'body': dumps_text({'error': str(e)})
+        }
+    
     except Exception as e:
         return {
             'statusCode': 500,
             'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-            'body': json.dumps({'error': str(e)})
+            'body': dumps_text({'error': str(e)})
         }
     
     finally:
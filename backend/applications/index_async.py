@@ -0,0 +1,110 @@
+'''
+Business: Асинхронный вариант API заявок (asyncpg) для долгоживущего хоста
+Args: event - dict с httpMethod, body, queryStringParameters, pathParams
+      context - объект с атрибутами request_id, function_name
+Returns: HTTP response dict с данными заявок
+'''
+
+import asyncio
+from typing import Dict, Any, List
+
+from aiodb import get_pool, fetch_all, fetch_one
+from encoding import dumps_text
+from compression import compress_response
+import index
+from index import (
+    InvalidPhone, normalize_phone, parse_analytics_params, build_created_at_filter, build_service_analytics,
+    CUSTOMER_PROFILE_QUERY, SERVICE_ANALYTICS_TOP_QUERY, SERVICE_ANALYTICS_TOTALS_QUERY, JSON_LIST_QUERY
+)
+
+JSON_HEADERS = {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'}
+
+async def get_customer_profile(conn, phone: str) -> Dict[str, Any]:
+    '''То же, что index.get_customer_profile, на соединении asyncpg'''
+    profile = await fetch_one(conn, CUSTOMER_PROFILE_QUERY, (phone, phone))
+    profile['phone'] = phone
+    profile['orders_total'] = float(profile['orders_total'])
+    return profile
+
+async def get_service_analytics(conn, start, end, limit: int) -> Dict[str, Any]:
+    '''То же, что index.get_service_analytics; два запроса идут по одному соединению'''
+    top_services = await fetch_all(conn, SERVICE_ANALYTICS_TOP_QUERY, (start, end, limit))
+    totals = await fetch_one(conn, SERVICE_ANALYTICS_TOTALS_QUERY, (start, end))
+    return build_service_analytics(start, end, top_services, totals)
+
+async def render_json_list(conn, query: str, values: List[Any], order_by: str) -> str:
+    '''См. index.render_json_list'''
+    row = await fetch_one(conn, JSON_LIST_QUERY.format(order_by=order_by, query=query), values)
+    return row['body']
+
+async def read_applications(conn, event: Dict[str, Any]) -> Dict[str, Any]:
+    app_id = (event.get('pathParams') or {}).get('id')
+    
+    if app_id:
+        application = await fetch_one(conn, "SELECT * FROM applications WHERE id = %s", (int(app_id),))
+        
+        if not application:
+            return {'statusCode': 404, 'headers': JSON_HEADERS, 'body': dumps_text({'error': 'Application not found'})}
+        
+        return {'statusCode': 200, 'headers': JSON_HEADERS, 'body': dumps_text(application)}
+    
+    query_params = event.get('queryStringParameters', {}) or {}
+
+    if query_params.get('view') == 'customer':
+        phone = normalize_phone(query_params.get('phone'))
+        
+        if not phone:
+            return {'statusCode': 400, 'headers': JSON_HEADERS, 'body': dumps_text({'error': 'phone is required'})}
+        
+        return {'statusCode': 200, 'headers': JSON_HEADERS, 'body': dumps_text(await get_customer_profile(conn, phone))}
+
+    if query_params.get('view') == 'analytics':
+        try:
+            start, end, limit = parse_analytics_params(query_params)
+        except ValueError as e:
+            return {'statusCode': 400, 'headers': JSON_HEADERS, 'body': dumps_text({'error': str(e)})}
+        
+        return {'statusCode': 200, 'headers': JSON_HEADERS, 'body': dumps_text(await get_service_analytics(conn, start, end, limit))}
+
+    status = query_params.get('status')
+    try:
+        conditions, values = build_created_at_filter(query_params)
+    except ValueError as e:
+        return {'statusCode': 400, 'headers': JSON_HEADERS, 'body': dumps_text({'error': str(e)})}
+    
+    if status:
+        conditions.insert(0, 'status = %s')
+        values.insert(0, status)
+    
+    if query_params.get('phone'):
+        conditions.insert(0, 'customer_phone_normalized = %s')
+        values.insert(0, normalize_phone(query_params['phone']))
+    
+    query = "SELECT * FROM applications"
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    
+    if query_params.get('render') == 'db':
+        return {'statusCode': 200, 'headers': JSON_HEADERS, 'body': await render_json_list(conn, query, values, 't.created_at DESC')}
+    
+    query += " ORDER BY created_at DESC"
+    
+    return {'statusCode': 200, 'headers': JSON_HEADERS, 'body': dumps_text(await fetch_all(conn, query, values))}
+
+async def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    method: str = event.get('httpMethod', 'GET')
+    
+    # OPTIONS и запись - синхронный handler в отдельном потоке, loop не блокируется
+    if method != 'GET':
+        return await asyncio.to_thread(index.handler, event, context)
+    
+    try:
+        pool = await get_pool()
+        async with pool.acquire() as conn:
+            response = await read_applications(conn, event)
+    except InvalidPhone as e:
+        response = {'statusCode': 400, 'headers': JSON_HEADERS, 'body': dumps_text({'error': str(e)})}
+    except Exception as e:
+        response = {'statusCode': 500, 'headers': JSON_HEADERS, 'body': dumps_text({'error': str(e)})}
+    
+    return compress_response(event, response)
@@ -0,0 +1,159 @@
+'''
+Business: Обслуживание месячных партиций applications и orders - создание будущих и архивация старых
+Args: event - dict с httpMethod, body (keep_months), headers
+      context - объект с атрибутами request_id, function_name
+Returns: HTTP response dict с отчётом о созданных и заархивированных партициях
+'''
+
+import json
+import os
+import psycopg2
+from psycopg2.extras import RealDictCursor
+from typing import Dict, Any
+
+from encoding import dumps_text
+
+PARTITIONED_TABLES = ['applications', 'orders']
+
+def get_db_connection():
+    dsn = os.environ.get('DATABASE_URL')
+    return psycopg2.connect(dsn, cursor_factory=RealDictCursor)
+
+def is_authorized(event: Dict[str, Any]) -> bool:
+    '''Без ARCHIVE_TOKEN доступ закрыт: эндпоинт отсоединяет и удаляет партиции'''
+    token = os.environ.get('ARCHIVE_TOKEN')
+    if not token:
+        return False
+    headers = event.get('headers') or {}
+    return headers.get('X-Auth-Token') == token or headers.get('x-auth-token') == token
+
+def parse_months(value: Any, name: str, minimum: int) -> int:
+    '''Целое число месяцев не меньше minimum; ValueError - ответ 400'''
+    if isinstance(value, bool):
+        raise ValueError(f'{name} must be an integer >= {minimum}')
+    if isinstance(value, str) and value.strip().lstrip('-').isdigit():
+        value = int(value)
+    if not isinstance(value, int) or value < minimum:
+        raise ValueError(f'{name} must be an integer >= {minimum}')
+    return value
+
+def parse_archive_options(event: Dict[str, Any]) -> Dict[str, int]:
+    '''
+    keep_months >= 1: при 0 и меньше архивировались бы текущая и будущие
+    партиции с живыми данными
+    '''
+    try:
+        body = json.loads(event.get('body') or '{}')
+    except ValueError:
+        raise ValueError('Request body is not valid JSON')
+    if not isinstance(body, dict):
+        raise ValueError('Request body must be a JSON object')
+    
+    return {
+        'keep_months': parse_months(body.get('keep_months', os.environ.get('ARCHIVE_KEEP_MONTHS', 24)), 'keep_months', 1),
+        'months_ahead': parse_months(body.get('months_ahead', 3), 'months_ahead', 0)
+    }
+
+def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    method: str = event.get('httpMethod', 'GET')
+    
+    if method == 'OPTIONS':
+        return {
+            'statusCode': 200,
+            'headers': {
+                'Access-Control-Allow-Origin': '*',
+                'Access-Control-Allow-Methods': 'GET, POST, OPTIONS',
+                'Access-Control-Allow-Headers': 'Content-Type, X-Auth-Token',
+                'Access-Control-Max-Age': '86400'
+            },
+            'body': ''
+        }
+    
+    # Параметры проверяются до авторизации и БД: запрос с ними всё равно не выполнится
+    if method == 'POST':
+        try:
+            options = parse_archive_options(event)
+        except ValueError as e:
+            return {
+                'statusCode': 400,
+                'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                'body': dumps_text({'error': str(e)})
+            }
+    
+    if not os.environ.get('ARCHIVE_TOKEN'):
+        return {
+            'statusCode': 403,
+            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+            'body': dumps_text({'error': 'ARCHIVE_TOKEN is not configured'})
+        }
+    
+    if not is_authorized(event):
+        return {
+            'statusCode': 401,
+            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+            'body': dumps_text({'error': 'Unauthorized'})
+        }
+    
+    try:
+        conn = get_db_connection()
+        cur = conn.cursor()
+        
+        if method == 'GET':
+            cur.execute(
+                """
+                SELECT parent_table, partition_name, month, row_count, archived_at,
+                       pg_column_size(rows) AS compressed_bytes
+                FROM archived_partitions
+                ORDER BY parent_table, month
+                """
+            )
+            archived = [dict(row) for row in cur.fetchall()]
+            
+            return {
+                'statusCode': 200,
+                'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                'body': dumps_text({'archived': archived})
+            }
+        
+        elif method == 'POST':
+            keep_months = options['keep_months']
+            months_ahead = options['months_ahead']
+            
+            report = {}
+            
+            for table in PARTITIONED_TABLES:
+                cur.execute("SELECT ensure_monthly_partitions(%s, 0, %s) AS created", (table, months_ahead))
+                created = cur.fetchone()['created']
+                conn.commit()
+                
+                cur.execute("SELECT * FROM archive_monthly_partitions(%s, %s)", (table, keep_months))
+                archived = [dict(row) for row in cur.fetchall()]
+                conn.commit()
+                
+                report[table] = {'created_partitions': created, 'archived': archived}
+            
+            return {
+                'statusCode': 200,
+                'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                'body': dumps_text({'success': True, 'keep_months': keep_months, 'report': report})
+            }
+        
+        else:
+            return {
+                'statusCode': 405,
+                'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                'body': dumps_text({'error': 'Method not allowed'})
+            }
+    
+    except Exception as e:
+        return {
+            'statusCode': 500,
+            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+            'body': dumps_text({'error': str(e)})
+        }
+    
+    finally:
+        if 'cur' in locals():
+            cur.close()
+        if 'conn' in locals():
+            conn.close()
@@ -0,0 +1,79 @@
+'''
+Асинхронный доступ к Postgres для index_async.py (asyncpg).
+
+Модуль лежит одинаковой копией в каждой функции, которая его использует
+(функции деплоятся по отдельности и не видят соседние папки).
+
+Пул соединений живёт, пока жив event loop (под ASGI-хостом - весь процесс),
+поэтому он свой на каждый loop. Запросы пишутся как в psycopg2-коде (%s),
+перед выполнением плейсхолдеры переводятся в $1, $2, ... json/jsonb читаются
+в Python-объекты, как это делает psycopg2.
+'''
+import asyncio
+import json
+import os
+import re
+from typing import Any, Dict, List, Optional, Sequence
+
+import asyncpg
+
+POOL_MIN_SIZE = int(os.environ.get('ASYNC_DB_POOL_MIN', 1))
+POOL_MAX_SIZE = int(os.environ.get('ASYNC_DB_POOL_MAX', 10))
+
+# loop -> задача создания пула: параллельные первые запросы ждут один пул.
+# Пулы закрытых loop-ов (asyncio.run на каждый вызов) выбрасываются
+_pools: Dict[Any, asyncio.Task] = {}
+
+PLACEHOLDER = re.compile(r'%%|%s')
+
+def placeholders(query: str) -> str:
+    '''%s -> $N, %% -> %'''
+    counter = 0
+    
+    def replace(match):
+        nonlocal counter
+        if match.group(0) == '%%':
+            return '%'
+        counter += 1
+        return f'${counter}'
+    
+    return PLACEHOLDER.sub(replace, query)
+
+def encode_json(value: Any) -> str:
+    return value if isinstance(value, str) else json.dumps(value)
+
+async def init_connection(conn) -> None:
+    for type_name in ('json', 'jsonb'):
+        await conn.set_type_codec(type_name, schema='pg_catalog', encoder=encode_json, decoder=json.loads)
+
+async def create_pool():
+    dsn = os.environ.get('DATABASE_URL')
+    if not dsn:
+        raise ValueError('DATABASE_URL not found')
+    return await asyncpg.create_pool(
+        dsn, min_size=POOL_MIN_SIZE, max_size=POOL_MAX_SIZE, init=init_connection
+    )
+
+async def get_pool():
+    loop = asyncio.get_running_loop()
+    for stale in [l for l in _pools if l.is_closed()]:
+        del _pools[stale]
+    task = _pools.get(loop)
+    if task is None:
+        task = _pools[loop] = loop.create_task(create_pool())
+    try:
+        return await asyncio.shield(task)
+    except Exception:
+        if _pools.get(loop) is task:
+            del _pools[loop]
+        raise
+
+async def fetch_all(conn, query: str, args: Sequence[Any] = ()) -> List[Dict[str, Any]]:
+    return [dict(row) for row in await conn.fetch(placeholders(query), *args)]
+
+async def fetch_one(conn, query: str, args: Sequence[Any] = ()) -> Optional[Dict[str, Any]]:
+    row = await conn.fetchrow(placeholders(query), *args)
+    return dict(row) if row is not None else None
+
+async def fetch_value(conn, query: str, args: Sequence[Any] = ()) -> Any:
+    return await conn.fetchval(placeholders(query), *args)
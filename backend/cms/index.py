@@ -6,22 +6,178 @@ Returns: HTTP response dict with CRUD operations results
 '''
 import json
 import os
+import re
 from typing import Dict, Any, List, Optional
-from datetime import datetime
 import psycopg2
 from psycopg2.extras import RealDictCursor
 
+from singleflight import SingleFlight, request_key
+from encoding import dumps_text
+from compression import with_compression, compress_response
+
+# Одинаковые параллельные GET (например, services?visible=true с публичных
+# страниц) выполняются одним запросом и одной сериализацией
+CMS_FLIGHT = SingleFlight('cms')
+
 def get_db_connection():
     dsn = os.environ.get('DATABASE_URL')
     if not dsn:
         raise ValueError('DATABASE_URL not found')
     return psycopg2.connect(dsn, cursor_factory=RealDictCursor)
 
-def json_serial(obj):
-    if isinstance(obj, datetime):
-        return obj.isoformat()
-    raise TypeError(f'Type {type(obj)} not serializable')
+MEDIA_HASH_PATTERN = re.compile(r'([0-9a-f]{64})(?:_w\d+)?\.[a-z0-9]+(?:$|\?)')
+
+def image_urls(value) -> List[str]:
+    if not value:
+        return []
+    if isinstance(value, str):
+        if value.startswith('['):
+            try:
+                return [v for v in json.loads(value) if isinstance(v, str)]
+            except ValueError:
+                return [value]
+        return [value]
+    return [v for v in value if isinstance(v, str)]
+
+IMAGE_META_QUERY = "SELECT hash, width, height, placeholder FROM media_objects WHERE hash = ANY(%s)"
+
+def image_hashes(items: List[Dict], fields: List[str]) -> Dict[str, str]:
+    '''url -> sha256 для картинок из нашего хранилища'''
+    hashes_by_url = {}
+    for item in items:
+        for field in fields:
+            for url in image_urls(item.get(field)):
+                match = MEDIA_HASH_PATTERN.search(url)
+                if match:
+                    hashes_by_url[url] = match.group(1)
+    return hashes_by_url
+
+def merge_image_meta(items: List[Dict], fields: List[str], hashes_by_url: Dict[str, str], rows: List[Dict]) -> List[Dict]:
+    meta = {row['hash']: {'width': row['width'], 'height': row['height'], 'placeholder': row['placeholder']}
+            for row in rows}
+    
+    for item in items:
+        item['image_meta'] = {
+            url: meta[hashes_by_url[url]]
+            for field in fields
+            for url in image_urls(item.get(field))
+            if hashes_by_url.get(url) in meta
+        }
+    return items
+
+def attach_image_meta(cursor, items: List[Dict], fields: List[str]) -> List[Dict]:
+    '''
+    Размеры и плейсхолдеры картинок берутся из media_objects одним запросом,
+    без чтения самих файлов: item['image_meta'] = {url: {width, height, placeholder}}
+    '''
+    hashes_by_url = image_hashes(items, fields)
+    if not hashes_by_url:
+        return items
+    
+    cursor.execute(IMAGE_META_QUERY, (list(set(hashes_by_url.values())),))
+    return merge_image_meta(items, fields, hashes_by_url, cursor.fetchall())
+
+class RawJSON(str):
+    '''Тело ответа, уже сериализованное в JSON (например, самим Postgres)'''
+
+def image_meta_sql(urls_expr: str) -> str:
+    '''SQL-аналог attach_image_meta для одного элемента: {url: {width, height, placeholder}}'''
+    return (
+        "COALESCE((SELECT jsonb_object_agg(u.url, jsonb_build_object("
+        "'width', m.width, 'height', m.height, 'placeholder', m.placeholder)) "
+        f"FROM unnest({urls_expr}) AS u(url) "
+        "JOIN media_objects m ON m.hash = substring(u.url from '([0-9a-f]{64})(?:_w\\d+)?\\.[a-z0-9]+(?:$|\\?)')"
+        "), '{}'::jsonb)"
+    )
+
+def json_list_query(query: str, urls_expr: str, order_by: str) -> str:
+    '''{"items": [...], "total": N} одним текстом из Postgres; order_by - по алиасу t'''
+    return (
+        "SELECT json_build_object("
+        f"'items', COALESCE(json_agg(to_jsonb(t) || jsonb_build_object('image_meta', {image_meta_sql(urls_expr)}) ORDER BY {order_by}), '[]'::json), "
+        "'total', COUNT(*)"
+        f")::text AS body FROM ({query}) t"
+    )
+
+def render_json_list(cursor, query: str, query_params: List[Any], urls_expr: str, order_by: str) -> RawJSON:
+    '''
+    {"items": [...], "total": N} целиком собирается в Postgres через json_agg,
+    handler отдаёт текст без dict-ов и энкодера. Включается ?render=db.
+    '''
+    cursor.execute(json_list_query(query, urls_expr, order_by), query_params)
+    return RawJSON(cursor.fetchone()['body'])
+
+# Чтение сущностей: таблица, поля с картинками, SQL-выражение url-ов для
+# render=db, поля поиска и сортировка. Общее для index и index_async
+ENTITIES = {
+    'services': {
+        'table': 'services',
+        'image_fields': ['images'],
+        'urls_expr': 't.images',
+        'search': ['title', 'description'],
+        'order_by': 'sort_order, created_at DESC'
+    },
+    'posts': {
+        'table': 'posts',
+        'image_fields': ['gallery'],
+        'urls_expr': 't.gallery',
+        'search': ['title', 'excerpt'],
+        'order_by': 'published_at DESC NULLS LAST, created_at DESC'
+    },
+    'team': {
+        'table': 'team_members',
+        'image_fields': ['photo'],
+        'urls_expr': 'ARRAY[t.photo]',
+        'search': [],
+        'order_by': 'sort_order, created_at'
+    }
+}
+
+SETTING_QUERY = "SELECT * FROM site_settings WHERE setting_key = %s"
+
+def entity_by_id_query(entity: Dict[str, Any]) -> str:
+    return f"SELECT * FROM {entity['table']} WHERE id = %s AND removed_at IS NULL"
+
+def entity_list_query(entity: Dict[str, Any], params: Dict[str, Any]) -> tuple:
+    '''(запрос без ORDER BY, параметры) по search и visible из query string'''
+    search = params.get('search', '')
+    visible = params.get('visible')
+    
+    query = f"SELECT * FROM {entity['table']} WHERE removed_at IS NULL"
+    query_params = []
+    
+    if search and entity['search']:
+        query += " AND (" + " OR ".join(f"{column} ILIKE %s" for column in entity['search']) + ")"
+        query_params.extend([f'%{search}%'] * len(entity['search']))
+    
+    if visible is not None:
+        query += " AND visible = %s"
+        query_params.append(visible == 'true')
+    
+    return query, query_params
+
+def aliased_order_by(entity: Dict[str, Any]) -> str:
+    return ', '.join(f't.{part.strip()}' for part in entity['order_by'].split(','))
 
+def read_entity(cursor, entity: Dict[str, Any], entity_id: Optional[str], params: Dict[str, Any]) -> Dict:
+    '''GET одной сущности или списка; index_async.read_entity - то же на asyncpg'''
+    if entity_id:
+        cursor.execute(entity_by_id_query(entity), (entity_id,))
+        item = cursor.fetchone()
+        if not item:
+            return {'statusCode': 404, 'body': {'error': 'Not found'}}
+        return {'statusCode': 200, 'body': attach_image_meta(cursor, [dict(item)], entity['image_fields'])[0]}
+    
+    query, query_params = entity_list_query(entity, params)
+    
+    if params.get('render') == 'db':
+        return {'statusCode': 200, 'body': render_json_list(cursor, query, query_params, entity['urls_expr'], aliased_order_by(entity))}
+    
+    cursor.execute(query + f" ORDER BY {entity['order_by']}", query_params)
+    items = attach_image_meta(cursor, [dict(row) for row in cursor.fetchall()], entity['image_fields'])
+    return {'statusCode': 200, 'body': {'items': items, 'total': len(items)}}
+
+@with_compression
 def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     method: str = event.get('httpMethod', 'GET')
     path: str = event.get('path', '')
@@ -44,16 +200,43 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     }
     
     try:
-        conn = get_db_connection()
-        
         path_parts = [p for p in path.split('/') if p]
         
         if len(path_parts) < 1:
-            return {'statusCode': 400, 'headers': headers, 'body': json.dumps({'error': 'Invalid path'})}
+            return {'statusCode': 400, 'headers': headers, 'body': dumps_text({'error': 'Invalid path'})}
         
         entity_type = path_parts[0]
         entity_id = path_parts[1] if len(path_parts) > 1 else None
         
+        if method == 'GET':
+            (status_code, body, compressed), shared = CMS_FLIGHT.do(
+                request_key('cms', path, event.get('queryStringParameters')),
+                lambda: (*render_entity(method, entity_type, entity_id, event), {})
+            )
+            return compress_response(event, {
+                'statusCode': status_code,
+                'headers': {**headers, **CMS_FLIGHT.headers(shared)},
+                'body': body
+            }, compressed)
+        
+        status_code, body = render_entity(method, entity_type, entity_id, event)
+        return {
+            'statusCode': status_code,
+            'headers': headers,
+            'body': body
+        }
+        
+    except Exception as e:
+        return {
+            'statusCode': 500,
+            'headers': headers,
+            'body': dumps_text({'error': str(e)})
+        }
+
+def render_entity(method: str, entity_type: str, entity_id: Optional[str], event: Dict) -> tuple:
+    '''Выполняет обработчик сущности и возвращает (statusCode, JSON-текст)'''
+    conn = get_db_connection()
+    try:
         if entity_type == 'services':
             result = handle_services(conn, method, entity_id, event)
         elif entity_type == 'posts':
@@ -64,57 +247,19 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             result = handle_settings(conn, method, entity_id, event)
         else:
             result = {'statusCode': 404, 'body': {'error': 'Unknown entity type'}}
-        
+    finally:
         conn.close()
-        
-        return {
-            'statusCode': result.get('statusCode', 200),
-            'headers': headers,
-            'body': json.dumps(result.get('body', {}), default=json_serial)
-        }
-        
-    except Exception as e:
-        return {
-            'statusCode': 500,
-            'headers': headers,
-            'body': json.dumps({'error': str(e)})
-        }
+    
+    body = result.get('body', {})
+    if isinstance(body, RawJSON):
+        return result.get('statusCode', 200), str(body)
+    return result.get('statusCode', 200), dumps_text(body)
 
 def handle_services(conn, method: str, entity_id: Optional[str], event: Dict) -> Dict:
     cursor = conn.cursor()
     
     if method == 'GET':
-        if entity_id:
-            cursor.execute(
-                "SELECT * FROM services WHERE id = %s AND removed_at IS NULL",
-                (entity_id,)
-            )
-            item = cursor.fetchone()
-            if not item:
-                return {'statusCode': 404, 'body': {'error': 'Not found'}}
-            return {'statusCode': 200, 'body': dict(item)}
-        
-        params = event.get('queryStringParameters') or {}
-        search = params.get('search', '')
-        visible = params.get('visible')
-        
-        query = "SELECT * FROM services WHERE removed_at IS NULL"
-        query_params = []
-        
-        if search:
-            query += " AND (title ILIKE %s OR description ILIKE %s)"
-            search_pattern = f'%{search}%'
-            query_params.extend([search_pattern, search_pattern])
-        
-        if visible is not None:
-            query += " AND visible = %s"
-            query_params.append(visible == 'true')
-        
-        query += " ORDER BY sort_order, created_at DESC"
-        
-        cursor.execute(query, query_params)
-        items = [dict(row) for row in cursor.fetchall()]
-        return {'statusCode': 200, 'body': {'items': items, 'total': len(items)}}
+        return read_entity(cursor, ENTITIES['services'], entity_id, event.get('queryStringParameters') or {})
     
     elif method == 'POST':
         body = json.loads(event.get('body', '{}'))
@@ -210,37 +355,7 @@ def handle_posts(conn, method: str, entity_id: Optional[str], event: Dict) -> Di
     cursor = conn.cursor()
     
     if method == 'GET':
-        if entity_id:
-            cursor.execute(
-                "SELECT * FROM posts WHERE id = %s AND removed_at IS NULL",
-                (entity_id,)
-            )
-            item = cursor.fetchone()
-            if not item:
-                return {'statusCode': 404, 'body': {'error': 'Not found'}}
-            return {'statusCode': 200, 'body': dict(item)}
-        
-        params = event.get('queryStringParameters') or {}
-        search = params.get('search', '')
-        visible = params.get('visible')
-        
-        query = "SELECT * FROM posts WHERE removed_at IS NULL"
-        query_params = []
-        
-        if search:
-            query += " AND (title ILIKE %s OR excerpt ILIKE %s)"
-            search_pattern = f'%{search}%'
-            query_params.extend([search_pattern, search_pattern])
-        
-        if visible is not None:
-            query += " AND visible = %s"
-            query_params.append(visible == 'true')
-        
-        query += " ORDER BY published_at DESC NULLS LAST, created_at DESC"
-        
-        cursor.execute(query, query_params)
-        items = [dict(row) for row in cursor.fetchall()]
-        return {'statusCode': 200, 'body': {'items': items, 'total': len(items)}}
+        return read_entity(cursor, ENTITIES['posts'], entity_id, event.get('queryStringParameters') or {})
     
     elif method == 'POST':
         body = json.loads(event.get('body', '{}'))
@@ -332,31 +447,7 @@ def handle_team(conn, method: str, entity_id: Optional[str], event: Dict) -> Dic
     cursor = conn.cursor()
     
     if method == 'GET':
-        if entity_id:
-            cursor.execute(
-                "SELECT * FROM team_members WHERE id = %s AND removed_at IS NULL",
-                (entity_id,)
-            )
-            item = cursor.fetchone()
-            if not item:
-                return {'statusCode': 404, 'body': {'error': 'Not found'}}
-            return {'statusCode': 200, 'body': dict(item)}
-        
-        params = event.get('queryStringParameters') or {}
-        visible = params.get('visible')
-        
-        query = "SELECT * FROM team_members WHERE removed_at IS NULL"
-        query_params = []
-        
-        if visible is not None:
-            query += " AND visible = %s"
-            query_params.append(visible == 'true')
-        
-        query += " ORDER BY sort_order, created_at"
-        
-        cursor.execute(query, query_params)
-        items = [dict(row) for row in cursor.fetchall()]
-        return {'statusCode': 200, 'body': {'items': items, 'total': len(items)}}
+        return read_entity(cursor, ENTITIES['team'], entity_id, event.get('queryStringParameters') or {})
     
     elif method == 'POST':
         body = json.loads(event.get('body', '{}'))
@@ -446,10 +537,7 @@ def handle_settings(conn, method: str, setting_key: Optional[str], event: Dict)
         return {'statusCode': 400, 'body': {'error': 'Setting key required'}}
     
     if method == 'GET':
-        cursor.execute(
-            "SELECT * FROM site_settings WHERE setting_key = %s",
-            (setting_key,)
-        )
+        cursor.execute(SETTING_QUERY, (setting_key,))
         item = cursor.fetchone()
         if not item:
             return {'statusCode': 404, 'body': {'error': 'Not found'}}
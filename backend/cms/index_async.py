@@ -0,0 +1,111 @@
+'''
+Business: Async variant of the unified CMS API (asyncpg) for the long-lived host
+Args: event - dict with httpMethod, body, path, queryStringParameters
+      context - object with attributes: request_id, function_name
+Returns: HTTP response dict with CRUD operations results
+'''
+import asyncio
+import json
+from typing import Dict, Any, List, Optional
+
+from aiodb import get_pool, fetch_all, fetch_one
+from singleflight import request_key
+from encoding import dumps_text
+from compression import compress_response
+import index
+from index import (
+    CMS_FLIGHT, ENTITIES, IMAGE_META_QUERY, SETTING_QUERY, RawJSON, image_hashes, merge_image_meta,
+    entity_by_id_query, entity_list_query, aliased_order_by, json_list_query
+)
+
+async def attach_image_meta(conn, items: List[Dict], fields: List[str]) -> List[Dict]:
+    '''То же, что index.attach_image_meta, на соединении asyncpg'''
+    hashes_by_url = image_hashes(items, fields)
+    if not hashes_by_url:
+        return items
+    
+    rows = await fetch_all(conn, IMAGE_META_QUERY, (list(set(hashes_by_url.values())),))
+    return merge_image_meta(items, fields, hashes_by_url, rows)
+
+async def read_entity(conn, entity: Dict[str, Any], entity_id: Optional[str], params: Dict[str, Any]) -> Dict:
+    '''То же, что index.read_entity; запросы строятся теми же функциями'''
+    if entity_id:
+        item = await fetch_one(conn, entity_by_id_query(entity), (int(entity_id),))
+        if not item:
+            return {'statusCode': 404, 'body': {'error': 'Not found'}}
+        return {'statusCode': 200, 'body': (await attach_image_meta(conn, [item], entity['image_fields']))[0]}
+    
+    query, query_params = entity_list_query(entity, params)
+    
+    if params.get('render') == 'db':
+        body = await fetch_one(conn, json_list_query(query, entity['urls_expr'], aliased_order_by(entity)), query_params)
+        return {'statusCode': 200, 'body': RawJSON(body['body'])}
+    
+    rows = await fetch_all(conn, query + f" ORDER BY {entity['order_by']}", query_params)
+    items = await attach_image_meta(conn, rows, entity['image_fields'])
+    return {'statusCode': 200, 'body': {'items': items, 'total': len(items)}}
+
+async def read_setting(conn, setting_key: Optional[str]) -> Dict:
+    if not setting_key:
+        return {'statusCode': 400, 'body': {'error': 'Setting key required'}}
+    
+    item = await fetch_one(conn, SETTING_QUERY, (setting_key,))
+    if not item:
+        return {'statusCode': 404, 'body': {'error': 'Not found'}}
+    
+    return {'statusCode': 200, 'body': {'key': item['setting_key'], 'value': json.loads(item['setting_value'])}}
+
+async def render_entity(entity_type: str, entity_id: Optional[str], event: Dict) -> tuple:
+    '''GET-ветка index.render_entity: (statusCode, JSON-текст, сжатые варианты)'''
+    pool = await get_pool()
+    async with pool.acquire() as conn:
+        if entity_type in ENTITIES:
+            result = await read_entity(conn, ENTITIES[entity_type], entity_id, event.get('queryStringParameters') or {})
+        elif entity_type == 'settings':
+            result = await read_setting(conn, entity_id)
+        else:
+            result = {'statusCode': 404, 'body': {'error': 'Unknown entity type'}}
+    
+    body = result.get('body', {})
+    if isinstance(body, RawJSON):
+        return result.get('statusCode', 200), str(body), {}
+    return result.get('statusCode', 200), dumps_text(body), {}
+
+async def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    method: str = event.get('httpMethod', 'GET')
+    path: str = event.get('path', '')
+    
+    # OPTIONS и запись (админка) - синхронный handler в отдельном потоке
+    if method != 'GET':
+        return await asyncio.to_thread(index.handler, event, context)
+    
+    headers = {
+        'Content-Type': 'application/json',
+        'Access-Control-Allow-Origin': '*'
+    }
+    
+    try:
+        path_parts = [p for p in path.split('/') if p]
+        
+        if len(path_parts) < 1:
+            return {'statusCode': 400, 'headers': headers, 'body': dumps_text({'error': 'Invalid path'})}
+        
+        entity_type = path_parts[0]
+        entity_id = path_parts[1] if len(path_parts) > 1 else None
+        
+        (status_code, body, compressed), shared = await CMS_FLIGHT.do_async(
+            request_key('cms', path, event.get('queryStringParameters')),
+            lambda: render_entity(entity_type, entity_id, event)
+        )
+        return compress_response(event, {
+            'statusCode': status_code,
+            'headers': {**headers, **CMS_FLIGHT.headers(shared)},
+            'body': body
+        }, compressed)
+        
+    except Exception as e:
+        return {
+            'statusCode': 500,
+            'headers': headers,
+            'body': dumps_text({'error': str(e)})
+        }
@@ -0,0 +1,159 @@
+'''
+Кэш ответов публичных GET-эндпоинтов.
+
+Модуль лежит одинаковой копией в каждой функции, которая его использует
+(функции деплоятся по отдельности и не видят соседние папки).
+
+Версия данных берётся из content_versions (её увеличивают триггеры на
+таблицах), поэтому 304 и попадание в кэш стоят одного запроса по ключу,
+а в течение VALIDATE_INTERVAL секунд после проверки - ни одного.
+Сжатые варианты тела хранятся в записи кэша вместе со снимком.
+'''
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Dict, Any, Callable, ContextManager, Optional, Tuple
+
+from compression import compress_response
+
+CACHE_CONTROL = 'public, max-age=60, stale-while-revalidate=600'
+VALIDATE_INTERVAL = float(os.environ.get('HTTP_CACHE_VALIDATE_SECONDS', 5))
+MAX_ENTRIES = 256
+
+# Хост (host/) вызывает handler из нескольких потоков: чтение, вставка и
+# вытеснение идут под замком, запрос в БД и рендер - вне его
+_entries: 'OrderedDict[str, Dict[str, Any]]' = OrderedDict()
+_lock = threading.Lock()
+
+def request_header(event: Dict[str, Any], name: str) -> Optional[str]:
+    for key, value in (event.get('headers') or {}).items():
+        if key.lower() == name.lower():
+            return value
+    return None
+
+def read_version(cur, name: str) -> Tuple[int, Optional[datetime]]:
+    cur.execute("SELECT version, updated_at FROM content_versions WHERE name = %s", (name,))
+    row = cur.fetchone()
+    if not row:
+        return 0, None
+    if isinstance(row, dict):
+        return row['version'], row['updated_at']
+    return row[0], row[1]
+
+def http_date(value: Optional[datetime]) -> Optional[str]:
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return format_datetime(value.astimezone(timezone.utc).replace(microsecond=0), usegmt=True)
+
+def is_not_modified(event: Dict[str, Any], etag: str, last_modified: Optional[str]) -> bool:
+    if_none_match = request_header(event, 'If-None-Match')
+    if if_none_match:
+        return etag in [tag.strip() for tag in if_none_match.split(',')] or if_none_match.strip() == '*'
+    
+    if_modified_since = request_header(event, 'If-Modified-Since')
+    if if_modified_since and last_modified:
+        try:
+            return parsedate_to_datetime(last_modified) <= parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+    return False
+
+def build_response(event: Dict[str, Any], entry: Dict[str, Any], cache_status: str) -> Dict[str, Any]:
+    headers = {
+        'Access-Control-Allow-Origin': '*',
+        'Cache-Control': CACHE_CONTROL,
+        'ETag': entry['etag'],
+        'X-Cache': cache_status
+    }
+    if entry['last_modified']:
+        headers['Last-Modified'] = entry['last_modified']
+    
+    if is_not_modified(event, entry['etag'], entry['last_modified']):
+        return {'statusCode': 304, 'headers': headers, 'body': '', 'isBase64Encoded': False}
+    
+    headers['Content-Type'] = 'application/json'
+    response = {'statusCode': 200, 'headers': headers, 'body': entry['body'], 'isBase64Encoded': False}
+    return compress_response(event, response, entry.get('compressed'))
+
+def cached_get(event: Dict[str, Any], name: str, key: str,
+               open_cursor: Callable[[], ContextManager[Any]],
+               render: Callable[[Any], Tuple[int, str]]) -> Dict[str, Any]:
+    '''
+    name - запись content_versions, key - вариант ответа (путь и нормализованный query).
+    render(cur) -> (statusCode, JSON-текст); кэшируются только ответы 200.
+    '''
+    key = f'{name}:{key}'
+    with _lock:
+        entry = _entries.get(key)
+        if entry:
+            _entries.move_to_end(key)
+    now = time.monotonic()
+    if entry and now - entry['checked_at'] < VALIDATE_INTERVAL:
+        return build_response(event, entry, 'HIT')
+    
+    with open_cursor() as cur:
+        version, updated_at = read_version(cur, name)
+        if entry and entry['version'] == version:
+            entry['checked_at'] = now
+            return build_response(event, entry, 'REVALIDATED')
+        
+        etag = f'W/"{hashlib.sha1(key.encode()).hexdigest()[:12]}-{version}"'
+        last_modified = http_date(updated_at)
+        if is_not_modified(event, etag, last_modified):
+            return build_response(event, {'etag': etag, 'last_modified': last_modified, 'body': ''}, 'MISS')
+        
+        status_code, body = render(cur)
+    
+    if status_code != 200:
+        return {
+            'statusCode': status_code,
+            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+            'body': body,
+            'isBase64Encoded': False
+        }
+    
+    entry = {
+        'name': name,
+        'version': version,
+        'etag': etag,
+        'last_modified': last_modified,
+        'body': body,
+        'compressed': {},
+        'checked_at': now
+    }
+    with _lock:
+        _entries[key] = entry
+        _entries.move_to_end(key)
+        while len(_entries) > MAX_ENTRIES:
+            _entries.popitem(last=False)
+    return build_response(event, entry, 'MISS')
+
+def invalidate(name: str) -> None:
+    '''Вызывается после записи в этом же инстансе; остальные узнают о ней по версии'''
+    with _lock:
+        for key in [key for key, entry in _entries.items() if entry['name'] == name]:
+            del _entries[key]
+
+def cache_key(event: Dict[str, Any], *param_names: str) -> str:
+    params = event.get('queryStringParameters') or {}
+    query = '&'.join(f'{name}={params[name]}' for name in sorted(param_names) if params.get(name) not in (None, ''))
+    return f"{(event.get('path') or '/').rstrip('/') or '/'}?{query}"
+
+@contextmanager
+def closing_cursor(connect: Callable[[], Any]):
+    conn = connect()
+    try:
+        cur = conn.cursor()
+        try:
+            yield cur
+        finally:
+            cur.close()
+    finally:
+        conn.close()
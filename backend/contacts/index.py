@@ -11,10 +11,41 @@ from datetime import datetime
 import psycopg2
 from psycopg2.extras import RealDictCursor
 
+from httpcache import cached_get, closing_cursor, invalidate
+from encoding import dumps_text
+from compression import with_compression
+
 def get_db_connection():
     dsn = os.environ.get('DATABASE_URL')
     return psycopg2.connect(dsn, cursor_factory=RealDictCursor)
 
+def render_contacts(cur) -> tuple:
+    cur.execute("""
+        SELECT id, phones, messengers, address, map_embed, socials, requisites, updated_at
+        FROM contact_page
+        ORDER BY id DESC
+        LIMIT 1
+    """)
+    contact = cur.fetchone()
+    
+    if not contact:
+        contact = {
+            'id': 1,
+            'phones': [],
+            'messengers': {},
+            'address': '',
+            'map_embed': '',
+            'socials': {},
+            'requisites': {}
+        }
+    else:
+        contact = dict(contact)
+        if 'updated_at' in contact and isinstance(contact['updated_at'], datetime):
+            contact['updated_at'] = contact['updated_at'].isoformat()
+    
+    return 200, dumps_text(contact)
+
+@with_compression
 def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     method: str = event.get('httpMethod', 'GET')
     
@@ -30,45 +61,18 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             'body': ''
         }
     
+    if method == 'GET':
+        return cached_get(
+            event, 'contact_page', 'contacts',
+            lambda: closing_cursor(get_db_connection),
+            render_contacts
+        )
+    
     conn = get_db_connection()
     cur = conn.cursor()
     
     try:
-        if method == 'GET':
-            cur.execute("""
-                SELECT id, phones, messengers, address, map_embed, socials, requisites, updated_at
-                FROM contact_page
-                ORDER BY id DESC
-                LIMIT 1
-            """)
-            contact = cur.fetchone()
-            
-            if not contact:
-                contact = {
-                    'id': 1,
-                    'phones': [],
-                    'messengers': {},
-                    'address': '',
-                    'map_embed': '',
-                    'socials': {},
-                    'requisites': {}
-                }
-            else:
-                contact = dict(contact)
-                if 'updated_at' in contact and isinstance(contact['updated_at'], datetime):
-                    contact['updated_at'] = contact['updated_at'].isoformat()
-            
-            return {
-                'statusCode': 200,
-                'headers': {
-                    'Content-Type': 'application/json',
-                    'Access-Control-Allow-Origin': '*'
-                },
-                'isBase64Encoded': False,
-                'body': json.dumps(contact)
-            }
-        
-        elif method == 'PUT':
+        if method == 'PUT':
             body_data = json.loads(event.get('body', '{}'))
             
             phones = body_data.get('phones', [])
@@ -101,6 +105,7 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             
             updated = cur.fetchone()
             conn.commit()
+            invalidate('contact_page')
             
             result = dict(updated)
             if 'updated_at' in result and isinstance(result['updated_at'], datetime):
@@ -113,13 +118,13 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                     'Access-Control-Allow-Origin': '*'
                 },
                 'isBase64Encoded': False,
-                'body': json.dumps(result)
+                'body': dumps_text(result)
             }
         
         return {
             'statusCode': 405,
             'headers': {'Access-Control-Allow-Origin': '*'},
-            'body': json.dumps({'error': 'Method not allowed'})
+            'body': dumps_text({'error': 'Method not allowed'})
         }
     
     finally:
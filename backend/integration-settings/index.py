@@ -11,6 +11,8 @@ import psycopg2
 from psycopg2.extras import RealDictCursor
 from typing import Dict, Any
 
+from encoding import dumps_text
+
 def get_db_connection():
     dsn = os.environ.get('DATABASE_URL')
     return psycopg2.connect(dsn, cursor_factory=RealDictCursor)
@@ -42,13 +44,13 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                 return {
                     'statusCode': 404,
                     'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                    'body': json.dumps({'error': 'Settings not found'})
+                    'body': dumps_text({'error': 'Settings not found'})
                 }
             
             return {
                 'statusCode': 200,
                 'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                'body': json.dumps(dict(settings), default=str)
+                'body': dumps_text(dict(settings))
             }
         
         elif method == 'PUT':
@@ -89,7 +91,7 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                 return {
                     'statusCode': 400,
                     'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                    'body': json.dumps({'error': 'No fields to update'})
+                    'body': dumps_text({'error': 'No fields to update'})
                 }
             
             update_fields.append('updated_at = CURRENT_TIMESTAMP')
@@ -103,21 +105,21 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             return {
                 'statusCode': 200,
                 'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                'body': json.dumps(dict(updated_settings), default=str)
+                'body': dumps_text(dict(updated_settings))
             }
         
         else:
             return {
                 'statusCode': 405,
                 'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                'body': json.dumps({'error': 'Method not allowed'})
+                'body': dumps_text({'error': 'Method not allowed'})
             }
     
     except Exception as e:
         return {
             'statusCode': 500,
             'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-            'body': json.dumps({'error': str(e)})
+            'body': dumps_text({'error': str(e)})
         }
     
     finally:
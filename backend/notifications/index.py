@@ -10,6 +10,8 @@ import os
 import requests
 from typing import Dict, Any, List
 
+from encoding import dumps_text
+
 def format_application_message(data: Dict[str, Any], admin_url: str) -> str:
     number = data.get('number', 'N/A')
     created_at = data.get('created_at', 'N/A')
@@ -158,7 +160,7 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         return {
             'statusCode': 405,
             'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-            'body': json.dumps({'error': 'Method not allowed'})
+            'body': dumps_text({'error': 'Method not allowed'})
         }
     
     try:
@@ -172,7 +174,7 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             return {
                 'statusCode': 400,
                 'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                'body': json.dumps({'error': 'Invalid notification type'})
+                'body': dumps_text({'error': 'Invalid notification type'})
             }
         
         admin_url = settings.get('admin_url', 'https://example.com')
@@ -209,7 +211,7 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         return {
             'statusCode': 200,
             'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-            'body': json.dumps({
+            'body': dumps_text({
                 'success': True,
                 'results': results
             })
@@ -219,5 +221,5 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         return {
             'statusCode': 500,
             'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-            'body': json.dumps({'error': str(e)})
+            'body': dumps_text({'error': str(e)})
         }
@@ -0,0 +1,149 @@
+'''
+Business: Асинхронный вариант отправки уведомлений (httpx) для долгоживущего хоста
+Args: event - dict с httpMethod, body (type, data, settings)
+      context - объект с атрибутами request_id, function_name
+Returns: HTTP response dict с результатом отправки
+'''
+
+import asyncio
+import json
+from typing import Dict, Any, AsyncIterator, List, Tuple
+
+import httpx
+
+from encoding import dumps_text
+from index import format_application_message, format_order_message
+
+JSON_HEADERS = {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'}
+
+# Клиент держит keep-alive соединения с провайдерами, пока жив event loop.
+# loop -> (клиент, генератор-владелец): asyncio.run и loop.shutdown_asyncgens()
+# закрывают генератор до закрытия loop-а, и клиент получает aclose() в своём loop-е
+_clients: Dict[Any, Tuple[httpx.AsyncClient, AsyncIterator[httpx.AsyncClient]]] = {}
+
+async def client_lifetime(client: httpx.AsyncClient) -> AsyncIterator[httpx.AsyncClient]:
+    try:
+        yield client
+    finally:
+        await client.aclose()
+
+async def get_client() -> httpx.AsyncClient:
+    loop = asyncio.get_running_loop()
+    # Клиенты закрытых loop-ов уже закрыты через shutdown_asyncgens
+    for stale in [l for l in _clients if l.is_closed()]:
+        del _clients[stale]
+    entry = _clients.get(loop)
+    if entry is None:
+        client = httpx.AsyncClient(timeout=10)
+        lifetime = client_lifetime(client)
+        entry = _clients[loop] = (client, lifetime)
+        await lifetime.__anext__()
+    return entry[0]
+
+async def post_message(url: str, payload: Dict[str, Any], ok_statuses: tuple, headers: Dict[str, str] = None) -> Dict[str, Any]:
+    try:
+        client = await get_client()
+        response = await client.post(url, json=payload, headers=headers)
+        
+        if response.status_code in ok_statuses:
+            return {'success': True}
+        return {'success': False, 'error': response.text}
+    except Exception as e:
+        return {'success': False, 'error': str(e)}
+
+async def send_telegram_message(bot_token: str, chat_ids: List[str], message: str) -> List[Dict[str, Any]]:
+    '''Все чаты отправляются параллельно, а не по очереди, как в index.send_telegram_message'''
+    url = f"https://api.telegram.org/bot{bot_token}/sendMessage"
+    results = await asyncio.gather(*(
+        post_message(url, {'chat_id': chat_id, 'text': message, 'parse_mode': 'HTML'}, (200,))
+        for chat_id in chat_ids
+    ))
+    return [{'chat_id': chat_id, **result} for chat_id, result in zip(chat_ids, results)]
+
+async def send_whatsapp_message(api_url: str, api_token: str, phone_ids: List[str], message: str) -> List[Dict[str, Any]]:
+    headers = {
+        'Authorization': f'Bearer {api_token}',
+        'Content-Type': 'application/json'
+    }
+    results = await asyncio.gather(*(
+        post_message(api_url, {'phone': phone_id, 'message': message}, (200, 201), headers)
+        for phone_id in phone_ids
+    ))
+    return [{'phone_id': phone_id, **result} for phone_id, result in zip(phone_ids, results)]
+
+async def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    method: str = event.get('httpMethod', 'POST')
+    
+    if method == 'OPTIONS':
+        return {
+            'statusCode': 200,
+            'headers': {
+                'Access-Control-Allow-Origin': '*',
+                'Access-Control-Allow-Methods': 'POST, OPTIONS',
+                'Access-Control-Allow-Headers': 'Content-Type, X-User-Id, X-Auth-Token',
+                'Access-Control-Max-Age': '86400'
+            },
+            'body': ''
+        }
+    
+    if method != 'POST':
+        return {
+            'statusCode': 405,
+            'headers': JSON_HEADERS,
+            'body': dumps_text({'error': 'Method not allowed'})
+        }
+    
+    try:
+        body = json.loads(event.get('body', '{}'))
+        
+        notification_type = body.get('type')
+        data = body.get('data', {})
+        settings = body.get('settings', {})
+        
+        if notification_type not in ['application', 'order']:
+            return {
+                'statusCode': 400,
+                'headers': JSON_HEADERS,
+                'body': dumps_text({'error': 'Invalid notification type'})
+            }
+        
+        admin_url = settings.get('admin_url', 'https://example.com')
+        
+        if notification_type == 'application':
+            message = format_application_message(data, admin_url)
+        else:
+            message = format_order_message(data, admin_url)
+        
+        telegram_bot_token = settings.get('telegram_bot_token')
+        telegram_chat_ids = settings.get('telegram_chat_ids', [])
+        whatsapp_api_url = settings.get('whatsapp_api_url')
+        whatsapp_api_token = settings.get('whatsapp_api_token')
+        whatsapp_phone_ids = settings.get('whatsapp_phone_ids', [])
+        
+        async def no_results() -> List[Dict[str, Any]]:
+            return []
+        
+        # Telegram и WhatsApp тоже отправляются одновременно
+        telegram, whatsapp = await asyncio.gather(
+            send_telegram_message(telegram_bot_token, telegram_chat_ids, message)
+            if telegram_bot_token and telegram_chat_ids else no_results(),
+            send_whatsapp_message(whatsapp_api_url, whatsapp_api_token, whatsapp_phone_ids, message)
+            if settings.get('whatsapp_enabled', False) and whatsapp_api_url and whatsapp_api_token and whatsapp_phone_ids
+            else no_results()
+        )
+        
+        return {
+            'statusCode': 200,
+            'headers': JSON_HEADERS,
+            'body': dumps_text({
+                'success': True,
+                'results': {'telegram': telegram, 'whatsapp': whatsapp}
+            })
+        }
+    
+    except Exception as e:
+        return {
+            'statusCode': 500,
+            'headers': JSON_HEADERS,
+            'body': dumps_text({'error': str(e)})
+        }
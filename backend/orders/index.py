@@ -7,10 +7,14 @@ Returns: HTTP response dict с данными заказов
 
 import json
 import os
+import re
 import psycopg2
 from psycopg2.extras import RealDictCursor
-from datetime import datetime
-from typing import Dict, Any
+from datetime import datetime, timedelta
+from typing import Dict, Any, List, Optional
+
+from encoding import dumps_text
+from compression import with_compression
 
 def get_db_connection():
     dsn = os.environ.get('DATABASE_URL')
@@ -20,6 +24,157 @@ def generate_order_number() -> str:
     now = datetime.now()
     return f"ORD-{now.strftime('%Y%m%d-%H%M%S')}"
 
+# customer_phone_normalized VARCHAR(20)
+PHONE_MAX_DIGITS = 20
+NON_DIGITS = re.compile(r'[^0-9]')
+
+class InvalidPhone(ValueError):
+    pass
+
+def normalize_phone(phone: Any) -> Optional[str]:
+    '''
+    Только цифры 0-9, 8XXXXXXXXXX и XXXXXXXXXX приводятся к 7XXXXXXXXXX (как normalize_phone в БД).
+    Номер длиннее колонки - InvalidPhone, handler отвечает 400.
+    '''
+    digits = NON_DIGITS.sub('', str(phone or ''))
+    if len(digits) == 11 and digits.startswith('8'):
+        return '7' + digits[1:]
+    if len(digits) == 10:
+        return '7' + digits
+    if len(digits) > PHONE_MAX_DIGITS:
+        raise InvalidPhone(f'phone must contain at most {PHONE_MAX_DIGITS} digits')
+    return digits or None
+
+def parse_datetime(query_params: Dict[str, Any], name: str) -> Optional[datetime]:
+    value = query_params.get(name)
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f'{name} must be an ISO 8601 date')
+
+def parse_days(query_params: Dict[str, Any]) -> Optional[int]:
+    value = query_params.get('days')
+    if not value:
+        return None
+    try:
+        days = int(value)
+    except (TypeError, ValueError):
+        raise ValueError('days must be an integer')
+    if days < 0:
+        raise ValueError('days must not be negative')
+    return days
+
+def build_created_at_filter(query_params: Dict[str, Any]) -> tuple:
+    '''
+    Условия по created_at из from/to/days - по ним Postgres отсекает лишние месячные партиции.
+    ValueError при неверных значениях - ответ 400
+    '''
+    conditions = []
+    values = []
+
+    days = parse_days(query_params)
+    start = datetime.now() - timedelta(days=days) if days is not None else parse_datetime(query_params, 'from')
+    end = parse_datetime(query_params, 'to')
+
+    if start:
+        conditions.append('created_at >= %s')
+        values.append(start)
+
+    if end:
+        conditions.append('created_at < %s')
+        values.append(end)
+
+    return conditions, values
+
+def parse_order_id(value: Any) -> int:
+    try:
+        order_id = int(value)
+    except (TypeError, ValueError):
+        raise ValueError('order id must be an integer')
+    if order_id < 1:
+        raise ValueError('order id must be positive')
+    return order_id
+
+def parse_stats_period(query_params: Dict[str, Any]) -> tuple:
+    '''Период status_stats: по умолчанию последние 30 дней; ValueError при неверных датах'''
+    now = datetime.now()
+    return parse_datetime(query_params, 'from') or now - timedelta(days=30), parse_datetime(query_params, 'to') or now
+
+def get_order_timeline(cur, order_id: int) -> list:
+    cur.execute(
+        """
+        SELECT
+            from_status,
+            to_status,
+            notes,
+            changed_at,
+            EXTRACT(EPOCH FROM COALESCE(LEAD(changed_at) OVER w, CURRENT_TIMESTAMP) - changed_at) AS seconds_in_status,
+            LEAD(changed_at) OVER w IS NULL AS is_current
+        FROM order_status_history
+        WHERE order_id = %s
+        WINDOW w AS (ORDER BY changed_at, id)
+        ORDER BY changed_at, id
+        """,
+        (order_id,)
+    )
+    return [dict(row) for row in cur.fetchall()]
+
+def get_status_stats(cur, start: datetime, end: datetime, include_open: bool) -> Dict[str, Any]:
+    '''p50/p90 времени в статусе по переходам за период, считается целиком в SQL'''
+    
+    cur.execute(
+        """
+        WITH spans AS (
+            SELECT
+                to_status AS status,
+                changed_at,
+                EXTRACT(EPOCH FROM COALESCE(LEAD(changed_at) OVER w, CURRENT_TIMESTAMP) - changed_at) AS seconds,
+                LEAD(changed_at) OVER w IS NULL AS is_open
+            FROM order_status_history
+            WHERE order_id IN (
+                SELECT order_id FROM order_status_history WHERE changed_at >= %s AND changed_at < %s
+            )
+            WINDOW w AS (PARTITION BY order_id ORDER BY changed_at, id)
+        )
+        SELECT
+            status,
+            COUNT(*) AS spans,
+            percentile_cont(0.5) WITHIN GROUP (ORDER BY seconds) AS p50_seconds,
+            percentile_cont(0.9) WITHIN GROUP (ORDER BY seconds) AS p90_seconds,
+            AVG(seconds) AS avg_seconds
+        FROM spans
+        WHERE changed_at >= %s AND changed_at < %s AND (%s OR NOT is_open)
+        GROUP BY status
+        ORDER BY status
+        """,
+        (start, end, start, end, include_open)
+    )
+    
+    return {
+        'from': start.isoformat(),
+        'to': end.isoformat(),
+        'include_open': include_open,
+        'statuses': [
+            {key: float(value) if key.endswith('_seconds') and value is not None else value for key, value in row.items()}
+            for row in cur.fetchall()
+        ]
+    }
+
+def render_json_list(cur, query: str, values: List[Any], order_by: str) -> str:
+    '''
+    Готовый JSON-массив от Postgres (json_agg): строки не превращаются
+    в dict и не проходят через энкодер, текст уходит в ответ как есть.
+    order_by ссылается на колонки подзапроса через алиас t.
+    '''
+    cur.execute(
+        f"SELECT COALESCE(json_agg(t ORDER BY {order_by}), '[]'::json)::text AS body FROM ({query}) t",
+        values
+    )
+    return cur.fetchone()['body']
+
+@with_compression
 def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     method: str = event.get('httpMethod', 'GET')
     path_params = event.get('pathParams', {})
@@ -43,6 +198,40 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         if method == 'GET':
             order_id = path_params.get('id')
             
+            query_params = event.get('queryStringParameters', {}) or {}
+            
+            if order_id and query_params.get('view') == 'timeline':
+                try:
+                    timeline_order_id = parse_order_id(order_id)
+                except ValueError as e:
+                    return {
+                        'statusCode': 400,
+                        'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                        'body': dumps_text({'error': str(e)})
+                    }
+                
+                return {
+                    'statusCode': 200,
+                    'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                    'body': dumps_text({'order_id': timeline_order_id, 'timeline': get_order_timeline(cur, timeline_order_id)})
+                }
+            
+            if not order_id and query_params.get('view') == 'status_stats':
+                try:
+                    start, end = parse_stats_period(query_params)
+                except ValueError as e:
+                    return {
+                        'statusCode': 400,
+                        'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                        'body': dumps_text({'error': str(e)})
+                    }
+                
+                return {
+                    'statusCode': 200,
+                    'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                    'body': dumps_text(get_status_stats(cur, start, end, query_params.get('include_open') == 'true'))
+                }
+            
             if order_id:
                 cur.execute("SELECT * FROM orders WHERE id = %s", (order_id,))
                 order = cur.fetchone()
@@ -51,32 +240,54 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                     return {
                         'statusCode': 404,
                         'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                        'body': json.dumps({'error': 'Order not found'})
+                        'body': dumps_text({'error': 'Order not found'})
                     }
                 
                 return {
                     'statusCode': 200,
                     'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                    'body': json.dumps(dict(order), default=str)
+                    'body': dumps_text(dict(order))
                 }
             else:
-                query_params = event.get('queryStringParameters', {}) or {}
                 status = query_params.get('status')
+                try:
+                    conditions, values = build_created_at_filter(query_params)
+                except ValueError as e:
+                    return {
+                        'statusCode': 400,
+                        'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                        'body': dumps_text({'error': str(e)})
+                    }
                 
                 if status:
-                    cur.execute(
-                        "SELECT * FROM orders WHERE status = %s ORDER BY created_at DESC",
-                        (status,)
-                    )
-                else:
-                    cur.execute("SELECT * FROM orders ORDER BY created_at DESC")
+                    conditions.insert(0, 'status = %s')
+                    values.insert(0, status)
+                
+                if query_params.get('phone'):
+                    conditions.insert(0, 'customer_phone_normalized = %s')
+                    values.insert(0, normalize_phone(query_params['phone']))
+                
+                query = "SELECT * FROM orders"
+                if conditions:
+                    query += " WHERE " + " AND ".join(conditions)
+                
+                if query_params.get('render') == 'db':
+                    return {
+                        'statusCode': 200,
+                        'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                        'body': render_json_list(cur, query, values, 't.created_at DESC')
+                    }
+                
+                query += " ORDER BY created_at DESC"
+                
+                cur.execute(query, values)
                 
                 orders = cur.fetchall()
                 
                 return {
                     'statusCode': 200,
                     'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                    'body': json.dumps([dict(ord) for ord in orders], default=str)
+                    'body': dumps_text([dict(ord) for ord in orders])
                 }
         
         elif method == 'POST':
@@ -87,7 +298,7 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                 return {
                     'statusCode': 400,
                     'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                    'body': json.dumps({'error': 'from_application_id is required'})
+                    'body': dumps_text({'error': 'from_application_id is required'})
                 }
             
             cur.execute("SELECT * FROM applications WHERE id = %s", (from_application_id,))
@@ -97,25 +308,31 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                 return {
                     'statusCode': 404,
                     'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                    'body': json.dumps({'error': 'Application not found'})
+                    'body': dumps_text({'error': 'Application not found'})
                 }
             
             if application['status'] != 'approved':
                 return {
                     'statusCode': 400,
                     'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                    'body': json.dumps({'error': 'Application must be approved before creating order'})
+                    'body': dumps_text({'error': 'Application must be approved before creating order'})
                 }
             
             number = generate_order_number()
             
             cur.execute(
                 """
-                INSERT INTO orders 
-                (number, from_application_id, customer_name, customer_phone, customer_address, 
-                 customer_comment, items, total_amount, status)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, 'active')
-                RETURNING *
+                WITH new_order AS (
+                    INSERT INTO orders
+                    (number, from_application_id, customer_name, customer_phone, customer_address,
+                     customer_comment, items, total_amount, status, customer_phone_normalized)
+                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, 'active', %s)
+                    RETURNING *
+                ), history AS (
+                    INSERT INTO order_status_history (order_id, from_status, to_status, changed_at)
+                    SELECT id, NULL, status, created_at FROM new_order
+                )
+                SELECT * FROM new_order
                 """,
                 (
                     number,
@@ -125,7 +342,8 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                     application['customer_address'],
                     application['customer_comment'],
                     json.dumps(application['items']),
-                    application['total_amount']
+                    application['total_amount'],
+                    normalize_phone(application['customer_phone'])
                 )
             )
             
@@ -141,7 +359,7 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             return {
                 'statusCode': 201,
                 'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                'body': json.dumps(dict(new_order), default=str)
+                'body': dumps_text(dict(new_order))
             }
         
         elif method == 'PUT':
@@ -151,7 +369,7 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                 return {
                     'statusCode': 400,
                     'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                    'body': json.dumps({'error': 'Order ID is required'})
+                    'body': dumps_text({'error': 'Order ID is required'})
                 }
             
             body = json.loads(event.get('body', '{}'))
@@ -171,15 +389,29 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                 return {
                     'statusCode': 400,
                     'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                    'body': json.dumps({'error': 'No fields to update'})
+                    'body': dumps_text({'error': 'No fields to update'})
                 }
             
             update_fields.append('updated_at = CURRENT_TIMESTAMP')
-            values.append(order_id)
             
-            query = f"UPDATE orders SET {', '.join(update_fields)} WHERE id = %s RETURNING *"
+            # Обновление и запись перехода статуса в журнал - одним запросом
+            query = f"""
+                WITH previous AS (
+                    SELECT id, status FROM orders WHERE id = %s FOR UPDATE
+                ), updated_order AS (
+                    UPDATE orders o SET {', '.join(update_fields)}
+                    FROM previous p
+                    WHERE o.id = p.id
+                    RETURNING o.*, p.status AS previous_status
+                ), history AS (
+                    INSERT INTO order_status_history (order_id, from_status, to_status, notes)
+                    SELECT id, previous_status, status, notes FROM updated_order
+                    WHERE status IS DISTINCT FROM previous_status
+                )
+                SELECT * FROM updated_order
+            """
             
-            cur.execute(query, values)
+            cur.execute(query, [order_id] + values)
             updated_order = cur.fetchone()
             conn.commit()
             
@@ -187,27 +419,34 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                 return {
                     'statusCode': 404,
                     'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                    'body': json.dumps({'error': 'Order not found'})
+                    'body': dumps_text({'error': 'Order not found'})
                 }
             
             return {
                 'statusCode': 200,
                 'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                'body': json.dumps(dict(updated_order), default=str)
+                'body': dumps_text({k: v for k, v in dict(updated_order).items() if k != 'previous_status'})
             }
         
         else:
             return {
                 'statusCode': 405,
                 'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                'body': json.dumps({'error': 'Method not allowed'})
+                'body': dumps_text({'error': 'Method not allowed'})
             }
     
+    except InvalidPhone as e:
+        return {
+            'statusCode': 400,
+            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+            'body': dumps_text({'error': str(e)})
+        }
+    
     except Exception as e:
         return {
             'statusCode': 500,
             'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-            'body': json.dumps({'error': str(e)})
+            'body': dumps_text({'error': str(e)})
         }
     
     finally:
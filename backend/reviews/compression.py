@@ -0,0 +1,107 @@
+'''
+Сжатие ответов функций (gzip / brotli) по Accept-Encoding.
+
+Модуль лежит одинаковой копией в каждой функции, которая его использует
+(функции деплоятся по отдельности и не видят соседние папки).
+
+Сжатое тело отдаётся base64-строкой с isBase64Encoded=True - так его
+ждёт рантайм функций. Если ответ собран из кэша, сжатые варианты
+кладутся в словарь рядом со снимком и считаются один раз на версию.
+'''
+import base64
+import functools
+import gzip
+import os
+from typing import Any, Callable, Dict, Optional
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+MIN_SIZE = int(os.environ.get('COMPRESSION_MIN_BYTES', 1024))
+COMPRESSIBLE_TYPES = ('application/json', 'text/')
+# Разово для кэша можно потратить больше CPU, чем на каждый запрос
+REQUEST_LEVELS = {'br': 4, 'gzip': 6}
+CACHED_LEVELS = {'br': 9, 'gzip': 9}
+
+def header(headers: Optional[Dict[str, Any]], name: str) -> Optional[str]:
+    for key, value in (headers or {}).items():
+        if key.lower() == name.lower():
+            return value
+    return None
+
+def accepted_encodings(accept_encoding: str) -> Dict[str, float]:
+    accepted = {}
+    for part in accept_encoding.split(','):
+        coding, _, params = part.strip().partition(';')
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        if coding:
+            accepted[coding.strip().lower()] = quality
+    return accepted
+
+def negotiate(event: Dict[str, Any]) -> Optional[str]:
+    accepted = accepted_encodings(header(event.get('headers'), 'Accept-Encoding') or '')
+    if brotli is not None and accepted.get('br', 0) > 0:
+        return 'br'
+    if accepted.get('gzip', accepted.get('*', 0)) > 0:
+        return 'gzip'
+    return None
+
+def compress(data: bytes, encoding: str, level: int) -> bytes:
+    if encoding == 'br':
+        return brotli.compress(data, quality=level)
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+def is_compressible(response: Dict[str, Any]) -> bool:
+    headers = response.get('headers') or {}
+    content_type = header(headers, 'Content-Type') or ''
+    body = response.get('body')
+    return (
+        response.get('statusCode', 200) not in (204, 304)
+        and not response.get('isBase64Encoded')
+        and not header(headers, 'Content-Encoding')
+        and isinstance(body, str)
+        and len(body) >= MIN_SIZE
+        and content_type.startswith(COMPRESSIBLE_TYPES)
+    )
+
+def compress_response(event: Dict[str, Any], response: Dict[str, Any],
+                      variants: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+    '''
+    variants - словарь сжатых вариантов рядом со снимком в кэше
+    ({encoding: base64-тело}); без него сжатие делается на каждый запрос.
+    '''
+    if not is_compressible(response):
+        return response
+    
+    headers = {**(response.get('headers') or {}), 'Vary': 'Accept-Encoding'}
+    encoding = negotiate(event)
+    if not encoding:
+        return {**response, 'headers': headers}
+    
+    encoded = variants.get(encoding) if variants is not None else None
+    if encoded is None:
+        levels = CACHED_LEVELS if variants is not None else REQUEST_LEVELS
+        compressed = compress(response['body'].encode('utf-8'), encoding, levels[encoding])
+        if len(compressed) >= len(response['body']):
+            return {**response, 'headers': headers}
+        encoded = base64.b64encode(compressed).decode('ascii')
+        if variants is not None:
+            variants[encoding] = encoded
+    
+    headers['Content-Encoding'] = encoding
+    return {**response, 'headers': headers, 'body': encoded, 'isBase64Encoded': True}
+
+def with_compression(handler: Callable[[Dict[str, Any], Any], Dict[str, Any]]):
+    '''Оборачивает handler(event, context): ответы, ещё не сжатые кэшем, сжимаются здесь'''
+    @functools.wraps(handler)
+    def wrapper(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+        return compress_response(event, handler(event, context))
+    return wrapper
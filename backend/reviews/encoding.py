@@ -0,0 +1,44 @@
+'''
+Общий JSON-энкодер ответов.
+
+Модуль лежит одинаковой копией в каждой функции (функции деплоятся по
+отдельности и не видят соседние папки).
+
+Правила одни для всех обработчиков: datetime/date/time - ISO 8601,
+Decimal - число, UUID - строка, memoryview/bytes (bytea) - base64.
+Если установлен orjson, кодирует он, иначе stdlib json с тем же выводом.
+'''
+import base64
+import json
+from datetime import date, datetime, time
+from decimal import Decimal
+from typing import Any
+from uuid import UUID
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+def default(obj: Any) -> Any:
+    if isinstance(obj, (datetime, date, time)):
+        return obj.isoformat()
+    if isinstance(obj, Decimal):
+        return int(obj) if obj == obj.to_integral_value() else float(obj)
+    if isinstance(obj, UUID):
+        return str(obj)
+    if isinstance(obj, (memoryview, bytes, bytearray)):
+        return base64.b64encode(bytes(obj)).decode('ascii')
+    if isinstance(obj, (set, frozenset, tuple)):
+        return list(obj)
+    raise TypeError(f'Type {type(obj).__name__} is not JSON serializable')
+
+def dumps(obj: Any) -> bytes:
+    '''Сериализует obj в компактный UTF-8 JSON'''
+    if orjson is not None:
+        return orjson.dumps(obj, default=default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, default=default, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+def dumps_text(obj: Any) -> str:
+    '''Для поля body ответа функции, которое рантайм ждёт строкой'''
+    return dumps(obj).decode('utf-8')
@@ -1,9 +1,364 @@
+import base64
 import json
 import os
+import random
+import re
+import threading
+from contextlib import nullcontext
+from datetime import datetime, timedelta
 import psycopg2
 import psycopg2.extras
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional, Sequence
 
+from spam import shingles, minhash, lsh_buckets, jaccard
+from httpcache import cached_get, cache_key, invalidate
+from encoding import dumps_text
+from compression import with_compression
+
+REVIEW_COLUMNS = 'id, name, email, phone, rating, text, photos, status, created_at, spam_score, spam_reason'
+
+# Серверные prepared statements: план строится один раз на соединение,
+# параметры передаются отдельно от текста запроса
+STATEMENTS = {
+    'reviews_list': (
+        '',
+        f'SELECT {REVIEW_COLUMNS} FROM reviews ORDER BY created_at DESC'
+    ),
+    'reviews_list_by_status': (
+        'text',
+        f'SELECT {REVIEW_COLUMNS} FROM reviews WHERE status = $1 ORDER BY created_at DESC'
+    ),
+    'reviews_public_first': (
+        'integer',
+        "SELECT id, name, rating, text, photos, created_at FROM reviews "
+        "WHERE status = 'approved' ORDER BY created_at DESC, id DESC LIMIT $1"
+    ),
+    'reviews_public_after': (
+        'timestamp, integer, integer',
+        "SELECT id, name, rating, text, photos, created_at FROM reviews "
+        "WHERE status = 'approved' AND (created_at, id) < ($1, $2) "
+        "ORDER BY created_at DESC, id DESC LIMIT $3"
+    ),
+    'reviews_rating_summary': (
+        '',
+        'SELECT rating, review_count FROM review_rating_summary ORDER BY rating'
+    ),
+    # Отзыв и его LSH-полосы пишутся одним оператором
+    'reviews_insert': (
+        'text, text, text, integer, text, text[], text, real, text, smallint[], bigint[]',
+        "WITH inserted AS ("
+        " INSERT INTO reviews (name, email, phone, rating, text, photos, status, spam_score, spam_reason)"
+        " VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9) RETURNING id"
+        "), bands AS ("
+        " INSERT INTO review_minhash_bands (band, bucket, review_id)"
+        " SELECT t.band, t.bucket, inserted.id FROM inserted, unnest($10, $11) AS t(band, bucket)"
+        ") SELECT id FROM inserted"
+    ),
+    'reviews_similar_candidates': (
+        'smallint[], bigint[], interval',
+        "SELECT r.id, r.text FROM reviews r WHERE r.id IN ("
+        " SELECT review_id FROM review_minhash_bands"
+        " WHERE (band, bucket) IN (SELECT * FROM unnest($1, $2))"
+        " AND created_at >= CURRENT_TIMESTAMP - $3"
+        " GROUP BY review_id ORDER BY COUNT(*) DESC LIMIT 10"
+        ")"
+    ),
+    'reviews_rate_bump': (
+        'text[], timestamp, timestamp',
+        "WITH bumped AS ("
+        " INSERT INTO review_submission_counters (subject, window_start, count)"
+        " SELECT unnest($1), $2, 1"
+        " ON CONFLICT (subject, window_start)"
+        " DO UPDATE SET count = review_submission_counters.count + 1"
+        " RETURNING subject, window_start, count"
+        ") SELECT b.subject, b.count + COALESCE(("
+        " SELECT SUM(c.count) FROM review_submission_counters c"
+        " WHERE c.subject = b.subject AND c.window_start >= $3 AND c.window_start < b.window_start"
+        "), 0) FROM bumped b"
+    ),
+    'reviews_prune_spam_index': (
+        'interval, timestamp',
+        "WITH bands AS (DELETE FROM review_minhash_bands WHERE created_at < CURRENT_TIMESTAMP - $1)"
+        " DELETE FROM review_submission_counters WHERE window_start < $2"
+    ),
+    'reviews_update_status': (
+        'text, integer',
+        'UPDATE reviews SET status = $1, updated_at = CURRENT_TIMESTAMP WHERE id = $2'
+    ),
+    'reviews_delete': (
+        'integer',
+        'DELETE FROM reviews WHERE id = $1'
+    ),
+    # Массовая модерация: один оператор на пачку, сводка рейтинга
+    # пересчитывается триггером один раз. Возвращают счётчики по прежнему статусу
+    'reviews_bulk_status_by_ids': (
+        'text, integer[]',
+        "WITH changed AS ("
+        " UPDATE reviews r SET status = $1, updated_at = CURRENT_TIMESTAMP"
+        " FROM reviews old"
+        " WHERE old.id = r.id AND r.id = ANY($2) AND r.status <> $1"
+        " RETURNING old.status AS previous"
+        ") SELECT previous, COUNT(*) FROM changed GROUP BY previous"
+    ),
+    'reviews_bulk_status_by_filter': (
+        'text, text, timestamp, timestamp, text',
+        "WITH changed AS ("
+        " UPDATE reviews r SET status = $1, updated_at = CURRENT_TIMESTAMP"
+        " FROM reviews old"
+        " WHERE old.id = r.id AND r.status <> $1"
+        " AND ($2::text IS NULL OR r.status = $2)"
+        " AND ($3::timestamp IS NULL OR r.created_at >= $3)"
+        " AND ($4::timestamp IS NULL OR r.created_at < $4)"
+        " AND ($5::text IS NULL OR r.text ILIKE '%' || $5 || '%' OR r.name ILIKE '%' || $5 || '%')"
+        " RETURNING old.status AS previous"
+        ") SELECT previous, COUNT(*) FROM changed GROUP BY previous"
+    ),
+    'reviews_bulk_delete_by_ids': (
+        'integer[]',
+        "WITH deleted AS (DELETE FROM reviews WHERE id = ANY($1) RETURNING status)"
+        " SELECT status, COUNT(*) FROM deleted GROUP BY status"
+    ),
+    'reviews_bulk_delete_by_filter': (
+        'text, timestamp, timestamp, text',
+        "WITH deleted AS ("
+        " DELETE FROM reviews"
+        " WHERE ($1::text IS NULL OR status = $1)"
+        " AND ($2::timestamp IS NULL OR created_at >= $2)"
+        " AND ($3::timestamp IS NULL OR created_at < $3)"
+        " AND ($4::text IS NULL OR text ILIKE '%' || $4 || '%' OR name ILIKE '%' || $4 || '%')"
+        " RETURNING status"
+        ") SELECT status, COUNT(*) FROM deleted GROUP BY status"
+    ),
+}
+
+REVIEW_STATUSES = ['pending', 'approved', 'rejected']
+BULK_MAX_IDS = 1000
+
+# Соединение живёт между вызовами, пока инстанс функции тёплый.
+# Своё на каждый поток: под многопоточным хостом PREPARE не должен гоняться
+_local = threading.local()
+
+def get_connection(dsn: str):
+    conn = getattr(_local, 'conn', None)
+    if conn is None or conn.closed:
+        conn = psycopg2.connect(dsn)
+        conn.autocommit = True
+        _local.conn = conn
+        _local.prepared = set()
+    return conn
+
+def reset_connection() -> None:
+    conn = getattr(_local, 'conn', None)
+    if conn is not None and not conn.closed:
+        conn.close()
+    _local.conn = None
+    _local.prepared = set()
+
+def execute(cur, name: str, args: Sequence[Any] = ()) -> None:
+    prepared = _local.prepared
+    if name not in prepared:
+        types, sql = STATEMENTS[name]
+        signature = f'({types})' if types else ''
+        cur.execute(f'PREPARE {name}{signature} AS {sql}')
+        prepared.add(name)
+    
+    if args:
+        placeholders = ', '.join(['%s'] * len(args))
+        cur.execute(f'EXECUTE {name} ({placeholders})', tuple(args))
+    else:
+        cur.execute(f'EXECUTE {name}')
+
+# Спам-фильтр: похожесть по Jaccard на отзывы за SIMILARITY_WINDOW_DAYS,
+# частота отправок по телефону/email за час окнами по 10 минут
+DUPLICATE_THRESHOLD = 0.8
+SUSPICIOUS_THRESHOLD = 0.5
+SIMILARITY_WINDOW_DAYS = 30
+RATE_WINDOW = timedelta(hours=1)
+RATE_BUCKET_SECONDS = 600
+# REVIEW_RATE_LIMIT=0 отключает ограничение (например, для тестового стенда)
+RATE_LIMIT = int(os.environ.get('REVIEW_RATE_LIMIT', 3))
+# Зарезервированные домены (RFC 2606, RFC 6761) не бывают настоящими ящиками -
+# ими пользуются фикстуры, счётчик по email для них не ведётся
+RATE_EXEMPT_DOMAINS = ('example.com', 'example.net', 'example.org')
+RATE_EXEMPT_TLDS = ('.test', '.example', '.invalid', '.localhost')
+PRUNE_PROBABILITY = 0.02
+EPOCH = datetime(1970, 1, 1)
+
+PUBLIC_PAGE_SIZE = 20
+PUBLIC_MAX_PAGE_SIZE = 50
+
+def encode_cursor(created_at: datetime, review_id: int) -> str:
+    raw = f'{created_at.isoformat()}|{review_id}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+def decode_cursor(cursor: str) -> Optional[tuple]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        created_at, review_id = raw.rsplit('|', 1)
+        return datetime.fromisoformat(created_at), int(review_id)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+def get_rating_summary(cur) -> Dict[str, Any]:
+    '''Сводка поддерживается триггерами в review_rating_summary, здесь только 5 строк'''
+    execute(cur, 'reviews_rating_summary')
+    histogram = {str(rating): count for rating, count in cur.fetchall()}
+    total = sum(histogram.values())
+    weighted = sum(int(rating) * count for rating, count in histogram.items())
+    return {
+        'count': total,
+        'average': round(weighted / total, 2) if total else None,
+        'histogram': histogram
+    }
+
+def get_public_feed(cur, params: Dict[str, Any]) -> Dict[str, Any]:
+    '''
+    Одобренные отзывы без контактов автора, страницами по (created_at, id).
+    Сводка рейтинга приходит с первой страницей.
+    '''
+    try:
+        limit = min(max(int(params.get('limit', PUBLIC_PAGE_SIZE)), 1), PUBLIC_MAX_PAGE_SIZE)
+    except ValueError:
+        limit = PUBLIC_PAGE_SIZE
+    
+    cursor = params.get('cursor')
+    if cursor:
+        position = decode_cursor(cursor)
+        if not position:
+            return {'statusCode': 400, 'body': {'error': 'Invalid cursor'}}
+        execute(cur, 'reviews_public_after', (position[0], position[1], limit + 1))
+    else:
+        execute(cur, 'reviews_public_first', (limit + 1,))
+    
+    rows = cur.fetchall()
+    page = rows[:limit]
+    result = {
+        'reviews': [
+            {
+                'id': row[0],
+                'name': row[1],
+                'rating': row[2],
+                'text': row[3],
+                'photos': row[4] or [],
+                'created_at': row[5].isoformat() if row[5] else None
+            }
+            for row in page
+        ],
+        'next_cursor': encode_cursor(page[-1][5], page[-1][0]) if len(rows) > limit else None
+    }
+    if not cursor:
+        result['summary'] = get_rating_summary(cur)
+    return {'statusCode': 200, 'body': result}
+
+def parse_bulk_filter(raw: Any) -> Optional[tuple]:
+    '''filter: {status, from, to, search} -> (status, from, to, search); хотя бы одно условие обязательно'''
+    if not isinstance(raw, dict):
+        return None
+    status = raw.get('status') or None
+    if status is not None and status not in REVIEW_STATUSES:
+        return None
+    try:
+        created_from = datetime.fromisoformat(raw['from']) if raw.get('from') else None
+        created_to = datetime.fromisoformat(raw['to']) if raw.get('to') else None
+    except (TypeError, ValueError):
+        return None
+    search = (raw.get('search') or '').strip() or None
+    
+    criteria = (status, created_from, created_to, search)
+    if all(value is None for value in criteria):
+        return None
+    return criteria
+
+def bulk_moderate(cur, action: str, body_data: Dict[str, Any]) -> Dict[str, Any]:
+    '''
+    Одобрение/отклонение (action = статус) или удаление (action = 'delete')
+    списка ids либо всего, что подходит под filter, одним оператором
+    '''
+    if 'ids' in body_data:
+        ids = [parse_review_id(value) for value in body_data.get('ids') or []]
+        if not ids or None in ids or len(ids) > BULK_MAX_IDS:
+            return {'statusCode': 400, 'body': {'error': f'ids must be a list of 1..{BULK_MAX_IDS} integers'}}
+        if action == 'delete':
+            execute(cur, 'reviews_bulk_delete_by_ids', (ids,))
+        else:
+            execute(cur, 'reviews_bulk_status_by_ids', (action, ids))
+    else:
+        criteria = parse_bulk_filter(body_data.get('filter'))
+        if not criteria:
+            return {'statusCode': 400, 'body': {'error': 'filter needs at least one of status, from, to, search'}}
+        if action == 'delete':
+            execute(cur, 'reviews_bulk_delete_by_filter', criteria)
+        else:
+            execute(cur, 'reviews_bulk_status_by_filter', (action, *criteria))
+    
+    by_status = {status: count for status, count in cur.fetchall()}
+    invalidate('reviews_public')
+    return {'statusCode': 200, 'body': {'affected': sum(by_status.values()), 'by_status': by_status}}
+
+def is_reserved_email(email: str) -> bool:
+    domain = email.rpartition('@')[2]
+    return domain in RATE_EXEMPT_DOMAINS or domain.endswith(RATE_EXEMPT_TLDS)
+
+def rate_subjects(email: Optional[str], phone: Optional[str]) -> List[str]:
+    subjects = []
+    if email and not is_reserved_email(email.strip().lower()):
+        subjects.append('email:' + email.strip().lower())
+    digits = re.sub(r'\D', '', phone or '')
+    if len(digits) >= 10:
+        subjects.append('phone:' + digits[-10:])
+    return subjects
+
+def is_rate_limited(cur, subjects: List[str]) -> bool:
+    '''Увеличивает счётчик текущего окна и сверяет сумму за последний час с лимитом'''
+    if not subjects or RATE_LIMIT <= 0:
+        return False
+    now = datetime.utcnow()
+    epoch_seconds = int((now - EPOCH).total_seconds())
+    window_start = EPOCH + timedelta(seconds=epoch_seconds - epoch_seconds % RATE_BUCKET_SECONDS)
+    execute(cur, 'reviews_rate_bump', (subjects, window_start, now - RATE_WINDOW))
+    return any(total > RATE_LIMIT for _, total in cur.fetchall())
+
+def score_similarity(cur, text: str) -> Dict[str, Any]:
+    '''
+    MinHash-подпись текста, кандидаты через LSH-полосы, точный Jaccard по
+    шинглам только для кандидатов. Возвращает поля для вставки отзыва.
+    '''
+    text_shingles = shingles(text)
+    bands, buckets = lsh_buckets(minhash(text_shingles))
+    execute(cur, 'reviews_similar_candidates', (bands, buckets, timedelta(days=SIMILARITY_WINDOW_DAYS)))
+    best_id, best_score = None, 0.0
+    for candidate_id, candidate_text in cur.fetchall():
+        score = jaccard(text_shingles, shingles(candidate_text))
+        if score > best_score:
+            best_id, best_score = candidate_id, score
+    
+    status, reason = 'pending', None
+    if best_score >= DUPLICATE_THRESHOLD:
+        status, reason = 'rejected', f'duplicate of #{best_id}'
+    elif best_score >= SUSPICIOUS_THRESHOLD:
+        reason = f'similar to #{best_id}'
+    
+    return {
+        'status': status,
+        'spam_score': round(best_score, 3),
+        'spam_reason': reason,
+        'bands': bands,
+        'buckets': buckets
+    }
+
+def prune_spam_index(cur) -> None:
+    execute(cur, 'reviews_prune_spam_index', (
+        timedelta(days=SIMILARITY_WINDOW_DAYS),
+        datetime.utcnow() - RATE_WINDOW
+    ))
+
+def parse_review_id(value: Any) -> Optional[int]:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+@with_compression
 def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     '''
     Business: API для управления отзывами клиентов
@@ -31,25 +386,36 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         return {
             'statusCode': 500,
             'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-            'body': json.dumps({'error': 'DATABASE_URL not configured'}),
+            'body': dumps_text({'error': 'DATABASE_URL not configured'}),
             'isBase64Encoded': False
         }
     
-    conn = None
     try:
-        conn = psycopg2.connect(dsn)
+        conn = get_connection(dsn)
         cur = conn.cursor()
         
         if method == 'GET':
             params = event.get('queryStringParameters') or {}
             status = params.get('status')
             
-            if status and status in ['pending', 'approved', 'rejected']:
-                query = f"SELECT id, name, email, phone, rating, text, photos, status, created_at FROM reviews WHERE status = '{status}' ORDER BY created_at DESC"
+            if params.get('view') == 'public':
+                def render_feed(feed_cur) -> tuple:
+                    feed = get_public_feed(feed_cur, params)
+                    return feed['statusCode'], dumps_text(feed['body'])
+                
+                response = cached_get(
+                    event, 'reviews_public', cache_key(event, 'view', 'limit', 'cursor'),
+                    lambda: nullcontext(cur),
+                    render_feed
+                )
+                cur.close()
+                return response
+            
+            if status and status in REVIEW_STATUSES:
+                execute(cur, 'reviews_list_by_status', (status,))
             else:
-                query = "SELECT id, name, email, phone, rating, text, photos, status, created_at FROM reviews ORDER BY created_at DESC"
+                execute(cur, 'reviews_list')
             
-            cur.execute(query)
             rows = cur.fetchall()
             reviews = []
             for row in rows:
@@ -62,31 +428,36 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                     'text': row[5],
                     'photos': row[6] or [],
                     'status': row[7],
-                    'created_at': row[8].isoformat() if row[8] else None
+                    'created_at': row[8].isoformat() if row[8] else None,
+                    'spam_score': row[9],
+                    'spam_reason': row[10]
                 })
             
             cur.close()
             return {
                 'statusCode': 200,
                 'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                'body': json.dumps({'reviews': reviews}),
+                'body': dumps_text({'reviews': reviews}),
                 'isBase64Encoded': False
             }
         
         elif method == 'POST':
             body_data = json.loads(event.get('body', '{}'))
-            name = body_data.get('name', '').replace("'", "''")
-            email = body_data.get('email', '').replace("'", "''") if body_data.get('email') else None
-            phone = body_data.get('phone', '').replace("'", "''") if body_data.get('phone') else None
+            name = body_data.get('name', '')
+            email = body_data.get('email') or None
+            phone = body_data.get('phone') or None
             rating = int(body_data.get('rating', 5))
-            text = body_data.get('text', '').replace("'", "''")
-            photos = body_data.get('photos', [])
+            text = body_data.get('text', '')
+            photos = [p for p in body_data.get('photos') or [] if isinstance(p, str)]
+            
+            # Счётчик растёт и для невалидных отправок: перебор форм - тоже флуд
+            rate_limited = is_rate_limited(cur, rate_subjects(email, phone))
             
             if not name or not text:
                 return {
                     'statusCode': 400,
                     'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                    'body': json.dumps({'error': 'name and text are required'}),
+                    'body': dumps_text({'error': 'name and text are required'}),
                     'isBase64Encoded': False
                 }
             
@@ -94,75 +465,102 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                 return {
                     'statusCode': 400,
                     'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                    'body': json.dumps({'error': 'either email or phone is required'}),
+                    'body': dumps_text({'error': 'either email or phone is required'}),
                     'isBase64Encoded': False
                 }
             
-            photos_array = 'ARRAY[' + ','.join([f"'{p.replace(chr(39), chr(39)*2)}'" for p in photos]) + ']' if photos else 'ARRAY[]::text[]'
-            
-            email_val = f"'{email}'" if email else 'NULL'
-            phone_val = f"'{phone}'" if phone else 'NULL'
-            
-            query = f"INSERT INTO reviews (name, email, phone, rating, text, photos, status) VALUES ('{name}', {email_val}, {phone_val}, {rating}, '{text}', {photos_array}, 'pending') RETURNING id"
+            if rate_limited:
+                cur.close()
+                return {
+                    'statusCode': 429,
+                    'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                    'body': dumps_text({'error': 'Too many reviews, try again later'}),
+                    'isBase64Encoded': False
+                }
             
-            cur.execute(query)
+            spam_check = score_similarity(cur, text)
+            execute(cur, 'reviews_insert', (
+                name, email, phone, rating, text, photos,
+                spam_check['status'], spam_check['spam_score'], spam_check['spam_reason'],
+                spam_check['bands'], spam_check['buckets']
+            ))
             review_id = cur.fetchone()[0]
-            conn.commit()
+            
+            if random.random() < PRUNE_PROBABILITY:
+                prune_spam_index(cur)
             cur.close()
             
             return {
                 'statusCode': 201,
                 'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                'body': json.dumps({'id': review_id, 'message': 'Review created'}),
+                'body': dumps_text({'id': review_id, 'message': 'Review created', 'status': spam_check['status']}),
                 'isBase64Encoded': False
             }
         
         elif method == 'PUT':
             body_data = json.loads(event.get('body', '{}'))
-            review_id = body_data.get('id')
+            review_id = parse_review_id(body_data.get('id'))
             status = body_data.get('status')
             
-            if not review_id or not status or status not in ['pending', 'approved', 'rejected']:
+            if ('ids' in body_data or 'filter' in body_data) and status in REVIEW_STATUSES:
+                result = bulk_moderate(cur, status, body_data)
+                cur.close()
+                return {
+                    'statusCode': result['statusCode'],
+                    'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                    'body': dumps_text(result['body']),
+                    'isBase64Encoded': False
+                }
+            
+            if not review_id or not status or status not in REVIEW_STATUSES:
                 return {
                     'statusCode': 400,
                     'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                    'body': json.dumps({'error': 'id and valid status are required'}),
+                    'body': dumps_text({'error': 'id and valid status are required'}),
                     'isBase64Encoded': False
                 }
             
-            query = f"UPDATE reviews SET status = '{status}', updated_at = CURRENT_TIMESTAMP WHERE id = {review_id}"
-            cur.execute(query)
-            conn.commit()
+            execute(cur, 'reviews_update_status', (status, review_id))
+            invalidate('reviews_public')
             cur.close()
             
             return {
                 'statusCode': 200,
                 'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                'body': json.dumps({'message': 'Review updated'}),
+                'body': dumps_text({'message': 'Review updated'}),
                 'isBase64Encoded': False
             }
         
         elif method == 'DELETE':
             body_data = json.loads(event.get('body', '{}'))
-            review_id = body_data.get('id')
+            review_id = parse_review_id(body_data.get('id'))
+            
+            if 'ids' in body_data or 'filter' in body_data:
+                result = bulk_moderate(cur, 'delete', body_data)
+                cur.close()
+                return {
+                    'statusCode': result['statusCode'],
+                    'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                    'body': dumps_text(result['body']),
+                    'isBase64Encoded': False
+                }
             
             if not review_id:
                 return {
                     'statusCode': 400,
                     'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                    'body': json.dumps({'error': 'id is required'}),
+                    'body': dumps_text({'error': 'id is required'}),
                     'isBase64Encoded': False
                 }
             
-            query = f"DELETE FROM reviews WHERE id = {review_id}"
-            cur.execute(query)
-            conn.commit()
+            execute(cur, 'reviews_delete', (review_id,))
+            invalidate('reviews_public')
             cur.close()
             
             return {
                 'statusCode': 200,
                 'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                'body': json.dumps({'message': 'Review deleted'}),
+                'body': dumps_text({'message': 'Review deleted'}),
                 'isBase64Encoded': False
             }
         
@@ -170,17 +568,16 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             return {
                 'statusCode': 405,
                 'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                'body': json.dumps({'error': 'Method not allowed'}),
+                'body': dumps_text({'error': 'Method not allowed'}),
                 'isBase64Encoded': False
             }
     
     except Exception as e:
+        # Не гадаем, в каком состоянии осталась сессия: следующий вызов откроет новую
+        reset_connection()
         return {
             'statusCode': 500,
             'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-            'body': json.dumps({'error': str(e)}),
+            'body': dumps_text({'error': str(e)}),
             'isBase64Encoded': False
-        }
-    finally:
-        if conn:
-            conn.close()
\ No newline at end of file
+        }
\ No newline at end of file
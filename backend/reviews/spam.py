@@ -0,0 +1,54 @@
+import hashlib
+import random
+import re
+from typing import List, Set, Tuple
+
+SHINGLE_SIZE = 5
+NUM_PERMUTATIONS = 64
+BANDS = 16
+ROWS_PER_BAND = NUM_PERMUTATIONS // BANDS
+
+_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+# Коэффициенты фиксированы: подписи должны совпадать между инстансами и деплоями
+_rng = random.Random(20240601)
+_PERMUTATIONS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_PERMUTATIONS)]
+
+def normalize_text(text: str) -> str:
+    return ' '.join(re.sub(r'[^\w]+', ' ', (text or '').lower()).split())
+
+def shingles(text: str) -> Set[int]:
+    '''Символьные 5-граммы нормализованного текста, захэшированные в 32 бита'''
+    normalized = normalize_text(text)
+    if len(normalized) <= SHINGLE_SIZE:
+        grams = {normalized} if normalized else set()
+    else:
+        grams = {normalized[i:i + SHINGLE_SIZE] for i in range(len(normalized) - SHINGLE_SIZE + 1)}
+    return {int.from_bytes(hashlib.blake2b(g.encode(), digest_size=4).digest(), 'big') for g in grams}
+
+def minhash(shingle_set: Set[int]) -> List[int]:
+    if not shingle_set:
+        return [_MAX_HASH] * NUM_PERMUTATIONS
+    return [
+        min(((a * x + b) % _PRIME) & _MAX_HASH for x in shingle_set)
+        for a, b in _PERMUTATIONS
+    ]
+
+def lsh_buckets(signature: List[int]) -> Tuple[List[int], List[int]]:
+    '''
+    Делит подпись на BANDS полос по ROWS_PER_BAND значений. Тексты с Jaccard ~0.8
+    совпадают хотя бы в одной полосе с вероятностью > 0.99, с ~0.3 - редко.
+    Возвращает (номера полос, bigint-бакеты) для unnest в SQL.
+    '''
+    bands, buckets = [], []
+    for band in range(BANDS):
+        rows = signature[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND]
+        digest = hashlib.blake2b(repr(rows).encode(), digest_size=8).digest()
+        bands.append(band)
+        buckets.append(int.from_bytes(digest, 'big', signed=True))
+    return bands, buckets
+
+def jaccard(a: Set[int], b: Set[int]) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
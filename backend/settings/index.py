@@ -7,26 +7,16 @@ Returns: HTTP response с настройками сайта или резуль
 
 import json
 import os
-from datetime import datetime
 from typing import Dict, Any, Optional
 import psycopg2
 from psycopg2.extras import RealDictCursor
 
-def json_serializer(obj):
-    """JSON serializer для datetime объектов"""
-    if isinstance(obj, datetime):
-        return obj.isoformat()
-    raise TypeError(f"Type {type(obj)} not serializable")
+from singleflight import SingleFlight, request_key
+from encoding import dumps_text
+from compression import with_compression, compress_response
 
-def convert_dates_to_str(data):
-    """Конвертирует datetime объекты в строки"""
-    if isinstance(data, dict):
-        return {k: convert_dates_to_str(v) for k, v in data.items()}
-    elif isinstance(data, list):
-        return [convert_dates_to_str(item) for item in data]
-    elif isinstance(data, datetime):
-        return data.isoformat()
-    return data
+# Одновременные GET одного инстанса делят один запрос в БД и одну сериализацию
+SETTINGS_FLIGHT = SingleFlight('settings')
 
 def get_db_connection():
     """Создает подключение к базе данных"""
@@ -35,48 +25,29 @@ def get_db_connection():
         raise ValueError('DATABASE_URL environment variable is not set')
     return psycopg2.connect(dsn)
 
+# (ключ ответа, запрос, список строк или одна строка) - общие для index и index_async
+SETTINGS_QUERIES = [
+    ('siteSettings', "SELECT * FROM site_settings WHERE id = 1", False),
+    ('homepage', "SELECT * FROM homepage WHERE id = 1", False),
+    ('contacts', "SELECT * FROM contact_page WHERE id = 1", False),
+    ('services', "SELECT * FROM services ORDER BY id", True),
+    ('reviews', "SELECT * FROM reviews ORDER BY id", True),
+    ('team', "SELECT * FROM team_members ORDER BY id", True),
+    ('posts', "SELECT * FROM posts ORDER BY created_at DESC", True)
+]
+
 def get_all_settings(conn) -> Dict[str, Any]:
     """Получает все настройки сайта из базы данных"""
+    result = {}
     with conn.cursor(cursor_factory=RealDictCursor) as cur:
-        # Получаем настройки сайта
-        cur.execute("SELECT * FROM site_settings WHERE id = 1")
-        site_settings = cur.fetchone()
-        
-        # Получаем настройки главной страницы
-        cur.execute("SELECT * FROM homepage WHERE id = 1")
-        homepage = cur.fetchone()
-        
-        # Получаем контакты
-        cur.execute("SELECT * FROM contact_page WHERE id = 1")
-        contacts = cur.fetchone()
-        
-        # Получаем услуги
-        cur.execute("SELECT * FROM services ORDER BY id")
-        services = cur.fetchall()
-        
-        # Получаем отзывы
-        cur.execute("SELECT * FROM reviews ORDER BY id")
-        reviews = cur.fetchall()
-        
-        # Получаем команду
-        cur.execute("SELECT * FROM team_members ORDER BY id")
-        team = cur.fetchall()
-        
-        # Получаем блог
-        cur.execute("SELECT * FROM posts ORDER BY created_at DESC")
-        posts = cur.fetchall()
-        
-        result = {
-            'siteSettings': dict(site_settings) if site_settings else {},
-            'homepage': dict(homepage) if homepage else {},
-            'contacts': dict(contacts) if contacts else {},
-            'services': [dict(s) for s in services],
-            'reviews': [dict(r) for r in reviews],
-            'team': [dict(t) for t in team],
-            'posts': [dict(p) for p in posts]
-        }
-        
-        return convert_dates_to_str(result)
+        for key, query, many in SETTINGS_QUERIES:
+            cur.execute(query)
+            if many:
+                result[key] = [dict(row) for row in cur.fetchall()]
+            else:
+                row = cur.fetchone()
+                result[key] = dict(row) if row else {}
+    return result
 
 def update_site_settings(conn, data: Dict[str, Any]) -> Dict[str, Any]:
     """Обновляет настройки сайта"""
@@ -204,6 +175,15 @@ def update_contacts(conn, data: Dict[str, Any]) -> Dict[str, Any]:
         conn.commit()
         return {'success': True, 'message': 'Contacts updated'}
 
+def load_settings_body() -> str:
+    """Читает все настройки и сразу сериализует: ведомые запросы получают готовую строку"""
+    conn = get_db_connection()
+    try:
+        return dumps_text(get_all_settings(conn))
+    finally:
+        conn.close()
+
+@with_compression
 def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     method = event.get('httpMethod', 'GET')
     
@@ -226,19 +206,22 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     }
     
     try:
-        conn = get_db_connection()
-        
         # GET - получить все настройки
         if method == 'GET':
-            settings = get_all_settings(conn)
-            conn.close()
+            # Ведомые запросы делят с ведущим и тело, и его сжатые варианты
+            (body, compressed), shared = SETTINGS_FLIGHT.do(
+                request_key('settings', event.get('path', ''), event.get('queryStringParameters')),
+                lambda: (load_settings_body(), {})
+            )
             
-            return {
+            return compress_response(event, {
                 'statusCode': 200,
-                'headers': headers,
-                'body': json.dumps(settings, default=str),
+                'headers': {**headers, **SETTINGS_FLIGHT.headers(shared)},
+                'body': body,
                 'isBase64Encoded': False
-            }
+            }, compressed)
+        
+        conn = get_db_connection()
         
         # POST/PUT - обновить настройки
         if method in ['POST', 'PUT']:
@@ -259,7 +242,7 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                 return {
                     'statusCode': 400,
                     'headers': headers,
-                    'body': json.dumps({'error': 'Invalid section'}),
+                    'body': dumps_text({'error': 'Invalid section'}),
                     'isBase64Encoded': False
                 }
             
@@ -270,10 +253,10 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             return {
                 'statusCode': 200,
                 'headers': headers,
-                'body': json.dumps({
+                'body': dumps_text({
                     **result,
                     **updated_settings
-                }, default=json_serializer),
+                }),
                 'isBase64Encoded': False
             }
         
@@ -281,7 +264,7 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         return {
             'statusCode': 405,
             'headers': headers,
-            'body': json.dumps({'error': 'Method not allowed'}),
+            'body': dumps_text({'error': 'Method not allowed'}),
             'isBase64Encoded': False
         }
         
@@ -289,6 +272,6 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         return {
             'statusCode': 500,
             'headers': headers,
-            'body': json.dumps({'error': str(e)}),
+            'body': dumps_text({'error': str(e)}),
             'isBase64Encoded': False
         }
\ No newline at end of file
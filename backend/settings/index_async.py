@@ -0,0 +1,66 @@
+"""
+Business: Асинхронный вариант API настроек сайта (asyncpg) для долгоживущего хоста
+Args: event - dict с httpMethod, body, queryStringParameters
+      context - object с атрибутами request_id, function_name
+Returns: HTTP response с настройками сайта или результатом обновления
+"""
+
+import asyncio
+from typing import Dict, Any
+
+from aiodb import get_pool, fetch_all, fetch_one
+from singleflight import request_key
+from encoding import dumps_text
+from compression import compress_response
+import index
+from index import SETTINGS_QUERIES
+
+async def get_all_settings(conn) -> Dict[str, Any]:
+    """То же, что index.get_all_settings, на соединении asyncpg"""
+    result = {}
+    for key, query, many in SETTINGS_QUERIES:
+        if many:
+            result[key] = await fetch_all(conn, query)
+        else:
+            result[key] = await fetch_one(conn, query) or {}
+    return result
+
+async def load_settings_body() -> tuple:
+    """(JSON-текст, словарь сжатых вариантов) - общий для ведущего и ведомых запросов"""
+    pool = await get_pool()
+    async with pool.acquire() as conn:
+        return dumps_text(await get_all_settings(conn)), {}
+
+async def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    method = event.get('httpMethod', 'GET')
+    
+    # Запись редкая (админка): синхронный handler в отдельном потоке, loop не блокируется
+    if method != 'GET':
+        return await asyncio.to_thread(index.handler, event, context)
+    
+    headers = {
+        'Content-Type': 'application/json',
+        'Access-Control-Allow-Origin': '*'
+    }
+    
+    try:
+        (body, compressed), shared = await index.SETTINGS_FLIGHT.do_async(
+            request_key('settings', event.get('path', ''), event.get('queryStringParameters')),
+            load_settings_body
+        )
+        
+        return compress_response(event, {
+            'statusCode': 200,
+            'headers': {**headers, **index.SETTINGS_FLIGHT.headers(shared)},
+            'body': body,
+            'isBase64Encoded': False
+        }, compressed)
+    
+    except Exception as e:
+        return {
+            'statusCode': 500,
+            'headers': headers,
+            'body': dumps_text({'error': str(e)}),
+            'isBase64Encoded': False
+        }
+
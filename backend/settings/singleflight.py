@@ -0,0 +1,128 @@
+'''
+Схлопывание одинаковых параллельных GET внутри тёплого инстанса.
+
+Модуль лежит одинаковой копией в каждой функции, которая его использует
+(функции деплоятся по отдельности и не видят соседние папки).
+
+Первый запрос с данным ключом выполняет загрузку и сериализацию, остальные,
+пришедшие пока он работает, ждут и получают те же готовые байты.
+do_async делает то же для корутин внутри одного event loop (index_async.py).
+'''
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+WAIT_TIMEOUT = 30.0
+
+class _Call:
+    __slots__ = ('done', 'result', 'error', 'waiters')
+    
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.waiters = 0
+
+class SingleFlight:
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+        self._futures: Dict[Tuple[Any, str], asyncio.Future] = {}
+        self.requests = 0
+        self.executions = 0
+        self.collapsed = 0
+    
+    def do(self, key: str, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        '''Возвращает (результат fn, shared): shared=True, если результат получен от чужого вызова'''
+        with self._lock:
+            self.requests += 1
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+                self.executions += 1
+            else:
+                call.waiters += 1
+                self.collapsed += 1
+        
+        if not leader:
+            if not call.done.wait(WAIT_TIMEOUT):
+                return fn(), False
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+        
+        try:
+            call.result = fn()
+            return call.result, False
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+    
+    async def do_async(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        '''Как do, но fn - корутина; ведомые ждут future ведущего без блокировки loop'''
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            self.requests += 1
+            future = self._futures.get((loop, key))
+            leader = future is None
+            if leader:
+                future = loop.create_future()
+                self._futures[(loop, key)] = future
+                self.executions += 1
+            else:
+                self.collapsed += 1
+        
+        if not leader:
+            try:
+                return await asyncio.wait_for(asyncio.shield(future), WAIT_TIMEOUT), True
+            except asyncio.TimeoutError:
+                return await fn(), False
+        
+        try:
+            result = await fn()
+            future.set_result(result)
+            return result, False
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()
+            raise
+        finally:
+            with self._lock:
+                self._futures.pop((loop, key), None)
+    
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'requests': self.requests,
+                'executions': self.executions,
+                'collapsed': self.collapsed,
+                'in_flight': len(self._calls) + len(self._futures),
+                'collapse_ratio': round(self.collapsed / self.requests, 4) if self.requests else 0.0
+            }
+    
+    def headers(self, shared: bool) -> Dict[str, str]:
+        stats = self.stats()
+        return {
+            'X-Single-Flight': 'shared' if shared else 'leader',
+            'X-Single-Flight-Stats': f"requests={stats['requests']}; executions={stats['executions']}; collapsed={stats['collapsed']}"
+        }
+
+def request_key(handler_name: str, path: str, params: Optional[Dict[str, Any]]) -> str:
+    '''Ключ: функция, путь без хвостового слэша и query с отсортированными непустыми параметрами'''
+    normalized_path = '/' + '/'.join(part for part in (path or '').split('/') if part)
+    query = '&'.join(
+        f'{name}={value}'
+        for name, value in sorted((params or {}).items())
+        if value not in (None, '')
+    )
+    return f'{handler_name}:{normalized_path}?{query}'
@@ -2,6 +2,26 @@ import json
 import os
 from typing import Dict, Any
 
+from httpcache import cached_get, closing_cursor, invalidate
+from encoding import dumps_text
+from compression import with_compression
+
+def render_team(cur) -> tuple:
+    cur.execute('SELECT id, name, COALESCE(role, position) as position, photo, order_index FROM team_members WHERE removed_at IS NULL ORDER BY order_index ASC')
+    rows = cur.fetchall()
+    team = [
+        {
+            'id': row[0],
+            'name': row[1],
+            'position': row[2],
+            'photo': row[3],
+            'order_index': row[4]
+        }
+        for row in rows
+    ]
+    return 200, dumps_text(team)
+
+@with_compression
 def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     '''
     Business: API для управления командой сотрудников (просмотр, добавление, редактирование, удаление)
@@ -28,36 +48,16 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     database_url = os.environ.get('DATABASE_URL')
     
     try:
+        if method == 'GET':
+            return cached_get(
+                event, 'team_members', 'team',
+                lambda: closing_cursor(lambda: psycopg2.connect(database_url)),
+                render_team
+            )
+        
         conn = psycopg2.connect(database_url)
         cur = conn.cursor()
         
-        if method == 'GET':
-            cur.execute('SELECT id, name, COALESCE(role, position) as position, photo, order_index FROM team_members WHERE removed_at IS NULL ORDER BY order_index ASC')
-            rows = cur.fetchall()
-            team = [
-                {
-                    'id': row[0],
-                    'name': row[1],
-                    'position': row[2],
-                    'photo': row[3],
-                    'order_index': row[4]
-                }
-                for row in rows
-            ]
-            
-            cur.close()
-            conn.close()
-            
-            return {
-                'statusCode': 200,
-                'headers': {
-                    'Content-Type': 'application/json',
-                    'Access-Control-Allow-Origin': '*'
-                },
-                'isBase64Encoded': False,
-                'body': json.dumps(team)
-            }
-        
         if method == 'POST':
             body_data = json.loads(event.get('body', '{}'))
             name = body_data.get('name')
@@ -71,6 +71,7 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             )
             member_id = cur.fetchone()[0]
             conn.commit()
+            invalidate('team_members')
             
             cur.close()
             conn.close()
@@ -82,7 +83,7 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                     'Access-Control-Allow-Origin': '*'
                 },
                 'isBase64Encoded': False,
-                'body': json.dumps({
+                'body': dumps_text({
                     'id': member_id,
                     'name': name,
                     'position': position,
@@ -104,6 +105,7 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                 (name, position, photo, order_index, member_id)
             )
             conn.commit()
+            invalidate('team_members')
             
             cur.close()
             conn.close()
@@ -115,7 +117,7 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                     'Access-Control-Allow-Origin': '*'
                 },
                 'isBase64Encoded': False,
-                'body': json.dumps({
+                'body': dumps_text({
                     'id': member_id,
                     'name': name,
                     'position': position,
@@ -130,6 +132,7 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             
             cur.execute("UPDATE team_members SET removed_at = CURRENT_TIMESTAMP WHERE id = %s", (member_id,))
             conn.commit()
+            invalidate('team_members')
             
             cur.close()
             conn.close()
@@ -141,7 +144,7 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                     'Access-Control-Allow-Origin': '*'
                 },
                 'isBase64Encoded': False,
-                'body': json.dumps({'success': True})
+                'body': dumps_text({'success': True})
             }
         
         return {
@@ -151,7 +154,7 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                 'Access-Control-Allow-Origin': '*'
             },
             'isBase64Encoded': False,
-            'body': json.dumps({'error': 'Method not allowed'})
+            'body': dumps_text({'error': 'Method not allowed'})
         }
     
     except Exception as e:
@@ -162,5 +165,5 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                 'Access-Control-Allow-Origin': '*'
             },
             'isBase64Encoded': False,
-            'body': json.dumps({'error': str(e)})
+            'body': dumps_text({'error': str(e)})
         }
\ No newline at end of file
@@ -1,26 +1,312 @@
 import json
 import base64
+import binascii
 import os
-from typing import Dict, Any
-from dataclasses import dataclass
-import hashlib
+import re
+from typing import Dict, Any, List, Optional, Tuple
+from dataclasses import dataclass, asdict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
+from storage import get_storage, public_url, content_type_for, config_error, CACHE_CONTROL
+from media import get_db_connection, store_file, release_object
+from receive import receive_files, is_stream_upload, UploadRejected, IncomingFile
+from metadata import inspect_image, InvalidImage
+from variants import ensure_variants, build_manifest, variants_supported
+from transform import parse_transform, get_transformed, TransformError
+from jobs import run_backfill, run_gc
+from encoding import dumps_text
+
 @dataclass
 class UploadedFile:
-    filename: str
+    key: str
     url: str
+    hash: str
+    filename: str
     size: int
-    uploaded_at: str
+    contentType: str
+    uploadedAt: str
+    deduplicated: bool
+    manifest: Dict[str, Any]
+    variantsError: Optional[str] = None
+
+MAX_FILE_SIZE = 5 * 1024 * 1024
+BATCH_MAX_FILES = int(os.environ.get('BATCH_MAX_FILES', 30))
+BATCH_WORKERS = 4
+KEY_PATTERN = re.compile(r'^[A-Za-z0-9_-][A-Za-z0-9/_.-]*$')
+
+# Проверяется при старте инстанса: без постоянного хранилища ссылки сломаются
+STORAGE_CONFIG_ERROR = config_error()
+
+def json_response(status_code: int, payload: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        'statusCode': status_code,
+        'headers': {
+            'Content-Type': 'application/json',
+            'Access-Control-Allow-Origin': '*'
+        },
+        'body': dumps_text(payload),
+        'isBase64Encoded': False
+    }
+
+def get_object_key(event: Dict[str, Any]) -> Optional[str]:
+    params = event.get('queryStringParameters') or {}
+    key = params.get('key') or (event.get('path') or '').strip('/')
+    if not key or '..' in key or not KEY_PATTERN.match(key):
+        return None
+    return key
+
+def serve_object(event: Dict[str, Any]) -> Dict[str, Any]:
+    '''Отдаёт сохранённый объект с immutable-кэшированием: ключ меняется вместе с содержимым'''
+    key = get_object_key(event)
+    if not key:
+        return json_response(404, {'error': 'Not found'})
+    
+    etag = f'"{key}"'
+    request_headers = {k.lower(): v for k, v in (event.get('headers') or {}).items()}
+    cache_headers = {
+        'Cache-Control': CACHE_CONTROL,
+        'ETag': etag,
+        'Access-Control-Allow-Origin': '*'
+    }
+    
+    try:
+        transform = parse_transform(event.get('queryStringParameters') or {})
+    except TransformError as e:
+        return json_response(400, {'error': str(e)})
+    
+    if transform:
+        if not variants_supported(content_type_for(key)):
+            return json_response(400, {'error': 'Transforms are not supported for this file'})
+        etag = f'"{key}:w{transform[0]}:q{transform[1]}:{transform[2]}"'
+        cache_headers['ETag'] = etag
+    
+    if request_headers.get('if-none-match') == etag:
+        return {'statusCode': 304, 'headers': cache_headers, 'body': '', 'isBase64Encoded': False}
+    
+    # Отсутствующий объект - 404 (get возвращает None), сбой хранилища или битый исходник - 500
+    try:
+        if transform:
+            result = get_transformed(key, *transform)
+            data, content_type = result if result else (None, None)
+        else:
+            data, content_type = get_storage().get(key), content_type_for(key)
+    except Exception as e:
+        return json_response(500, {'error': 'Object read failed', 'message': str(e)})
+    
+    if data is None:
+        return json_response(404, {'error': 'Not found'})
+    
+    return {
+        'statusCode': 200,
+        'headers': {**cache_headers, 'Content-Type': content_type},
+        'body': base64.b64encode(data).decode('ascii'),
+        'isBase64Encoded': True
+    }
+
+def with_variants(conn, record: Dict[str, Any], source) -> Tuple[Dict[str, Any], Optional[str]]:
+    '''Ошибка при построении копий не ломает саму загрузку, а возвращается в ответе'''
+    try:
+        return ensure_variants(conn, record, source), None
+    except Exception as e:
+        conn.rollback()
+        return record, f'Variant generation failed: {e}'
+
+def get_manifest(event: Dict[str, Any]) -> Dict[str, Any]:
+    key = get_object_key(event)
+    if not key:
+        return json_response(404, {'error': 'Not found'})
+    try:
+        conn = get_db_connection()
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT * FROM media_objects WHERE key = %s", (key,))
+                record = cur.fetchone()
+        finally:
+            conn.close()
+    except Exception as e:
+        return json_response(500, {'error': 'Manifest lookup failed', 'message': str(e)})
+    if not record:
+        return json_response(404, {'error': 'Not found'})
+    return json_response(200, build_manifest(dict(record)))
 
-STORAGE_DIR = '/tmp/uploads'
+def is_job_authorized(event: Dict[str, Any]) -> bool:
+    '''Без JOBS_TOKEN задачи закрыты: gc удаляет объекты, backfill переписывает контент'''
+    token = os.environ.get('JOBS_TOKEN')
+    if not token:
+        return False
+    headers = {k.lower(): v for k, v in (event.get('headers') or {}).items()}
+    return headers.get('x-auth-token') == token
+
+def parse_job_options(event: Dict[str, Any], job: str) -> Dict[str, Any]:
+    '''Параметры задачи из тела запроса; ValueError - ответ 400'''
+    try:
+        options = json.loads(event.get('body') or '{}')
+    except ValueError:
+        raise ValueError('Request body is not valid JSON')
+    if not isinstance(options, dict):
+        raise ValueError('Request body must be a JSON object')
+    
+    try:
+        if job == 'backfill':
+            return {
+                'batch_size': int(options.get('batch_size', 20)),
+                'time_budget': float(options.get('time_budget', 20)),
+                'reset': bool(options.get('reset', False))
+            }
+        return {
+            'grace_hours': float(options.get('grace_hours', os.environ.get('GC_GRACE_HOURS', 24))),
+            'batch_size': int(options.get('batch_size', 200)),
+            'reset': bool(options.get('reset', False))
+        }
+    except (TypeError, ValueError):
+        raise ValueError('batch_size, time_budget and grace_hours must be numbers')
+
+def require_jobs_token(event: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    '''Ответ с ошибкой, если запрос не несёт JOBS_TOKEN; None - можно выполнять'''
+    if not os.environ.get('JOBS_TOKEN'):
+        return json_response(403, {'error': 'JOBS_TOKEN is not configured'})
+    if not is_job_authorized(event):
+        return json_response(401, {'error': 'Unauthorized'})
+    return None
+
+def run_job(event: Dict[str, Any], job: str) -> Dict[str, Any]:
+    denied = require_jobs_token(event)
+    if denied:
+        return denied
+    if job not in ('backfill', 'gc'):
+        return json_response(404, {'error': 'Unknown job'})
+    
+    try:
+        options = parse_job_options(event, job)
+    except ValueError as e:
+        return json_response(400, {'error': str(e)})
+    
+    try:
+        conn = get_db_connection()
+        try:
+            report = run_backfill(conn, **options) if job == 'backfill' else run_gc(conn, **options)
+        finally:
+            conn.close()
+    except Exception as e:
+        return json_response(500, {'error': 'Job failed', 'job': job, 'message': str(e)})
+    
+    return json_response(200, {'job': job, **report})
+
+def validate_incoming(incoming) -> None:
+    '''Формат определяется по содержимому; EXIF вырезается, ориентация применяется к пикселям'''
+    try:
+        info = inspect_image(incoming.path)
+    except InvalidImage as e:
+        raise UploadRejected(415, str(e))
+    
+    incoming.sniffed_type = info['content_type']
+    incoming.width = info['width']
+    incoming.height = info['height']
+    if info['sanitized'] is not None:
+        incoming.replace_content(info['sanitized'])
+
+def store_incoming(incoming) -> UploadedFile:
+    validate_incoming(incoming)
+    conn = get_db_connection()
+    try:
+        record, deduplicated = store_file(conn, incoming)
+        record, variants_error = with_variants(conn, record, incoming.path)
+    finally:
+        conn.close()
+    
+    return UploadedFile(
+        key=record['key'],
+        url=public_url(record['key']),
+        hash=record['hash'],
+        filename=incoming.filename,
+        size=record['size'],
+        contentType=record['content_type'],
+        uploadedAt=datetime.now().isoformat(),
+        deduplicated=deduplicated,
+        manifest=build_manifest(record),
+        variantsError=variants_error
+    )
+
+def batch_result(results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    return {
+        'files': results,
+        'uploaded': sum(1 for r in results if r['status'] == 'ok'),
+        'rejected': sum(1 for r in results if r['status'] == 'rejected'),
+        'failed': sum(1 for r in results if r['status'] == 'error'),
+        'deduplicated': sum(1 for r in results if r.get('deduplicated'))
+    }
+
+def handle_batch_upload(event: Dict[str, Any]) -> Dict[str, Any]:
+    '''Много файлов одним multipart-запросом: дедупликация и копии считаются параллельно'''
+    # Тело не разобралось (битый base64, multipart, лимиты) - ни один файл не принят
+    try:
+        files = receive_files(event, MAX_FILE_SIZE, max_files=BATCH_MAX_FILES)
+    except UploadRejected as e:
+        return json_response(e.status_code, {'error': str(e), **batch_result([])})
+    except Exception as e:
+        return json_response(500, {'error': 'Upload failed', 'message': str(e), **batch_result([])})
+    
+    def process(position: int, incoming) -> Dict[str, Any]:
+        try:
+            return {'index': position, 'status': 'ok', **asdict(store_incoming(incoming))}
+        except UploadRejected as e:
+            return {'index': position, 'status': 'rejected', 'filename': incoming.filename, 'error': str(e)}
+        except Exception as e:
+            return {'index': position, 'status': 'error', 'filename': incoming.filename, 'error': str(e)}
+        finally:
+            incoming.discard()
+    
+    with ThreadPoolExecutor(max_workers=min(BATCH_WORKERS, len(files))) as executor:
+        results = list(executor.map(process, range(len(files)), files))
+    
+    return json_response(200, batch_result(results))
+
+def handle_stream_upload(event: Dict[str, Any]) -> Dict[str, Any]:
+    '''multipart/form-data или сырое тело: файл идёт кусками во временный файл, без копий в памяти'''
+    try:
+        incoming = receive_files(event, MAX_FILE_SIZE)[0]
+    except UploadRejected as e:
+        return json_response(e.status_code, {'error': str(e)})
+    except Exception as e:
+        return json_response(500, {'error': 'Upload failed', 'message': str(e)})
+    
+    try:
+        return json_response(200, asdict(store_incoming(incoming)))
+    except UploadRejected as e:
+        return json_response(e.status_code, {'error': str(e)})
+    except Exception as e:
+        return json_response(500, {'error': 'Upload failed', 'message': str(e)})
+    finally:
+        incoming.discard()
+
+def handle_delete(event: Dict[str, Any]) -> Dict[str, Any]:
+    '''Снятие ссылки ускоряет удаление объекта сборщиком мусора, поэтому под тем же токеном, что и задачи'''
+    denied = require_jobs_token(event)
+    if denied:
+        return denied
+    
+    key = get_object_key(event)
+    if not key:
+        return json_response(404, {'error': 'Not found'})
+    
+    try:
+        conn = get_db_connection()
+        try:
+            released = release_object(conn, key)
+        finally:
+            conn.close()
+    except Exception as e:
+        return json_response(500, {'error': 'Delete failed', 'message': str(e)})
+    
+    return json_response(200 if released else 404, {'key': key, 'released': released})
 
 def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     '''
-    Business: Upload and store image files, return public URL
-    Args: event - dict with httpMethod, body (base64 image data), headers
+    Business: Upload images to object storage and serve them by short URL
+    Args: event - dict with httpMethod, body (base64 image data), path, headers
           context - object with request_id, function_name attributes
-    Returns: HTTP response with uploaded file URL
+    Returns: HTTP response with uploaded file URL or the stored file itself
     '''
     method: str = event.get('httpMethod', 'GET')
     
@@ -29,100 +315,82 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             'statusCode': 200,
             'headers': {
                 'Access-Control-Allow-Origin': '*',
-                'Access-Control-Allow-Methods': 'POST, OPTIONS',
-                'Access-Control-Allow-Headers': 'Content-Type, X-User-Id, X-Auth-Token',
+                'Access-Control-Allow-Methods': 'GET, POST, DELETE, OPTIONS',
+                'Access-Control-Allow-Headers': 'Content-Type, X-User-Id, X-Auth-Token, X-File-Name',
                 'Access-Control-Max-Age': '86400'
             },
             'body': '',
             'isBase64Encoded': False
         }
     
+    if STORAGE_CONFIG_ERROR:
+        return json_response(500, {'error': 'Storage is not configured', 'message': STORAGE_CONFIG_ERROR})
+    
+    if method == 'GET':
+        if (event.get('queryStringParameters') or {}).get('manifest'):
+            return get_manifest(event)
+        return serve_object(event)
+    
+    if method == 'DELETE':
+        return handle_delete(event)
+    
     if method != 'POST':
-        return {
-            'statusCode': 405,
-            'headers': {
-                'Content-Type': 'application/json',
-                'Access-Control-Allow-Origin': '*'
-            },
-            'body': json.dumps({'error': 'Method not allowed'}),
-            'isBase64Encoded': False
-        }
+        return json_response(405, {'error': 'Method not allowed'})
+    
+    path = (event.get('path') or '').strip('/')
+    if path.startswith('jobs/'):
+        return run_job(event, path[len('jobs/'):])
+    
+    if path == 'batch':
+        return handle_batch_upload(event)
+    
+    if is_stream_upload(event):
+        return handle_stream_upload(event)
     
     try:
-        body_data = json.loads(event.get('body', '{}'))
+        try:
+            body_data = json.loads(event.get('body') or '{}')
+        except ValueError:
+            return json_response(400, {'error': 'Request body is not valid JSON'})
+        if not isinstance(body_data, dict):
+            return json_response(400, {'error': 'Request body must be a JSON object'})
         
         file_data = body_data.get('file')
         filename = body_data.get('filename', 'unnamed')
         
         if not file_data:
-            return {
-                'statusCode': 400,
-                'headers': {
-                    'Content-Type': 'application/json',
-                    'Access-Control-Allow-Origin': '*'
-                },
-                'body': json.dumps({'error': 'No file data provided'}),
-                'isBase64Encoded': False
-            }
+            return json_response(400, {'error': 'No file data provided'})
+        if not isinstance(file_data, str):
+            return json_response(400, {'error': 'file must be a base64 string or data: URI'})
         
+        content_type = 'image/jpeg'
         if file_data.startswith('data:'):
             header, encoded = file_data.split(',', 1)
+            content_type = header.split(':')[1].split(';')[0] or content_type
         else:
             encoded = file_data
         
-        file_bytes = base64.b64decode(encoded)
+        try:
+            file_bytes = base64.b64decode(encoded)
+        except binascii.Error:
+            return json_response(400, {'error': 'File data is not valid base64'})
         file_size = len(file_bytes)
         
-        if file_size > 5 * 1024 * 1024:
-            return {
-                'statusCode': 400,
-                'headers': {
-                    'Content-Type': 'application/json',
-                    'Access-Control-Allow-Origin': '*'
-                },
-                'body': json.dumps({'error': 'File too large (max 5MB)'}),
-                'isBase64Encoded': False
-            }
-        
-        file_hash = hashlib.md5(file_bytes).hexdigest()
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        safe_filename = f"{timestamp}_{file_hash[:8]}_{filename}"
-        
-        os.makedirs(STORAGE_DIR, exist_ok=True)
-        file_path = os.path.join(STORAGE_DIR, safe_filename)
-        
-        with open(file_path, 'wb') as f:
-            f.write(file_bytes)
-        
-        file_url = f"data:{header.split(':')[1].split(';')[0] if 'data:' in file_data else 'image/jpeg'};base64,{encoded}"
+        if file_size > MAX_FILE_SIZE:
+            return json_response(400, {'error': 'File too large (max 5MB)'})
         
-        result = {
-            'url': file_url,
-            'filename': safe_filename,
-            'size': file_size,
-            'uploadedAt': datetime.now().isoformat()
-        }
+        incoming = IncomingFile.from_bytes(file_bytes, filename, content_type, MAX_FILE_SIZE)
+        try:
+            result = store_incoming(incoming)
+        except UploadRejected as e:
+            return json_response(e.status_code, {'error': str(e)})
+        finally:
+            incoming.discard()
         
-        return {
-            'statusCode': 200,
-            'headers': {
-                'Content-Type': 'application/json',
-                'Access-Control-Allow-Origin': '*'
-            },
-            'body': json.dumps(result),
-            'isBase64Encoded': False
-        }
+        return json_response(200, asdict(result))
         
     except Exception as e:
-        return {
-            'statusCode': 500,
-            'headers': {
-                'Content-Type': 'application/json',
-                'Access-Control-Allow-Origin': '*'
-            },
-            'body': json.dumps({
-                'error': 'Upload failed',
-                'message': str(e)
-            }),
-            'isBase64Encoded': False
-        }
+        return json_response(500, {
+            'error': 'Upload failed',
+            'message': str(e)
+        })
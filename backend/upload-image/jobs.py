@@ -0,0 +1,317 @@
+import base64
+import binascii
+import json
+import re
+import time
+from collections import Counter
+from typing import Dict, Any, List, Tuple
+
+from media import store_object
+from metadata import inspect_image, InvalidImage
+from storage import get_storage, public_url
+from variants import ensure_variants
+
+# Таблицы и колонки, где контент может хранить картинки (в т.ч. инлайновые data: URI)
+CONTENT_IMAGE_COLUMNS: List[Tuple[str, List[str]]] = [
+    ('services', ['images']),
+    ('posts', ['gallery']),
+    ('team_members', ['photo']),
+    ('reviews', ['photos']),
+    ('homepage', ['logo', 'hero_bg', 'footer_logo', 'blocks']),
+    ('site_settings', ['logo', 'footer_logo', 'favicon']),
+]
+
+OBJECT_HASH_PATTERN = re.compile(r'[0-9a-f]{2}/([0-9a-f]{64})')
+DATA_URI_PATTERN = re.compile(r'^data:(image/[\w.+-]+);base64,(.*)$', re.DOTALL)
+
+# Снимок ссылок старше этого пересобирается: правки контента во время долгого прохода
+# не должны приводить к удалению объекта, на который уже сослались
+SNAPSHOT_MAX_AGE_SECONDS = 3600
+
+# Сколько последних ошибок отдаётся в отчёте задачи (счётчик в totals - полный)
+MAX_REPORTED_FAILURES = 20
+
+def load_job_state(conn, name: str) -> Dict[str, Any]:
+    with conn.cursor() as cur:
+        cur.execute("SELECT state FROM media_jobs WHERE name = %s", (name,))
+        row = cur.fetchone()
+    return dict(row['state']) if row else {}
+
+def save_job_state(conn, name: str, state: Dict[str, Any]) -> None:
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            INSERT INTO media_jobs (name, state, updated_at)
+            VALUES (%s, %s, CURRENT_TIMESTAMP)
+            ON CONFLICT (name) DO UPDATE SET state = EXCLUDED.state, updated_at = CURRENT_TIMESTAMP
+            """,
+            (name, json.dumps(state))
+        )
+    conn.commit()
+
+def existing_columns(conn) -> Dict[Tuple[str, str], str]:
+    '''Тип каждой колонки из CONTENT_IMAGE_COLUMNS: ARRAY, jsonb или text'''
+    tables = [table for table, _ in CONTENT_IMAGE_COLUMNS]
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            SELECT table_name, column_name, data_type
+            FROM information_schema.columns
+            WHERE table_schema = current_schema() AND table_name = ANY(%s)
+            """,
+            (tables,)
+        )
+        return {(row['table_name'], row['column_name']): row['data_type'] for row in cur.fetchall()}
+
+def replace_data_uris(value: Any, replace) -> Any:
+    '''Рекурсивно заменяет data: URI в строках, списках и JSON-объектах'''
+    if isinstance(value, str):
+        return replace(value) if value.startswith('data:') else value
+    if isinstance(value, list):
+        return [replace_data_uris(item, replace) for item in value]
+    if isinstance(value, dict):
+        return {k: replace_data_uris(v, replace) for k, v in value.items()}
+    return value
+
+def adapt_value(value: Any, data_type: str) -> Any:
+    if data_type in ('jsonb', 'json'):
+        return json.dumps(value)
+    return value
+
+def run_backfill(conn, batch_size: int = 20, time_budget: float = 20.0, reset: bool = False) -> Dict[str, Any]:
+    '''
+    Выносит инлайновые data: URI из контентных таблиц в хранилище. Каждая строка
+    переписывается отдельной короткой транзакцией с проверкой, что значение не
+    изменилось с момента чтения, поэтому задачу можно гонять на живом сайте.
+    Прогресс хранится в media_jobs, повторный вызов продолжает с того же места.
+    '''
+    state = {} if reset else load_job_state(conn, 'backfill')
+    table_index = state.get('table_index', 0)
+    last_id = state.get('last_id', 0)
+    totals = state.get('totals', {'rows': 0, 'images': 0, 'bytes_reclaimed': 0, 'conflicts': 0, 'errors': 0})
+    totals.setdefault('rejected', 0)
+    failures: List[Dict[str, Any]] = []
+    
+    columns = existing_columns(conn)
+    started = time.monotonic()
+    processed = 0
+    
+    with conn.cursor() as cur:
+        cur.execute("SET lock_timeout = '2s'")
+    conn.commit()
+    
+    while table_index < len(CONTENT_IMAGE_COLUMNS) and processed < batch_size:
+        if time.monotonic() - started > time_budget:
+            break
+        
+        table, candidate_columns = CONTENT_IMAGE_COLUMNS[table_index]
+        table_columns = [c for c in candidate_columns if (table, c) in columns]
+        
+        row = None
+        if table_columns:
+            filters = ' OR '.join(f"{c}::text LIKE %s" for c in table_columns)
+            with conn.cursor() as cur:
+                cur.execute(
+                    f"SELECT id, {', '.join(table_columns)} FROM {table} "
+                    f"WHERE id > %s AND ({filters}) ORDER BY id LIMIT 1",
+                    [last_id] + ['%data:image/%'] * len(table_columns)
+                )
+                row = cur.fetchone()
+            conn.commit()
+        
+        if not row:
+            table_index += 1
+            last_id = 0
+            continue
+        
+        last_id = row['id']
+        processed += 1
+        stats = {'images': 0, 'bytes': 0}
+        
+        def extract(uri: str) -> str:
+            match = DATA_URI_PATTERN.match(uri)
+            if not match:
+                return uri
+            try:
+                file_bytes = base64.b64decode(match.group(2))
+            except (binascii.Error, ValueError):
+                return uri
+            # Та же проверка, что у живых загрузок: формат по сигнатуре, без EXIF
+            try:
+                info = inspect_image(file_bytes)
+            except InvalidImage as e:
+                totals['rejected'] += 1
+                failures.append({'table': table, 'id': row['id'], 'error': str(e)})
+                return uri
+            content = info['sanitized'] if info['sanitized'] is not None else file_bytes
+            record, _ = store_object(conn, content, info['content_type'], info['width'], info['height'])
+            try:
+                ensure_variants(conn, record, content)
+            except Exception as e:
+                conn.rollback()
+                failures.append({'table': table, 'id': row['id'], 'key': record['key'], 'error': f'Variant generation failed: {e}'})
+            url = public_url(record['key'])
+            stats['images'] += 1
+            stats['bytes'] += len(uri) - len(url)
+            return url
+        
+        try:
+            assignments = []
+            values = []
+            guards = []
+            guard_values = []
+            for column in table_columns:
+                old_value = row[column]
+                new_value = replace_data_uris(old_value, extract)
+                if new_value != old_value:
+                    data_type = columns[(table, column)]
+                    assignments.append(f"{column} = %s")
+                    values.append(adapt_value(new_value, data_type))
+                    guards.append(f"{column}::text = %s::{'text[]' if data_type == 'ARRAY' else data_type}::text")
+                    guard_values.append(adapt_value(old_value, data_type))
+            
+            if assignments:
+                with conn.cursor() as cur:
+                    cur.execute(
+                        f"UPDATE {table} SET {', '.join(assignments)} "
+                        f"WHERE id = %s AND {' AND '.join(guards)}",
+                        values + [row['id']] + guard_values
+                    )
+                    updated = cur.rowcount
+                conn.commit()
+                
+                if updated:
+                    totals['rows'] += 1
+                    totals['images'] += stats['images']
+                    totals['bytes_reclaimed'] += stats['bytes']
+                else:
+                    # Строку изменили параллельно - вернёмся к ней при следующем полном проходе
+                    totals['conflicts'] += 1
+        except Exception as e:
+            conn.rollback()
+            totals['errors'] += 1
+            failures.append({'table': table, 'id': row['id'], 'error': str(e)})
+        
+        save_job_state(conn, 'backfill', {'table_index': table_index, 'last_id': last_id, 'totals': totals})
+    
+    done = table_index >= len(CONTENT_IMAGE_COLUMNS)
+    save_job_state(conn, 'backfill', {'table_index': table_index, 'last_id': last_id, 'totals': totals, 'done': done})
+    
+    return {
+        'done': done,
+        'processed_rows': processed,
+        'cursor': {
+            'table': CONTENT_IMAGE_COLUMNS[table_index][0] if not done else None,
+            'last_id': last_id
+        },
+        'totals': totals,
+        'failures': failures[-MAX_REPORTED_FAILURES:]
+    }
+
+def count_references(conn) -> Counter:
+    '''
+    Сколько раз каждый объект (по sha256 из ключа) упоминается в контенте.
+    Строки читаются целиком как JSON обычным SELECT через серверный курсор -
+    это не берёт блокировок, мешающих записи в контентные таблицы.
+    '''
+    references: Counter = Counter()
+    for table, _ in CONTENT_IMAGE_COLUMNS:
+        with conn.cursor(name=f"gc_scan_{table}") as cur:
+            cur.itersize = 200
+            cur.execute(f"SELECT row_to_json(t)::text AS row_json FROM {table} t")
+            for row in cur:
+                references.update(OBJECT_HASH_PATTERN.findall(row['row_json']))
+        conn.commit()
+    return references
+
+def snapshot_references(conn) -> int:
+    '''Пересобирает media_gc_references по текущему контенту, возвращает число объектов с ссылками'''
+    hashes = list(count_references(conn))
+    with conn.cursor() as cur:
+        cur.execute("TRUNCATE media_gc_references")
+        for start in range(0, len(hashes), 1000):
+            cur.execute(
+                "INSERT INTO media_gc_references (hash) SELECT unnest(%s::text[])",
+                (hashes[start:start + 1000],)
+            )
+    conn.commit()
+    return len(hashes)
+
+def run_gc(conn, grace_hours: float = 24, batch_size: int = 200, reset: bool = False) -> Dict[str, Any]:
+    '''
+    Удаляет объекты, на которые не ссылается ни одна контентная таблица. Объект
+    с ref_count = 0 (все загрузки сняты через DELETE) удаляется на ближайшем проходе,
+    остальные - только после grace-периода: загрузку могли ещё не сохранить в контент.
+    Объекты обходятся порциями по hash, курсор хранится в media_jobs. Контент
+    сканируется один раз на проход (снимок в media_gc_references), а не на каждую порцию.
+    '''
+    state = {} if reset else load_job_state(conn, 'gc')
+    if state.get('done'):
+        state = {}
+    last_hash = state.get('last_hash', '')
+    totals = state.get('totals', {'scanned': 0, 'deleted': 0, 'bytes_freed': 0})
+    
+    snapshot_at = state.get('snapshot_at')
+    referenced_objects = state.get('referenced_objects', 0)
+    if snapshot_at is None or time.time() - snapshot_at > SNAPSHOT_MAX_AGE_SECONDS:
+        referenced_objects = snapshot_references(conn)
+        snapshot_at = time.time()
+    storage = get_storage()
+    
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            SELECT m.hash, m.key, m.size, m.variants,
+                   EXISTS (SELECT 1 FROM media_gc_references r WHERE r.hash = m.hash) AS referenced
+            FROM media_objects m
+            WHERE m.hash > %s
+              AND (m.ref_count <= 0 OR m.created_at < CURRENT_TIMESTAMP - make_interval(secs => %s))
+            ORDER BY m.hash
+            LIMIT %s
+            """,
+            (last_hash, grace_hours * 3600, batch_size)
+        )
+        candidates = cur.fetchall()
+    conn.commit()
+    
+    for candidate in candidates:
+        if candidate['referenced']:
+            continue
+        with conn.cursor() as cur:
+            # Повторная загрузка того же файла поднимает ref_count и last_referenced_at - такой объект не трогаем
+            cur.execute(
+                """
+                DELETE FROM media_objects
+                WHERE hash = %s
+                  AND (ref_count <= 0 OR last_referenced_at < CURRENT_TIMESTAMP - make_interval(secs => %s))
+                RETURNING hash
+                """,
+                (candidate['hash'], grace_hours * 3600)
+            )
+            deleted = cur.fetchone()
+        conn.commit()
+        if not deleted:
+            continue
+        
+        for variant in candidate['variants'] or []:
+            storage.delete(variant['key'])
+            totals['bytes_freed'] += variant.get('size', 0)
+        storage.delete(candidate['key'])
+        totals['deleted'] += 1
+        totals['bytes_freed'] += candidate['size']
+    
+    totals['scanned'] += len(candidates)
+    done = len(candidates) < batch_size
+    last_hash = candidates[-1]['hash'] if candidates else last_hash
+    save_job_state(conn, 'gc', {
+        'last_hash': last_hash, 'totals': totals, 'done': done,
+        'snapshot_at': snapshot_at, 'referenced_objects': referenced_objects
+    })
+    
+    return {
+        'done': done,
+        'processed_objects': len(candidates),
+        'referenced_objects': referenced_objects,
+        'cursor': {'last_hash': last_hash},
+        'totals': totals
+    }
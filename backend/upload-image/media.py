@@ -0,0 +1,103 @@
+import hashlib
+import os
+from typing import Dict, Any, Tuple, Callable, Optional
+
+import psycopg2
+from psycopg2.extras import RealDictCursor
+
+from storage import get_storage, EXTENSIONS
+
+def get_db_connection():
+    dsn = os.environ.get('DATABASE_URL')
+    if not dsn:
+        raise ValueError('DATABASE_URL not found')
+    return psycopg2.connect(dsn, cursor_factory=RealDictCursor)
+
+def object_key(file_hash: str, content_type: str) -> str:
+    return f"{file_hash[:2]}/{file_hash}{EXTENSIONS.get(content_type, '.bin')}"
+
+def store_content(conn, file_hash: str, size: int, content_type: str,
+                  write: Callable[[str, str], None],
+                  width: Optional[int] = None, height: Optional[int] = None) -> Tuple[Dict[str, Any], bool]:
+    '''
+    Сохраняет объект по sha256 содержимого. Повторная загрузка тех же байтов
+    не пишет файл заново, а только увеличивает ref_count существующей записи.
+    write(key, content_type) вызывается, только если объект нужно записать.
+    Возвращает (запись media_objects, был ли это дубликат).
+    '''
+    storage = get_storage()
+    
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            UPDATE media_objects
+            SET ref_count = ref_count + 1, last_referenced_at = CURRENT_TIMESTAMP
+            WHERE hash = %s
+            RETURNING *
+            """,
+            (file_hash,)
+        )
+        existing = cur.fetchone()
+        
+        if existing:
+            # Локальный каталог мог очиститься вместе с инстансом - содержимое у нас на руках
+            if not storage.exists(existing['key']):
+                write(existing['key'], existing['content_type'])
+            conn.commit()
+            return dict(existing), True
+        
+        key = object_key(file_hash, content_type)
+        write(key, content_type)
+        
+        cur.execute(
+            """
+            INSERT INTO media_objects (hash, key, content_type, size, width, height, ref_count)
+            VALUES (%s, %s, %s, %s, %s, %s, 1)
+            ON CONFLICT (hash) DO UPDATE
+                SET ref_count = media_objects.ref_count + 1,
+                    last_referenced_at = CURRENT_TIMESTAMP
+            RETURNING *
+            """,
+            (file_hash, key, content_type, size, width, height)
+        )
+        stored = cur.fetchone()
+        conn.commit()
+        return dict(stored), False
+
+def store_object(conn, file_bytes: bytes, content_type: str,
+                 width: Optional[int] = None, height: Optional[int] = None) -> Tuple[Dict[str, Any], bool]:
+    return store_content(
+        conn,
+        hashlib.sha256(file_bytes).hexdigest(),
+        len(file_bytes),
+        content_type,
+        lambda key, ctype: get_storage().put(key, file_bytes, ctype),
+        width,
+        height
+    )
+
+def store_file(conn, incoming) -> Tuple[Dict[str, Any], bool]:
+    '''То же для файла, принятого потоком во временный файл (см. receive.py)'''
+    return store_content(
+        conn,
+        incoming.hash,
+        incoming.size,
+        incoming.content_type,
+        lambda key, ctype: get_storage().put_file(key, incoming.path, ctype),
+        incoming.width,
+        incoming.height
+    )
+
+def release_object(conn, key: str) -> bool:
+    '''
+    Снимает одну ссылку. При ref_count = 0 сборщик мусора удалит файлы на ближайшем
+    проходе, не дожидаясь grace-периода, если объект не упоминается в контенте.
+    '''
+    with conn.cursor() as cur:
+        cur.execute(
+            "UPDATE media_objects SET ref_count = GREATEST(ref_count - 1, 0) WHERE key = %s RETURNING hash",
+            (key,)
+        )
+        released = cur.fetchone()
+        conn.commit()
+        return released is not None
@@ -0,0 +1,133 @@
+import io
+from typing import Dict, Any, Optional, Union
+
+try:
+    from PIL import Image, ImageOps, JpegImagePlugin
+except ImportError:
+    Image = None
+
+MAX_PIXELS = 40_000_000
+ORIENTATION_TAG = 0x0112
+SAVE_OPTIONS = {
+    'image/jpeg': ('JPEG', {'quality': 90, 'optimize': True}),
+    'image/png': ('PNG', {'optimize': True}),
+    'image/webp': ('WEBP', {'quality': 90}),
+    'image/avif': ('AVIF', {'quality': 75}),
+}
+
+class InvalidImage(ValueError):
+    pass
+
+def sniff_image_type(head: bytes) -> Optional[str]:
+    '''Настоящий формат по сигнатуре, имя файла и заявленный MIME не учитываются'''
+    if head.startswith(b'\xff\xd8\xff'):
+        return 'image/jpeg'
+    if head.startswith(b'\x89PNG\r\n\x1a\n'):
+        return 'image/png'
+    if head[:6] in (b'GIF87a', b'GIF89a'):
+        return 'image/gif'
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'image/webp'
+    if head[4:8] == b'ftyp' and head[8:12] in (b'avif', b'avis'):
+        return 'image/avif'
+    return None
+
+def open_source(source: Union[str, bytes]):
+    return io.BytesIO(source) if isinstance(source, bytes) else source
+
+def read_source(source: Union[str, bytes]) -> bytes:
+    if isinstance(source, bytes):
+        return source
+    with open(source, 'rb') as f:
+        return f.read()
+
+def strip_jpeg_exif(data: bytes) -> Optional[bytes]:
+    '''
+    Вырезает сегменты APP1 (EXIF, XMP) из заголовка JPEG без перекодирования:
+    скан-данные копируются как есть. None - если структура маркеров не распознана.
+    '''
+    out = [data[:2]]
+    pos = 2
+    while pos + 4 <= len(data):
+        if data[pos] != 0xFF:
+            return None
+        marker = data[pos + 1]
+        if marker == 0xFF:
+            pos += 1
+            continue
+        if marker == 0xDA:
+            out.append(data[pos:])
+            return b''.join(out)
+        length = int.from_bytes(data[pos + 2:pos + 4], 'big')
+        if length < 2 or pos + 2 + length > len(data):
+            return None
+        if marker != 0xE1:
+            out.append(data[pos:pos + 2 + length])
+        pos += 2 + length
+    return None
+
+def jpeg_save_options(image) -> Dict[str, Any]:
+    '''Таблицы квантования исходника: повернутый JPEG не теряет качество сверх неизбежного'''
+    options: Dict[str, Any] = {'optimize': True}
+    quantization = getattr(image, 'quantization', None)
+    if quantization:
+        options['qtables'] = quantization
+        options['subsampling'] = JpegImagePlugin.get_sampling(image)
+    else:
+        options['quality'] = SAVE_OPTIONS['image/jpeg'][1]['quality']
+    return options
+
+def inspect_image(source: Union[str, bytes]) -> Dict[str, Any]:
+    '''
+    Проверяет, что файл (путь или байты) - изображение поддерживаемого формата, и возвращает
+    {'content_type', 'width', 'height', 'sanitized'}: sanitized - байты без EXIF
+    с применённой ориентацией, либо None, если файл можно хранить как есть.
+    '''
+    if isinstance(source, bytes):
+        head = source[:32]
+    else:
+        with open(source, 'rb') as f:
+            head = f.read(32)
+    
+    content_type = sniff_image_type(head)
+    if not content_type:
+        raise InvalidImage('File is not a supported image (jpeg, png, gif, webp, avif)')
+    
+    if Image is None:
+        return {'content_type': content_type, 'width': None, 'height': None, 'sanitized': None}
+    
+    try:
+        with Image.open(open_source(source)) as image:
+            if image.width * image.height > MAX_PIXELS:
+                raise InvalidImage('Image dimensions are too large')
+            image.verify()
+        
+        with Image.open(open_source(source)) as image:
+            exif = image.getexif()
+            if content_type == 'image/gif' or not exif:
+                return {'content_type': content_type, 'width': image.width, 'height': image.height, 'sanitized': None}
+            
+            # Ориентация не задана - пиксели не меняются, JPEG чистится без перекодирования
+            if content_type == 'image/jpeg' and exif.get(ORIENTATION_TAG, 1) == 1:
+                stripped = strip_jpeg_exif(read_source(source))
+                if stripped is not None:
+                    return {'content_type': content_type, 'width': image.width, 'height': image.height, 'sanitized': stripped}
+            
+            oriented = ImageOps.exif_transpose(image)
+            if content_type == 'image/jpeg' and oriented.mode not in ('RGB', 'L', 'CMYK'):
+                oriented = oriented.convert('RGB')
+            fmt, options = SAVE_OPTIONS[content_type]
+            if content_type == 'image/jpeg':
+                options = jpeg_save_options(image)
+            buffer = io.BytesIO()
+            oriented.save(buffer, fmt, **options)
+            return {
+                'content_type': content_type,
+                'width': oriented.width,
+                'height': oriented.height,
+                'sanitized': buffer.getvalue()
+            }
+    except InvalidImage:
+        raise
+    except Exception:
+        raise InvalidImage('Image cannot be decoded')
@@ -0,0 +1,104 @@
+import re
+from typing import Callable, Dict, Optional
+
+MAX_HEADER_SIZE = 16 * 1024
+
+class MultipartError(ValueError):
+    pass
+
+def get_boundary(content_type: str) -> Optional[bytes]:
+    match = re.search(r'boundary="?([^";]+)"?', content_type or '')
+    return match.group(1).encode('latin-1') if match else None
+
+def parse_part_headers(raw: bytes) -> Dict[str, str]:
+    headers = {}
+    for line in raw.decode('utf-8', 'replace').split('\r\n'):
+        if ':' in line:
+            name, value = line.split(':', 1)
+            headers[name.strip().lower()] = value.strip()
+    return headers
+
+def disposition_params(headers: Dict[str, str]) -> Dict[str, str]:
+    '''name/filename из Content-Disposition части'''
+    return dict(re.findall(r';\s*([\w*]+)="?([^";]*)"?', headers.get('content-disposition', '')))
+
+class MultipartParser:
+    '''
+    Потоковый разбор multipart/form-data: данные подаются кусками через feed(),
+    содержимое частей уходит в колбэки по мере поступления, в памяти держится
+    только хвост буфера длиной с разделитель.
+    '''
+
+    def __init__(self, boundary: bytes,
+                 on_part_begin: Callable[[Dict[str, str]], None],
+                 on_part_data: Callable[[bytes], None],
+                 on_part_end: Callable[[], None]):
+        self.delimiter = b'--' + boundary
+        self.body_delimiter = b'\r\n--' + boundary
+        self.on_part_begin = on_part_begin
+        self.on_part_data = on_part_data
+        self.on_part_end = on_part_end
+        self.buffer = bytearray()
+        self.state = 'preamble'
+
+    def feed(self, chunk: bytes) -> None:
+        self.buffer += chunk
+        while self._step():
+            pass
+
+    def close(self) -> None:
+        if self.state != 'done':
+            raise MultipartError('Unexpected end of multipart body')
+
+    def _step(self) -> bool:
+        if self.state == 'preamble':
+            index = self.buffer.find(self.delimiter)
+            if index < 0:
+                del self.buffer[:max(len(self.buffer) - len(self.delimiter), 0)]
+                return False
+            del self.buffer[:index + len(self.delimiter)]
+            self.state = 'after_delimiter'
+            return True
+
+        if self.state == 'after_delimiter':
+            if len(self.buffer) < 2:
+                return False
+            marker = bytes(self.buffer[:2])
+            del self.buffer[:2]
+            if marker == b'--':
+                self.state = 'done'
+                self.buffer.clear()
+                return False
+            if marker != b'\r\n':
+                raise MultipartError('Malformed multipart delimiter')
+            self.state = 'headers'
+            return True
+
+        if self.state == 'headers':
+            index = self.buffer.find(b'\r\n\r\n')
+            if index < 0:
+                if len(self.buffer) > MAX_HEADER_SIZE:
+                    raise MultipartError('Multipart headers too large')
+                return False
+            headers = parse_part_headers(bytes(self.buffer[:index]))
+            del self.buffer[:index + 4]
+            self.on_part_begin(headers)
+            self.state = 'body'
+            return True
+
+        if self.state == 'body':
+            index = self.buffer.find(self.body_delimiter)
+            if index < 0:
+                safe = len(self.buffer) - len(self.body_delimiter) + 1
+                if safe > 0:
+                    self.on_part_data(bytes(self.buffer[:safe]))
+                    del self.buffer[:safe]
+                return False
+            if index:
+                self.on_part_data(bytes(self.buffer[:index]))
+            del self.buffer[:index + len(self.body_delimiter)]
+            self.on_part_end()
+            self.state = 'after_delimiter'
+            return True
+
+        return False
@@ -0,0 +1,180 @@
+import base64
+import binascii
+import hashlib
+import os
+import tempfile
+from typing import Dict, Any, Iterator, List, Optional
+
+from multipart import MultipartParser, MultipartError, get_boundary, disposition_params
+from storage import content_type_for
+
+CHUNK_SIZE = 64 * 1024
+MAX_FIELD_SIZE = 4 * 1024
+TMP_DIR = os.environ.get('UPLOAD_TMP_DIR', '/tmp')
+
+class UploadRejected(Exception):
+    def __init__(self, status_code: int, message: str):
+        super().__init__(message)
+        self.status_code = status_code
+
+class IncomingFile:
+    '''Файл, принимаемый кусками: пишется во временный файл и хэшируется на лету'''
+
+    def __init__(self, filename: str, content_type: Optional[str], max_size: int):
+        self.filename = filename or 'unnamed'
+        self.declared_content_type = content_type
+        self.max_size = max_size
+        self.size = 0
+        self.sniffed_type: Optional[str] = None
+        self.width: Optional[int] = None
+        self.height: Optional[int] = None
+        self._sha256 = hashlib.sha256()
+        self._file = tempfile.NamedTemporaryFile(dir=TMP_DIR, prefix='upload-', delete=False)
+        self.path = self._file.name
+
+    def write(self, data: bytes) -> None:
+        self.size += len(data)
+        if self.size > self.max_size:
+            raise UploadRejected(413, f'File too large (max {self.max_size // (1024 * 1024)}MB)')
+        self._sha256.update(data)
+        self._file.write(data)
+
+    def finish(self) -> None:
+        if not self._file.closed:
+            self._file.close()
+
+    @classmethod
+    def from_bytes(cls, data: bytes, filename: str, content_type: Optional[str], max_size: int) -> 'IncomingFile':
+        incoming = cls(filename, content_type, max_size)
+        incoming.write(data)
+        incoming.finish()
+        return incoming
+
+    def replace_content(self, data: bytes) -> None:
+        '''Подменяет сохраняемые байты (например, без EXIF); hash и ключ считаются по новым байтам'''
+        with open(self.path, 'wb') as f:
+            f.write(data)
+        self.size = len(data)
+        self._sha256 = hashlib.sha256(data)
+
+    @property
+    def hash(self) -> str:
+        return self._sha256.hexdigest()
+
+    @property
+    def content_type(self) -> str:
+        if self.sniffed_type:
+            return self.sniffed_type
+        declared = (self.declared_content_type or '').split(';')[0].strip().lower()
+        if declared.startswith('image/'):
+            return declared
+        return content_type_for(self.filename)
+
+    def discard(self) -> None:
+        self.finish()
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+def lower_headers(event: Dict[str, Any]) -> Dict[str, str]:
+    return {k.lower(): v for k, v in (event.get('headers') or {}).items()}
+
+def iter_body_chunks(event: Dict[str, Any]) -> Iterator[bytes]:
+    '''Тело запроса кусками, base64 декодируется по частям, а не целиком'''
+    body = event.get('body') or ''
+    if event.get('isBase64Encoded'):
+        step = CHUNK_SIZE // 3 * 4
+        for start in range(0, len(body), step):
+            yield base64.b64decode(body[start:start + step])
+    else:
+        for start in range(0, len(body), CHUNK_SIZE):
+            yield body[start:start + CHUNK_SIZE].encode('utf-8')
+
+def estimated_body_size(event: Dict[str, Any]) -> int:
+    headers = lower_headers(event)
+    if headers.get('content-length', '').isdigit():
+        return int(headers['content-length'])
+    body = event.get('body') or ''
+    return len(body) * 3 // 4 if event.get('isBase64Encoded') else len(body)
+
+def is_stream_upload(event: Dict[str, Any]) -> bool:
+    content_type = lower_headers(event).get('content-type', '').lower()
+    return (content_type.startswith('multipart/form-data')
+            or content_type.startswith('image/')
+            or content_type.startswith('application/octet-stream'))
+
+def receive_files(event: Dict[str, Any], max_file_size: int, max_files: int = 1) -> List[IncomingFile]:
+    '''
+    Принимает multipart/form-data (поля с filename) или «сырое» тело с Content-Type image/*.
+    Лимиты проверяются до декодирования по заявленному размеру и затем по мере чтения.
+    '''
+    headers = lower_headers(event)
+    content_type = headers.get('content-type', '')
+    overhead = 16 * 1024 * max_files
+    
+    if estimated_body_size(event) > max_file_size * max_files + overhead:
+        raise UploadRejected(413, 'Request body too large')
+    
+    files: List[IncomingFile] = []
+    
+    try:
+        if content_type.lower().startswith('multipart/form-data'):
+            boundary = get_boundary(content_type)
+            if not boundary:
+                raise UploadRejected(400, 'Multipart boundary is missing')
+            
+            current: Dict[str, Any] = {'file': None, 'field_size': 0}
+            
+            def on_part_begin(part_headers: Dict[str, str]) -> None:
+                params = disposition_params(part_headers)
+                current['field_size'] = 0
+                if 'filename' in params:
+                    if len(files) >= max_files:
+                        raise UploadRejected(400, f'Too many files (max {max_files})')
+                    current['file'] = IncomingFile(params['filename'], part_headers.get('content-type'), max_file_size)
+                    files.append(current['file'])
+                else:
+                    current['file'] = None
+            
+            def on_part_data(data: bytes) -> None:
+                if current['file'] is not None:
+                    current['file'].write(data)
+                else:
+                    current['field_size'] += len(data)
+                    if current['field_size'] > MAX_FIELD_SIZE:
+                        raise UploadRejected(400, 'Form field too large')
+            
+            def on_part_end() -> None:
+                if current['file'] is not None:
+                    current['file'].finish()
+            
+            parser = MultipartParser(boundary, on_part_begin, on_part_data, on_part_end)
+            for chunk in iter_body_chunks(event):
+                parser.feed(chunk)
+            parser.close()
+        else:
+            params = event.get('queryStringParameters') or {}
+            filename = headers.get('x-file-name') or params.get('filename') or 'unnamed'
+            incoming = IncomingFile(filename, content_type, max_file_size)
+            files.append(incoming)
+            for chunk in iter_body_chunks(event):
+                incoming.write(chunk)
+            incoming.finish()
+    except MultipartError as e:
+        for incoming in files:
+            incoming.discard()
+        raise UploadRejected(400, str(e))
+    except binascii.Error:
+        for incoming in files:
+            incoming.discard()
+        raise UploadRejected(400, 'Request body is not valid base64')
+    except Exception:
+        for incoming in files:
+            incoming.discard()
+        raise
+    
+    if not files:
+        raise UploadRejected(400, 'No file data provided')
+    
+    return files
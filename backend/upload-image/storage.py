@@ -0,0 +1,161 @@
+import os
+import shutil
+from typing import Optional
+
+CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+CONTENT_TYPES = {
+    '.jpg': 'image/jpeg',
+    '.jpeg': 'image/jpeg',
+    '.png': 'image/png',
+    '.gif': 'image/gif',
+    '.webp': 'image/webp',
+    '.avif': 'image/avif',
+    '.svg': 'image/svg+xml',
+}
+
+EXTENSIONS = {
+    'image/jpeg': '.jpg',
+    'image/png': '.png',
+    'image/gif': '.gif',
+    'image/webp': '.webp',
+    'image/avif': '.avif',
+    'image/svg+xml': '.svg',
+}
+
+def content_type_for(key: str) -> str:
+    return CONTENT_TYPES.get(os.path.splitext(key)[1].lower(), 'application/octet-stream')
+
+class LocalStorage:
+    '''Объекты в локальном каталоге, ключ - относительный путь'''
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, key)
+
+    def put(self, key: str, data: bytes, content_type: str) -> None:
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp{os.getpid()}"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def put_file(self, key: str, source_path: str, content_type: str) -> None:
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp{os.getpid()}"
+        shutil.copyfile(source_path, tmp_path)
+        os.replace(tmp_path, path)
+
+    def get(self, key: str) -> Optional[bytes]:
+        try:
+            with open(self._path(key), 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def exists(self, key: str) -> bool:
+        return os.path.exists(self._path(key))
+
+    def delete(self, key: str) -> None:
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+class S3Storage:
+    '''S3-совместимое хранилище, объекты пишутся с долгим immutable Cache-Control'''
+
+    def __init__(self, bucket: str, prefix: str = ''):
+        import boto3
+
+        self.bucket = bucket
+        self.prefix = prefix
+        self.client = boto3.client(
+            's3',
+            endpoint_url=os.environ.get('S3_ENDPOINT_URL'),
+            aws_access_key_id=os.environ.get('AWS_ACCESS_KEY_ID'),
+            aws_secret_access_key=os.environ.get('AWS_SECRET_ACCESS_KEY')
+        )
+
+    def _key(self, key: str) -> str:
+        return f"{self.prefix}{key}"
+
+    def put(self, key: str, data: bytes, content_type: str) -> None:
+        self.client.put_object(
+            Bucket=self.bucket,
+            Key=self._key(key),
+            Body=data,
+            ContentType=content_type,
+            CacheControl=CACHE_CONTROL
+        )
+
+    def put_file(self, key: str, source_path: str, content_type: str) -> None:
+        self.client.upload_file(
+            source_path,
+            self.bucket,
+            self._key(key),
+            ExtraArgs={'ContentType': content_type, 'CacheControl': CACHE_CONTROL}
+        )
+
+    def get(self, key: str) -> Optional[bytes]:
+        try:
+            return self.client.get_object(Bucket=self.bucket, Key=self._key(key))['Body'].read()
+        except self.client.exceptions.NoSuchKey:
+            return None
+
+    def exists(self, key: str) -> bool:
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self._key(key))
+            return True
+        except Exception:
+            return False
+
+    def delete(self, key: str) -> None:
+        self.client.delete_object(Bucket=self.bucket, Key=self._key(key))
+
+class StorageNotConfigured(RuntimeError):
+    pass
+
+def config_error() -> Optional[str]:
+    '''
+    Ссылки на объекты живут в контенте дольше инстанса, поэтому нужны абсолютный
+    UPLOADS_PUBLIC_URL и постоянное хранилище: S3 или STORAGE_DIR на общем томе.
+    '''
+    if not os.environ.get('UPLOADS_PUBLIC_URL', '').startswith(('https://', 'http://')):
+        return 'UPLOADS_PUBLIC_URL must be an absolute http(s) URL'
+    backend = os.environ.get('STORAGE_BACKEND')
+    if backend == 's3':
+        if not os.environ.get('S3_BUCKET'):
+            return 'S3_BUCKET is required for STORAGE_BACKEND=s3'
+    elif backend == 'local':
+        if not os.environ.get('STORAGE_DIR'):
+            return 'STORAGE_DIR on a persistent volume is required for STORAGE_BACKEND=local'
+    else:
+        return 'STORAGE_BACKEND must be s3 or local'
+    return None
+
+_storage = None
+
+def get_storage():
+    '''Хранилище выбирается через STORAGE_BACKEND=s3|local, создаётся один раз на инстанс'''
+    global _storage
+    if _storage is None:
+        error = config_error()
+        if error:
+            raise StorageNotConfigured(error)
+        if os.environ['STORAGE_BACKEND'] == 's3':
+            _storage = S3Storage(os.environ['S3_BUCKET'], os.environ.get('S3_PREFIX', 'uploads/'))
+        else:
+            _storage = LocalStorage(os.environ['STORAGE_DIR'])
+    return _storage
+
+def public_url(key: str) -> str:
+    '''Короткая ссылка на объект: UPLOADS_PUBLIC_URL - CDN бакета или URL этой функции'''
+    base = os.environ.get('UPLOADS_PUBLIC_URL', '')
+    if not base.startswith(('https://', 'http://')):
+        raise StorageNotConfigured('UPLOADS_PUBLIC_URL must be an absolute http(s) URL')
+    return f"{base.rstrip('/')}/{key}"
@@ -0,0 +1,136 @@
+import fcntl
+import hashlib
+import io
+import os
+import threading
+from contextlib import contextmanager
+from typing import Dict, Any, Optional, Tuple
+
+from storage import get_storage
+from variants import open_image, output_formats, Image
+
+CACHE_DIR = os.environ.get('TRANSFORM_CACHE_DIR', '/tmp/image-cache')
+CACHE_MAX_BYTES = int(os.environ.get('TRANSFORM_CACHE_MAX_BYTES', 256 * 1024 * 1024))
+MAX_WIDTH = 2560
+CONTENT_TYPES = {'webp': 'image/webp', 'avif': 'image/avif', 'jpeg': 'image/jpeg', 'png': 'image/png'}
+
+_locks: Dict[str, threading.Lock] = {}
+_locks_guard = threading.Lock()
+
+class TransformError(ValueError):
+    pass
+
+def parse_transform(params: Dict[str, Any]) -> Optional[Tuple[int, int, str]]:
+    '''(width, quality, format) из w/q/fmt; значения округляются, чтобы не плодить варианты в кэше'''
+    if not any(params.get(name) for name in ('w', 'q', 'fmt')):
+        return None
+    try:
+        width = int(params.get('w') or 0)
+        quality = int(params.get('q') or 75)
+    except ValueError:
+        raise TransformError('w and q must be integers')
+    fmt = (params.get('fmt') or 'webp').lower()
+    if fmt == 'jpg':
+        fmt = 'jpeg'
+    if fmt not in CONTENT_TYPES or (fmt in ('webp', 'avif') and fmt not in output_formats()):
+        raise TransformError(f'Unsupported format: {fmt}')
+    width = min(max(width, 0), MAX_WIDTH) // 32 * 32
+    quality = min(max(quality, 30), 95) // 5 * 5
+    return width, quality, fmt
+
+def cache_path(key: str, width: int, quality: int, fmt: str) -> str:
+    digest = hashlib.sha1(f"{key}|{width}|{quality}|{fmt}".encode('utf-8')).hexdigest()
+    return os.path.join(CACHE_DIR, digest[:2], f"{digest}.{fmt}")
+
+def read_cached(path: str) -> Optional[bytes]:
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+    except FileNotFoundError:
+        return None
+    os.utime(path)
+    return data
+
+@contextmanager
+def single_flight(path: str):
+    '''Один генератор на вариант: блокировка между потоками инстанса и flock между процессами'''
+    with _locks_guard:
+        lock = _locks.setdefault(path, threading.Lock())
+    with lock:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(f"{path}.lock", 'w') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+    with _locks_guard:
+        if not lock.locked():
+            _locks.pop(path, None)
+
+def evict(max_bytes: int = CACHE_MAX_BYTES) -> int:
+    '''LRU по mtime (обновляется при каждом попадании): удаляем старые, пока кэш не станет меньше 90% лимита'''
+    entries = []
+    total = 0
+    for root, _, files in os.walk(CACHE_DIR):
+        for name in files:
+            if name.endswith('.lock'):
+                continue
+            path = os.path.join(root, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+    
+    if total <= max_bytes:
+        return 0
+    
+    removed = 0
+    for _, size, path in sorted(entries):
+        if total <= max_bytes * 0.9:
+            break
+        for stale in (path, f"{path}.lock"):
+            try:
+                os.remove(stale)
+            except FileNotFoundError:
+                pass
+        total -= size
+        removed += 1
+    return removed
+
+def render(source: bytes, width: int, quality: int, fmt: str) -> bytes:
+    image = open_image(source)
+    if width and width < image.width:
+        image = image.resize((width, max(1, round(image.height * width / image.width))), Image.LANCZOS)
+    if fmt == 'jpeg' and image.mode != 'RGB':
+        image = image.convert('RGB')
+    buffer = io.BytesIO()
+    image.save(buffer, fmt.upper(), quality=quality)
+    return buffer.getvalue()
+
+def get_transformed(key: str, width: int, quality: int, fmt: str) -> Optional[Tuple[bytes, str]]:
+    '''Вариант из дискового кэша или сгенерированный один раз на все параллельные запросы'''
+    path = cache_path(key, width, quality, fmt)
+    cached = read_cached(path)
+    if cached is not None:
+        return cached, CONTENT_TYPES[fmt]
+    
+    with single_flight(path):
+        cached = read_cached(path)
+        if cached is not None:
+            return cached, CONTENT_TYPES[fmt]
+        
+        source = get_storage().get(key)
+        if source is None:
+            return None
+        
+        data = render(source, width, quality, fmt)
+        tmp_path = f"{path}.tmp{os.getpid()}.{threading.get_ident()}"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    
+    evict()
+    return data, CONTENT_TYPES[fmt]
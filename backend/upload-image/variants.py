@@ -0,0 +1,155 @@
+import base64
+import io
+import json
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Any, List, Optional, Union
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    Image = None
+
+from storage import get_storage, public_url
+
+VARIANT_WIDTHS = (320, 640, 1280)
+VARIANT_QUALITY = {'webp': 80, 'avif': 60}
+PLACEHOLDER_WIDTH = 16
+RASTER_TYPES = {'image/jpeg', 'image/png', 'image/webp', 'image/avif'}
+
+Source = Union[str, bytes]
+
+# Пул общий для потоков пакетной загрузки, создаётся и заменяется под замком
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+def variants_supported(content_type: str) -> bool:
+    return Image is not None and content_type in RASTER_TYPES
+
+def output_formats() -> List[str]:
+    Image.init()
+    return [fmt for fmt in ('webp', 'avif') if fmt.upper() in Image.SAVE]
+
+def open_image(source: Source):
+    image = Image.open(source if isinstance(source, str) else io.BytesIO(source))
+    image = ImageOps.exif_transpose(image)
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'transparency' in image.info or image.mode in ('LA', 'P') else 'RGB')
+    return image
+
+def encode_variant(source: Source, width: int, fmt: str) -> Dict[str, Any]:
+    '''Выполняется в процессе пула: одна ширина в одном формате'''
+    image = open_image(source)
+    height = max(1, round(image.height * width / image.width))
+    resized = image.resize((width, height), Image.LANCZOS)
+    buffer = io.BytesIO()
+    resized.save(buffer, fmt.upper(), quality=VARIANT_QUALITY[fmt])
+    return {'width': width, 'height': height, 'format': fmt, 'data': buffer.getvalue()}
+
+def make_placeholder(image) -> str:
+    height = max(1, round(image.height * PLACEHOLDER_WIDTH / image.width))
+    tiny = image.resize((PLACEHOLDER_WIDTH, height), Image.BILINEAR)
+    buffer = io.BytesIO()
+    tiny.save(buffer, 'WEBP', quality=30)
+    return 'data:image/webp;base64,' + base64.b64encode(buffer.getvalue()).decode('ascii')
+
+def get_pool() -> Optional[ProcessPoolExecutor]:
+    '''Пул процессов переживает вызовы тёплого инстанса; если процессы недоступны - кодируем в текущем'''
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            try:
+                _pool = ProcessPoolExecutor(max_workers=max(1, min(4, os.cpu_count() or 1)))
+            except (OSError, NotImplementedError):
+                return None
+        return _pool
+
+def discard_pool(pool: ProcessPoolExecutor) -> None:
+    '''Сломанный пул (упал процесс) больше не принимает задачи - следующий get_pool создаст новый'''
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+def encode_all(source: Source, widths: List[int], formats: List[str]) -> List[Dict[str, Any]]:
+    tasks = [(width, fmt) for width in widths for fmt in formats]
+    # Вторая попытка - в новом пуле; в текущем процессе не кодируем: то, что уронило
+    # воркер (например, битый файл), уронило бы и сам инстанс
+    for _ in range(2):
+        pool = get_pool()
+        if pool is None:
+            break
+        try:
+            futures = [pool.submit(encode_variant, source, width, fmt) for width, fmt in tasks]
+            return [future.result() for future in futures]
+        except BrokenProcessPool:
+            discard_pool(pool)
+        except (OSError, RuntimeError):
+            break
+    else:
+        raise RuntimeError('Variant worker pool failed')
+    return [encode_variant(source, width, fmt) for width, fmt in tasks]
+
+def variant_key(file_hash: str, width: int, fmt: str) -> str:
+    return f"{file_hash[:2]}/{file_hash}_w{width}.{fmt}"
+
+def ensure_variants(conn, record: Dict[str, Any], source: Source) -> Dict[str, Any]:
+    '''Строит уменьшенные копии, если их ещё нет, и сохраняет манифест в media_objects'''
+    if record.get('variants') is not None or not variants_supported(record['content_type']):
+        return record
+    
+    image = open_image(source)
+    width, height = image.size
+    placeholder = make_placeholder(image)
+    widths = [w for w in VARIANT_WIDTHS if w < width]
+    
+    storage = get_storage()
+    variants = []
+    for variant in encode_all(source, widths, output_formats()):
+        key = variant_key(record['hash'], variant['width'], variant['format'])
+        storage.put(key, variant['data'], f"image/{variant['format']}")
+        variants.append({
+            'key': key,
+            'width': variant['width'],
+            'height': variant['height'],
+            'format': variant['format'],
+            'size': len(variant['data'])
+        })
+    
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            UPDATE media_objects
+            SET width = %s, height = %s, placeholder = %s, variants = %s
+            WHERE hash = %s
+            RETURNING *
+            """,
+            (width, height, placeholder, json.dumps(variants), record['hash'])
+        )
+        updated = cur.fetchone()
+        conn.commit()
+    return dict(updated)
+
+def build_manifest(record: Dict[str, Any]) -> Dict[str, Any]:
+    '''Манифест для <picture>/srcset: исходник, копии по форматам и заглушка'''
+    variants = record.get('variants') or []
+    srcset: Dict[str, List[str]] = {}
+    for variant in sorted(variants, key=lambda v: v['width']):
+        srcset.setdefault(variant['format'], []).append(f"{public_url(variant['key'])} {variant['width']}w")
+    if record.get('width'):
+        srcset.setdefault('original', []).append(f"{public_url(record['key'])} {record['width']}w")
+    
+    return {
+        'url': public_url(record['key']),
+        'width': record.get('width'),
+        'height': record.get('height'),
+        'placeholder': record.get('placeholder'),
+        'variants': [
+            {'url': public_url(v['key']), 'width': v['width'], 'height': v['height'], 'format': v['format']}
+            for v in variants
+        ],
+        'srcset': {fmt: ', '.join(entries) for fmt, entries in srcset.items()}
+    }
@@ -0,0 +1,118 @@
+'''
+Пропускная способность одного инстанса: синхронные handler-ы (psycopg2,
+requests) против index_async.py (asyncpg, httpx) при одинаковой конкурентности.
+
+Запуск: [DATABASE_URL=postgres://...] python benchmarks/async_handlers.py [requests] [concurrency]
+
+Для каждого сценария печатает rps трёх режимов:
+  sync x1  - по одному запросу за раз, как инстанс платформы;
+  sync xC  - синхронный handler в C потоках;
+  async xC - async handler, C корутин в одном event loop.
+Каждый запрос получает уникальный query-параметр, чтобы single-flight не
+схлопывал их (иначе меряется схлопывание, а не I/O). notifications шлёт в
+локальную заглушку провайдера с задержкой PROVIDER_LATENCY_MS (по умолчанию 50),
+поэтому работает и без базы; остальные сценарии требуют DATABASE_URL.
+'''
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from host.loader import load_function, namespace
+
+PROVIDER_LATENCY = int(os.environ.get('PROVIDER_LATENCY_MS', 50)) / 1000
+
+class ProviderStub(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        time.sleep(PROVIDER_LATENCY)
+        self.send_response(200)
+        self.send_header('Content-Length', '2')
+        self.end_headers()
+        self.wfile.write(b'ok')
+    
+    def log_message(self, format, *args):
+        pass
+
+def start_provider() -> str:
+    server = ThreadingHTTPServer(('127.0.0.1', 0), ProviderStub)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f'http://127.0.0.1:{server.server_address[1]}/send'
+
+def scenarios(provider_url: str) -> list:
+    notification = json.dumps({
+        'type': 'application',
+        'data': {'id': 1, 'number': 'APP-1', 'items': [{'title': 'Покос', 'qty': 1, 'price': 1500, 'total': 1500}]},
+        'settings': {
+            'whatsapp_enabled': True,
+            'whatsapp_api_url': provider_url,
+            'whatsapp_api_token': 'bench',
+            'whatsapp_phone_ids': ['1', '2']
+        }
+    })
+    return [
+        ('settings GET', 'settings', lambda i: {'httpMethod': 'GET', 'path': '/', 'queryStringParameters': {'n': str(i)}}),
+        ('cms services', 'cms', lambda i: {'httpMethod': 'GET', 'path': '/services', 'queryStringParameters': {'visible': 'true', 'n': str(i)}}),
+        ('applications', 'applications', lambda i: {'httpMethod': 'GET', 'pathParams': {}, 'queryStringParameters': {'days': '30', 'n': str(i)}}),
+        ('notifications', 'notifications', lambda i: {'httpMethod': 'POST', 'body': notification})
+    ]
+
+def run_sync(handler, make_event, requests: int, concurrency: int) -> float:
+    started = time.perf_counter()
+    if concurrency == 1:
+        for i in range(requests):
+            handler(make_event(i), None)
+    else:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            list(pool.map(lambda i: handler(make_event(i), None), range(requests)))
+    return requests / (time.perf_counter() - started)
+
+def run_async(handler, make_event, requests: int, concurrency: int) -> float:
+    async def main() -> float:
+        semaphore = asyncio.Semaphore(concurrency)
+        
+        async def one(i: int):
+            async with semaphore:
+                return await handler(make_event(i), None)
+        
+        # Прогрев: пул соединений и клиент создаются вне замера
+        await one(-1)
+        started = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(requests)))
+        return requests / (time.perf_counter() - started)
+    
+    return asyncio.run(main())
+
+def main() -> None:
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 32
+    os.environ.setdefault('ASYNC_DB_POOL_MAX', str(concurrency))
+    has_db = bool(os.environ.get('DATABASE_URL'))
+    provider_url = start_provider()
+    
+    print(f'{requests} requests, concurrency {concurrency}')
+    print(f"{'scenario':>14} {'sync x1':>10} {'sync xC':>10} {'async xC':>10}")
+    for label, name, make_event in scenarios(provider_url):
+        if name != 'notifications' and not has_db:
+            print(f'{label:>14}  skipped: DATABASE_URL is not set')
+            continue
+        
+        async_handler = load_function(name, entry='index_async')
+        sync_handler = sys.modules[f'{namespace(name)}.index'].handler
+        
+        serial = run_sync(sync_handler, make_event, max(requests // 10, 10), 1)
+        threaded = run_sync(sync_handler, make_event, requests, concurrency)
+        evented = run_async(async_handler, make_event, requests, concurrency)
+        print(f'{label:>14} {serial:>10.1f} {threaded:>10.1f} {evented:>10.1f}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+'''
+Списки из 1000 строк: сериализация в Python (RealDictCursor -> dict ->
+json.dumps(default=str), как в обработчиках) против готового JSON от
+Postgres (json_agg, ?render=db).
+
+Запуск: DATABASE_URL=postgres://... python benchmarks/db_json_lists.py [rows] [repeats]
+
+Данные создаются во временной таблице с колонками как у applications.
+Печатает wall time, CPU процесса (time.process_time) и пик аллокаций
+Python (tracemalloc) на один список.
+'''
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+import psycopg2
+from psycopg2.extras import RealDictCursor
+
+SETUP = '''
+CREATE TEMP TABLE bench_applications AS
+SELECT
+    i AS id,
+    'APP-' || lpad(i::text, 8, '0') AS application_number,
+    'Клиент ' || i AS customer_name,
+    '+7900' || lpad(i::text, 7, '0') AS customer_phone,
+    'Адрес, дом ' || i AS address,
+    'new' AS status,
+    (random() * 100000)::numeric(10, 2) AS total_amount,
+    jsonb_build_array(
+        jsonb_build_object('title', 'Покос травы', 'quantity', 2, 'price', 1500),
+        jsonb_build_object('title', 'Обрезка деревьев', 'quantity', 1, 'price', 3000)
+    ) AS items,
+    now() - (i || ' minutes')::interval AS created_at,
+    now() AS updated_at
+FROM generate_series(1, %s) AS i
+'''
+
+QUERY = 'SELECT * FROM bench_applications'
+
+def python_render(conn) -> str:
+    with conn.cursor(cursor_factory=RealDictCursor) as cur:
+        cur.execute(QUERY + ' ORDER BY created_at DESC')
+        return json.dumps([dict(row) for row in cur.fetchall()], default=str)
+
+def db_render(conn) -> str:
+    with conn.cursor(cursor_factory=RealDictCursor) as cur:
+        cur.execute(
+            f"SELECT COALESCE(json_agg(t ORDER BY t.created_at DESC), '[]'::json)::text AS body FROM ({QUERY}) t"
+        )
+        return cur.fetchone()['body']
+
+def measure(conn, render, repeats: int) -> dict:
+    render(conn)
+    
+    wall = cpu = 0.0
+    peak = 0
+    size = 0
+    for _ in range(repeats):
+        tracemalloc.start()
+        wall_started, cpu_started = time.perf_counter(), time.process_time()
+        body = render(conn)
+        wall += time.perf_counter() - wall_started
+        cpu += time.process_time() - cpu_started
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+        size = len(body)
+    
+    return {
+        'wall_ms': wall / repeats * 1000,
+        'cpu_ms': cpu / repeats * 1000,
+        'peak_kb': peak / 1024,
+        'body_kb': size / 1024
+    }
+
+def main() -> None:
+    dsn = os.environ.get('DATABASE_URL')
+    if not dsn:
+        sys.exit('DATABASE_URL is required')
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    
+    conn = psycopg2.connect(dsn)
+    with conn.cursor() as cur:
+        cur.execute(SETUP, (rows,))
+    
+    print(f'{rows} rows, {repeats} repeats')
+    for label, render in [('python', python_render), ('json_agg', db_render)]:
+        result = measure(conn, render, repeats)
+        print(
+            f"{label:>8}: wall {result['wall_ms']:.2f} ms, cpu {result['cpu_ms']:.2f} ms, "
+            f"peak alloc {result['peak_kb']:.0f} KB, body {result['body_kb']:.0f} KB"
+        )
+    
+    conn.close()
+
+if __name__ == '__main__':
+    main()
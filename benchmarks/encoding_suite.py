@@ -0,0 +1,106 @@
+'''
+Бенчмарк JSON-энкодера ответов на типичных payload-ах эндпоинтов.
+
+Запуск: python benchmarks/encoding_suite.py [repeats]
+
+Сравнивает прежний способ (json.dumps(default=str) + encode) с общим
+encoding.dumps на stdlib и на orjson (если установлен). База не нужна:
+payload-ы собираются синтетически по форме реальных ответов.
+'''
+import json
+import os
+import sys
+import timeit
+from datetime import datetime, timedelta
+from decimal import Decimal
+from uuid import uuid4
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend', 'settings'))
+import encoding  # noqa: E402
+
+NOW = datetime(2026, 5, 1, 12, 0, 0)
+
+def service(i: int) -> dict:
+    return {
+        'id': i, 'title': f'Услуга {i}', 'slug': f'service-{i}',
+        'short_desc': 'Покос травы и уход за газоном', 'description': 'Описание услуги. ' * 20,
+        'price': Decimal('1500.00') + i, 'unit': 'сотка', 'visible': True, 'sort_order': i,
+        'images': [f'https://cdn.example.com/ab/{uuid4().hex}{uuid4().hex}.webp' for _ in range(3)],
+        'created_at': NOW - timedelta(days=i), 'updated_at': NOW, 'removed_at': None
+    }
+
+def application(i: int) -> dict:
+    return {
+        'id': i, 'application_number': f'APP-{i:08d}', 'customer_name': f'Клиент {i}',
+        'customer_phone': f'+7900{i:07d}', 'customer_email': f'client{i}@example.com',
+        'address': f'Посёлок Садовый, ул. Лесная, д. {i}', 'status': 'new',
+        'total_amount': Decimal('4500.50'), 'client_total_amount': Decimal('4500.50'),
+        'items': [{'service_id': 1, 'title': 'Покос травы', 'quantity': 2, 'price': 1500}],
+        'price_mismatches': None, 'created_at': NOW - timedelta(minutes=i), 'updated_at': NOW
+    }
+
+def order(i: int) -> dict:
+    return {
+        'id': i, 'order_number': f'ORD-{i:08d}', 'application_id': i, 'status': 'in_progress',
+        'customer_name': f'Клиент {i}', 'customer_phone': f'+7900{i:07d}',
+        'total_amount': Decimal('12000'), 'scheduled_date': (NOW + timedelta(days=i % 30)).date(),
+        'created_at': NOW - timedelta(hours=i), 'updated_at': NOW
+    }
+
+def review(i: int) -> dict:
+    return {
+        'id': i, 'name': f'Автор {i}', 'rating': 5 - i % 3, 'text': 'Всё сделали быстро и аккуратно. ' * 5,
+        'photos': [], 'created_at': (NOW - timedelta(days=i)).isoformat()
+    }
+
+PAYLOADS = {
+    'settings bootstrap': {
+        'siteSettings': {'id': 1, 'site_name': 'Сад', 'colors': {'primary': '#2f855a'}, 'updated_at': NOW},
+        'homepage': {'id': 1, 'hero_title': 'Уход за садом', 'blocks': [{'type': 'text', 'body': 'x' * 500}] * 10, 'updated_at': NOW},
+        'contacts': {'id': 1, 'phones': ['+79000000000'], 'socials': {'vk': 'https://vk.com/x'}, 'updated_at': NOW},
+        'services': [service(i) for i in range(40)],
+        'reviews': [review(i) for i in range(200)],
+        'team': [{'id': i, 'name': f'Сотрудник {i}', 'photo': 'https://cdn/x.webp', 'created_at': NOW} for i in range(12)],
+        'posts': [{'id': i, 'title': f'Пост {i}', 'body': 'Текст. ' * 200, 'published_at': NOW} for i in range(30)]
+    },
+    'cms services list': {'items': [service(i) for i in range(100)], 'total': 100},
+    'applications list (1k)': [application(i) for i in range(1000)],
+    'orders list (1k)': [order(i) for i in range(1000)],
+    'reviews public feed': {
+        'reviews': [review(i) for i in range(20)], 'next_cursor': 'MjAyNi0wNS0wMVQxMjowMDowMHwy',
+        'summary': {'count': 230, 'average': 4.61, 'histogram': {'1': 3, '2': 2, '3': 10, '4': 40, '5': 175}}
+    },
+    'upload manifest': {
+        'key': 'ab/' + 'a' * 64 + '.jpg', 'width': 4000, 'height': 3000, 'placeholder': 'data:image/webp;base64,' + 'A' * 200,
+        'variants': {fmt: [{'width': w, 'url': f'https://cdn/ab/x_w{w}.{fmt}'} for w in (320, 640, 1280)] for fmt in ('webp', 'avif')}
+    }
+}
+
+def legacy(payload) -> bytes:
+    return json.dumps(payload, default=str).encode('utf-8')
+
+def shared_stdlib(payload) -> bytes:
+    backend, encoding.orjson = encoding.orjson, None
+    try:
+        return encoding.dumps(payload)
+    finally:
+        encoding.orjson = backend
+
+def main() -> None:
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    variants = [('legacy json.dumps(default=str)', legacy), ('encoding.dumps stdlib', shared_stdlib)]
+    if encoding.orjson is not None:
+        variants.append(('encoding.dumps orjson', encoding.dumps))
+    else:
+        print('orjson is not installed: only the stdlib backend is measured')
+    
+    for name, payload in PAYLOADS.items():
+        print(f'{name} ({len(legacy(payload)) // 1024} KB)')
+        baseline = None
+        for label, encode in variants:
+            seconds = min(timeit.repeat(lambda: encode(payload), number=repeats, repeat=3)) / repeats
+            baseline = baseline or seconds
+            print(f'  {label:>32}: {seconds * 1000:8.3f} ms  x{baseline / seconds:.1f}')
+
+if __name__ == '__main__':
+    main()
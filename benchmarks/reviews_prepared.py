@@ -0,0 +1,72 @@
+'''
+Микробенчмарк reviews: стоимость планирования запроса при интерполяции
+строк (как было) и при серверных prepared statements (как стало).
+
+Запуск: DATABASE_URL=postgres://... python benchmarks/reviews_prepared.py [iterations]
+
+Для каждого варианта печатает среднее время вызова на клиенте и среднее
+Planning Time из EXPLAIN (ANALYZE) - у EXECUTE после прогрева план
+берётся из кэша, и планирование почти исчезает.
+'''
+import os
+import re
+import sys
+import time
+
+import psycopg2
+
+COLUMNS = 'id, name, email, phone, rating, text, photos, status, created_at'
+PLANNING = re.compile(r'Planning Time: ([\d.]+) ms')
+
+def interpolated(cur, status: str) -> str:
+    return f"SELECT {COLUMNS} FROM reviews WHERE status = '{status}' ORDER BY created_at DESC"
+
+def prepared(cur, status: str) -> str:
+    return cur.mogrify('EXECUTE bench_reviews_by_status (%s)', (status,)).decode()
+
+def planning_ms(cur, sql: str) -> float:
+    cur.execute(f'EXPLAIN (ANALYZE, SUMMARY) {sql}')
+    for (line,) in cur.fetchall():
+        match = PLANNING.search(line)
+        if match:
+            return float(match.group(1))
+    return 0.0
+
+def run(cur, build, iterations: int) -> dict:
+    statuses = ['approved', 'pending', 'rejected']
+    
+    started = time.perf_counter()
+    for i in range(iterations):
+        cur.execute(build(cur, statuses[i % 3]))
+        cur.fetchall()
+    elapsed = time.perf_counter() - started
+    
+    samples = [planning_ms(cur, build(cur, statuses[i % 3])) for i in range(min(iterations, 200))]
+    return {
+        'per_query_ms': elapsed / iterations * 1000,
+        'planning_ms': sum(samples) / len(samples)
+    }
+
+def main() -> None:
+    dsn = os.environ.get('DATABASE_URL')
+    if not dsn:
+        sys.exit('DATABASE_URL is required')
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    
+    conn = psycopg2.connect(dsn)
+    conn.autocommit = True
+    cur = conn.cursor()
+    cur.execute(
+        f'PREPARE bench_reviews_by_status(text) AS '
+        f'SELECT {COLUMNS} FROM reviews WHERE status = $1 ORDER BY created_at DESC'
+    )
+    
+    for label, build in [('interpolated', interpolated), ('prepared', prepared)]:
+        result = run(cur, build, iterations)
+        print(f"{label:>12}: {result['per_query_ms']:.3f} ms/query, planning {result['planning_ms']:.3f} ms")
+    
+    cur.execute('DEALLOCATE bench_reviews_by_status')
+    conn.close()
+
+if __name__ == '__main__':
+    main()
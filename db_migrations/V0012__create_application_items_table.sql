@@ -0,0 +1,32 @@
+-- Нормализованная проекция позиций заявок для аналитики по услугам
+CREATE TABLE IF NOT EXISTS application_items (
+  id SERIAL PRIMARY KEY,
+  application_id INTEGER NOT NULL,
+  service_id INTEGER,
+  title VARCHAR(255) NOT NULL DEFAULT '',
+  qty NUMERIC(10, 2) NOT NULL DEFAULT 1,
+  price DECIMAL(10, 2) NOT NULL DEFAULT 0,
+  total DECIMAL(10, 2) NOT NULL DEFAULT 0,
+  created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_application_items_application_id ON application_items(application_id);
+CREATE INDEX IF NOT EXISTS idx_application_items_created_at ON application_items(created_at, service_id);
+
+-- Заполняем проекцию по уже существующим заявкам
+INSERT INTO application_items (application_id, service_id, title, qty, price, total, created_at)
+SELECT
+  a.id,
+  NULLIF(NULLIF(item->>'service_id', ''), '0')::integer,
+  LEFT(COALESCE(item->>'title', ''), 255),
+  COALESCE(NULLIF(item->>'qty', '')::numeric, 1),
+  COALESCE(NULLIF(item->>'price', '')::numeric, 0),
+  COALESCE(NULLIF(item->>'total', '')::numeric, 0),
+  COALESCE(a.created_at, CURRENT_TIMESTAMP)
+FROM applications a
+CROSS JOIN LATERAL jsonb_array_elements(
+  CASE WHEN jsonb_typeof(a.items::jsonb) = 'array' THEN a.items::jsonb ELSE '[]'::jsonb END
+) AS item;
+
+CREATE INDEX IF NOT EXISTS idx_applications_created_at ON applications(created_at);
+CREATE INDEX IF NOT EXISTS idx_orders_from_application_id ON orders(from_application_id);
@@ -0,0 +1,32 @@
+-- Версии контента: счётчик увеличивается при любой записи в таблицу,
+-- функции сверяют его со своей копией данных в памяти
+CREATE TABLE IF NOT EXISTS content_versions (
+  name VARCHAR(64) PRIMARY KEY,
+  version BIGINT NOT NULL DEFAULT 0,
+  updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE OR REPLACE FUNCTION bump_content_version() RETURNS trigger AS $$
+BEGIN
+  INSERT INTO content_versions (name, version, updated_at)
+  VALUES (TG_ARGV[0], 1, CURRENT_TIMESTAMP)
+  ON CONFLICT (name) DO UPDATE
+    SET version = content_versions.version + 1,
+        updated_at = CURRENT_TIMESTAMP;
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+INSERT INTO content_versions (name) VALUES ('services') ON CONFLICT (name) DO NOTHING;
+
+DROP TRIGGER IF EXISTS trg_services_content_version ON services;
+CREATE TRIGGER trg_services_content_version
+  AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON services
+  FOR EACH STATEMENT EXECUTE FUNCTION bump_content_version('services');
+
+-- Результат серверной проверки цен в заявке
+ALTER TABLE applications ADD COLUMN IF NOT EXISTS client_total_amount DECIMAL(10, 2);
+ALTER TABLE applications ADD COLUMN IF NOT EXISTS price_mismatches JSONB;
+
+CREATE INDEX IF NOT EXISTS idx_applications_price_mismatch
+  ON applications(created_at) WHERE price_mismatches IS NOT NULL;
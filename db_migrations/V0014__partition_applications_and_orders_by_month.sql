@@ -0,0 +1,150 @@
+-- Помесячное декларативное партиционирование applications и orders по created_at
+
+-- Создаёт недостающие месячные партиции в диапазоне [-months_back; +months_ahead] от текущего месяца.
+-- Если строки нужного месяца уже попали в DEFAULT-партицию, они переносятся в новую.
+CREATE OR REPLACE FUNCTION ensure_monthly_partitions(parent TEXT, months_back INTEGER, months_ahead INTEGER)
+RETURNS INTEGER AS $$
+DECLARE
+  month_start DATE;
+  month_end DATE;
+  partition_name TEXT;
+  created INTEGER := 0;
+BEGIN
+  FOR i IN -months_back..months_ahead LOOP
+    month_start := (date_trunc('month', CURRENT_DATE) + make_interval(months => i))::date;
+    month_end := (month_start + INTERVAL '1 month')::date;
+    partition_name := format('%s_p%s', parent, to_char(month_start, 'YYYYMM'));
+
+    IF to_regclass(partition_name) IS NULL THEN
+      EXECUTE format('CREATE TABLE %I (LIKE %I INCLUDING DEFAULTS INCLUDING CONSTRAINTS)', partition_name, parent);
+      EXECUTE format(
+        'WITH moved AS (DELETE FROM %I WHERE created_at >= %L AND created_at < %L RETURNING *) INSERT INTO %I SELECT * FROM moved',
+        parent || '_default', month_start, month_end, partition_name
+      );
+      EXECUTE format(
+        'ALTER TABLE %I ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+        parent, partition_name, month_start, month_end
+      );
+      created := created + 1;
+    END IF;
+  END LOOP;
+  RETURN created;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Однократное преобразование обычной таблицы в партиционированную с сохранением данных и sequence
+CREATE OR REPLACE FUNCTION convert_to_monthly_partitions(tbl TEXT) RETURNS VOID AS $$
+DECLARE
+  legacy TEXT := tbl || '_unpartitioned';
+  id_sequence TEXT;
+  first_month DATE;
+  dependents TEXT;
+BEGIN
+  -- После преобразования первичный ключ (id, created_at): внешний ключ на один id
+  -- пересоздать нельзя, поэтому при ссылающихся таблицах миграция останавливается
+  SELECT string_agg(format('%s.%s', c.conrelid::regclass, c.conname), ', ')
+    INTO dependents
+  FROM pg_constraint c
+  WHERE c.contype = 'f' AND c.confrelid = to_regclass(tbl);
+
+  IF dependents IS NOT NULL THEN
+    RAISE EXCEPTION 'Cannot partition %: referenced by foreign keys %', tbl, dependents
+      USING HINT = 'Drop or rework these constraints first: a foreign key cannot reference id alone once the primary key is (id, created_at)';
+  END IF;
+
+  id_sequence := pg_get_serial_sequence(tbl, 'id');
+
+  EXECUTE format('ALTER TABLE %I RENAME TO %I', tbl, legacy);
+  EXECUTE format('UPDATE %I SET created_at = CURRENT_TIMESTAMP WHERE created_at IS NULL', legacy);
+
+  EXECUTE format(
+    'CREATE TABLE %I (LIKE %I INCLUDING DEFAULTS INCLUDING CONSTRAINTS) PARTITION BY RANGE (created_at)',
+    tbl, legacy
+  );
+  EXECUTE format('ALTER TABLE %I ALTER COLUMN created_at SET NOT NULL', tbl);
+  EXECUTE format('ALTER TABLE %I ALTER COLUMN created_at SET DEFAULT CURRENT_TIMESTAMP', tbl);
+  EXECUTE format('ALTER TABLE %I ADD PRIMARY KEY (id, created_at)', tbl);
+  EXECUTE format('CREATE TABLE %I PARTITION OF %I DEFAULT', tbl || '_default', tbl);
+
+  EXECUTE format('SELECT date_trunc(''month'', MIN(created_at))::date FROM %I', legacy) INTO first_month;
+  PERFORM ensure_monthly_partitions(
+    tbl,
+    COALESCE((EXTRACT(YEAR FROM age(date_trunc('month', CURRENT_DATE), first_month)) * 12
+              + EXTRACT(MONTH FROM age(date_trunc('month', CURRENT_DATE), first_month)))::integer, 0),
+    3
+  );
+
+  EXECUTE format('INSERT INTO %I SELECT * FROM %I', tbl, legacy);
+
+  IF id_sequence IS NOT NULL THEN
+    EXECUTE format('ALTER SEQUENCE %s OWNED BY %I.id', id_sequence, tbl);
+  END IF;
+  -- Без CASCADE: оставшиеся зависимости (представления и т.п.) откатят миграцию, а не исчезнут молча
+  EXECUTE format('DROP TABLE %I', legacy);
+END;
+$$ LANGUAGE plpgsql;
+
+SELECT convert_to_monthly_partitions('applications');
+SELECT convert_to_monthly_partitions('orders');
+DROP FUNCTION convert_to_monthly_partitions(TEXT);
+
+CREATE INDEX IF NOT EXISTS idx_applications_created_at ON applications(created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_applications_status_created_at ON applications(status, created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_applications_number ON applications(number);
+CREATE INDEX IF NOT EXISTS idx_applications_price_mismatch
+  ON applications(created_at) WHERE price_mismatches IS NOT NULL;
+
+CREATE INDEX IF NOT EXISTS idx_orders_created_at ON orders(created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_orders_status_created_at ON orders(status, created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_orders_number ON orders(number);
+CREATE INDEX IF NOT EXISTS idx_orders_from_application_id ON orders(from_application_id);
+
+-- Архив отсоединённых партиций: одна строка на месяц, все записи месяца в одном
+-- jsonb-значении, которое Postgres хранит в TOAST в сжатом виде
+CREATE TABLE IF NOT EXISTS archived_partitions (
+  id SERIAL PRIMARY KEY,
+  parent_table VARCHAR(64) NOT NULL,
+  partition_name VARCHAR(128) NOT NULL UNIQUE,
+  month DATE NOT NULL,
+  row_count INTEGER NOT NULL,
+  rows JSONB NOT NULL,
+  archived_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_archived_partitions_parent_month ON archived_partitions(parent_table, month);
+
+-- Отсоединяет месячные партиции старше keep_months, упаковывает их в archived_partitions и удаляет
+CREATE OR REPLACE FUNCTION archive_monthly_partitions(parent TEXT, keep_months INTEGER)
+RETURNS TABLE (archived_partition TEXT, archived_rows INTEGER) AS $$
+DECLARE
+  cutoff DATE := (date_trunc('month', CURRENT_DATE) - make_interval(months => keep_months))::date;
+  part RECORD;
+  partition_month DATE;
+  packed_rows INTEGER;
+BEGIN
+  FOR part IN
+    SELECT c.relname
+    FROM pg_inherits i
+    JOIN pg_class c ON c.oid = i.inhrelid
+    WHERE i.inhparent = to_regclass(parent)
+      AND c.relname ~ ('^' || parent || '_p[0-9]{6}$')
+    ORDER BY c.relname
+  LOOP
+    partition_month := to_date(right(part.relname, 6), 'YYYYMM');
+    CONTINUE WHEN partition_month >= cutoff;
+
+    EXECUTE format('ALTER TABLE %I DETACH PARTITION %I', parent, part.relname);
+    EXECUTE format(
+      'INSERT INTO archived_partitions (parent_table, partition_name, month, row_count, rows)
+       SELECT %L, %L, %L, COUNT(*), COALESCE(jsonb_agg(to_jsonb(t) ORDER BY t.created_at), ''[]''::jsonb) FROM %I t
+       RETURNING row_count',
+      parent, part.relname, partition_month, part.relname
+    ) INTO packed_rows;
+    EXECUTE format('DROP TABLE %I', part.relname);
+
+    archived_partition := part.relname;
+    archived_rows := packed_rows;
+    RETURN NEXT;
+  END LOOP;
+END;
+$$ LANGUAGE plpgsql;
@@ -0,0 +1,22 @@
+-- Нормализованный телефон клиента (только цифры, российские номера приводятся к 7XXXXXXXXXX)
+CREATE OR REPLACE FUNCTION normalize_phone(phone TEXT) RETURNS TEXT AS $$
+  SELECT CASE
+    WHEN length(d) = 11 AND left(d, 1) = '8' THEN '7' || substr(d, 2)
+    WHEN length(d) = 10 THEN '7' || d
+    ELSE NULLIF(d, '')
+  END
+  FROM (SELECT regexp_replace(COALESCE(phone, ''), '[^0-9]', '', 'g') AS d) digits
+$$ LANGUAGE sql IMMUTABLE;
+
+ALTER TABLE applications ADD COLUMN IF NOT EXISTS customer_phone_normalized VARCHAR(20);
+ALTER TABLE orders ADD COLUMN IF NOT EXISTS customer_phone_normalized VARCHAR(20);
+
+UPDATE applications SET customer_phone_normalized = normalize_phone(customer_phone)
+WHERE customer_phone_normalized IS NULL;
+UPDATE orders SET customer_phone_normalized = normalize_phone(customer_phone)
+WHERE customer_phone_normalized IS NULL;
+
+CREATE INDEX IF NOT EXISTS idx_applications_customer_phone
+  ON applications(customer_phone_normalized, created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_orders_customer_phone
+  ON orders(customer_phone_normalized, created_at DESC);
@@ -0,0 +1,27 @@
+-- Журнал смены статусов заказов (только добавление записей)
+CREATE TABLE IF NOT EXISTS order_status_history (
+  id BIGSERIAL PRIMARY KEY,
+  order_id INTEGER NOT NULL,
+  from_status VARCHAR(50),
+  to_status VARCHAR(50) NOT NULL,
+  notes TEXT,
+  changed_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_order_status_history_order ON order_status_history(order_id, changed_at);
+CREATE INDEX IF NOT EXISTS idx_order_status_history_changed_at ON order_status_history(changed_at);
+
+CREATE OR REPLACE FUNCTION forbid_order_status_history_changes() RETURNS trigger AS $$
+BEGIN
+  RAISE EXCEPTION 'order_status_history is append-only';
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_order_status_history_append_only ON order_status_history;
+CREATE TRIGGER trg_order_status_history_append_only
+  BEFORE UPDATE OR DELETE ON order_status_history
+  FOR EACH ROW EXECUTE FUNCTION forbid_order_status_history_changes();
+
+-- Начальная точка для уже существующих заказов
+INSERT INTO order_status_history (order_id, from_status, to_status, changed_at)
+SELECT id, NULL, status, created_at FROM orders;
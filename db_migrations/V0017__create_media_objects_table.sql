@@ -0,0 +1,12 @@
+-- Индекс загруженных файлов: объект хранится один раз под ключом из sha256 содержимого
+CREATE TABLE IF NOT EXISTS media_objects (
+  hash CHAR(64) PRIMARY KEY,
+  key VARCHAR(255) NOT NULL UNIQUE,
+  content_type VARCHAR(100) NOT NULL,
+  size INTEGER NOT NULL,
+  ref_count INTEGER NOT NULL DEFAULT 0,
+  created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  last_referenced_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_media_objects_unreferenced ON media_objects(created_at) WHERE ref_count <= 0;
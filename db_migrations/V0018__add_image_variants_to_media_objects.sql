@@ -0,0 +1,5 @@
+-- Размеры, LQIP-заглушка и набор уменьшенных копий для srcset
+ALTER TABLE media_objects ADD COLUMN IF NOT EXISTS width INTEGER;
+ALTER TABLE media_objects ADD COLUMN IF NOT EXISTS height INTEGER;
+ALTER TABLE media_objects ADD COLUMN IF NOT EXISTS placeholder TEXT;
+ALTER TABLE media_objects ADD COLUMN IF NOT EXISTS variants JSONB;
@@ -0,0 +1,6 @@
+-- Состояние фоновых задач с медиа (курсор для возобновления)
+CREATE TABLE IF NOT EXISTS media_jobs (
+  name VARCHAR(64) PRIMARY KEY,
+  state JSONB NOT NULL DEFAULT '{}'::jsonb,
+  updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
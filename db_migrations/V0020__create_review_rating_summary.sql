@@ -0,0 +1,69 @@
+-- Публичная лента: только одобренные отзывы, keyset-пагинация по (created_at, id)
+CREATE INDEX IF NOT EXISTS idx_reviews_approved_feed
+  ON reviews(created_at DESC, id DESC) WHERE status = 'approved';
+
+-- Сводка рейтинга по одобренным отзывам: одна строка на количество звёзд
+CREATE TABLE IF NOT EXISTS review_rating_summary (
+  rating SMALLINT PRIMARY KEY CHECK (rating >= 1 AND rating <= 5),
+  review_count INTEGER NOT NULL DEFAULT 0
+);
+
+INSERT INTO review_rating_summary (rating, review_count)
+SELECT r, (SELECT COUNT(*) FROM reviews WHERE status = 'approved' AND rating = r)
+FROM generate_series(1, 5) AS r
+ON CONFLICT (rating) DO UPDATE SET review_count = EXCLUDED.review_count;
+
+-- Триггеры уровня оператора: дельта считается по таблицам переходов,
+-- поэтому массовое изменение статуса обновляет сводку один раз
+CREATE OR REPLACE FUNCTION apply_review_rating_delta() RETURNS trigger AS $$
+BEGIN
+  IF TG_OP = 'INSERT' THEN
+    UPDATE review_rating_summary s
+    SET review_count = s.review_count + d.delta
+    FROM (
+      SELECT rating, COUNT(*) AS delta FROM new_rows
+      WHERE status = 'approved' GROUP BY rating
+    ) d
+    WHERE s.rating = d.rating;
+  ELSIF TG_OP = 'DELETE' THEN
+    UPDATE review_rating_summary s
+    SET review_count = s.review_count - d.delta
+    FROM (
+      SELECT rating, COUNT(*) AS delta FROM old_rows
+      WHERE status = 'approved' GROUP BY rating
+    ) d
+    WHERE s.rating = d.rating;
+  ELSE
+    UPDATE review_rating_summary s
+    SET review_count = s.review_count + d.delta
+    FROM (
+      SELECT rating, SUM(delta) AS delta FROM (
+        SELECT rating, 1 AS delta FROM new_rows WHERE status = 'approved'
+        UNION ALL
+        SELECT rating, -1 AS delta FROM old_rows WHERE status = 'approved'
+      ) changes
+      GROUP BY rating
+    ) d
+    WHERE s.rating = d.rating AND d.delta <> 0;
+  END IF;
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_reviews_rating_insert ON reviews;
+CREATE TRIGGER trg_reviews_rating_insert
+  AFTER INSERT ON reviews
+  REFERENCING NEW TABLE AS new_rows
+  FOR EACH STATEMENT EXECUTE FUNCTION apply_review_rating_delta();
+
+DROP TRIGGER IF EXISTS trg_reviews_rating_update ON reviews;
+CREATE TRIGGER trg_reviews_rating_update
+  AFTER UPDATE ON reviews
+  REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+  FOR EACH STATEMENT EXECUTE FUNCTION apply_review_rating_delta();
+
+DROP TRIGGER IF EXISTS trg_reviews_rating_delete ON reviews;
+CREATE TRIGGER trg_reviews_rating_delete
+  AFTER DELETE ON reviews
+  REFERENCING OLD TABLE AS old_rows
+  FOR EACH STATEMENT EXECUTE FUNCTION apply_review_rating_delta();
@@ -0,0 +1,26 @@
+-- LSH-индекс MinHash-подписей недавних отзывов: по строке на полосу подписи
+CREATE TABLE IF NOT EXISTS review_minhash_bands (
+  band SMALLINT NOT NULL,
+  bucket BIGINT NOT NULL,
+  review_id INTEGER NOT NULL REFERENCES reviews(id) ON DELETE CASCADE,
+  created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  PRIMARY KEY (band, bucket, review_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_review_minhash_bands_created_at ON review_minhash_bands(created_at);
+CREATE INDEX IF NOT EXISTS idx_review_minhash_bands_review_id ON review_minhash_bands(review_id);
+
+-- Счётчики отправок по телефону/email в окнах фиксированной длины;
+-- скользящее окно - сумма последних нескольких строк по subject
+CREATE TABLE IF NOT EXISTS review_submission_counters (
+  subject VARCHAR(320) NOT NULL,
+  window_start TIMESTAMP NOT NULL,
+  count INTEGER NOT NULL DEFAULT 0,
+  PRIMARY KEY (subject, window_start)
+);
+
+CREATE INDEX IF NOT EXISTS idx_review_submission_counters_window ON review_submission_counters(window_start);
+
+-- Оценка похожести на недавние отзывы, видна модератору
+ALTER TABLE reviews ADD COLUMN IF NOT EXISTS spam_score REAL;
+ALTER TABLE reviews ADD COLUMN IF NOT EXISTS spam_reason TEXT;
@@ -0,0 +1,62 @@
+-- Версии контента для HTTP-кэша публичных страниц (ETag / Last-Modified / 304)
+INSERT INTO content_versions (name) VALUES ('contact_page'), ('team_members'), ('reviews_public')
+ON CONFLICT (name) DO NOTHING;
+
+DROP TRIGGER IF EXISTS trg_contact_page_content_version ON contact_page;
+CREATE TRIGGER trg_contact_page_content_version
+  AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON contact_page
+  FOR EACH STATEMENT EXECUTE FUNCTION bump_content_version('contact_page');
+
+DROP TRIGGER IF EXISTS trg_team_members_content_version ON team_members;
+CREATE TRIGGER trg_team_members_content_version
+  AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON team_members
+  FOR EACH STATEMENT EXECUTE FUNCTION bump_content_version('team_members');
+
+-- Публичная лента меняется только вместе с одобренными отзывами: версию
+-- поднимает тот же триггер, что ведёт сводку рейтинга, и только если сводка
+-- изменилась. Новые отзывы на модерации кэш не сбрасывают.
+CREATE OR REPLACE FUNCTION apply_review_rating_delta() RETURNS trigger AS $$
+DECLARE
+  changed INTEGER;
+BEGIN
+  IF TG_OP = 'INSERT' THEN
+    UPDATE review_rating_summary s
+    SET review_count = s.review_count + d.delta
+    FROM (
+      SELECT rating, COUNT(*) AS delta FROM new_rows
+      WHERE status = 'approved' GROUP BY rating
+    ) d
+    WHERE s.rating = d.rating;
+  ELSIF TG_OP = 'DELETE' THEN
+    UPDATE review_rating_summary s
+    SET review_count = s.review_count - d.delta
+    FROM (
+      SELECT rating, COUNT(*) AS delta FROM old_rows
+      WHERE status = 'approved' GROUP BY rating
+    ) d
+    WHERE s.rating = d.rating;
+  ELSE
+    UPDATE review_rating_summary s
+    SET review_count = s.review_count + d.delta
+    FROM (
+      SELECT rating, SUM(delta) AS delta FROM (
+        SELECT rating, 1 AS delta FROM new_rows WHERE status = 'approved'
+        UNION ALL
+        SELECT rating, -1 AS delta FROM old_rows WHERE status = 'approved'
+      ) changes
+      GROUP BY rating
+    ) d
+    WHERE s.rating = d.rating AND d.delta <> 0;
+  END IF;
+  
+  GET DIAGNOSTICS changed = ROW_COUNT;
+  IF changed > 0 THEN
+    INSERT INTO content_versions (name, version, updated_at)
+    VALUES ('reviews_public', 1, CURRENT_TIMESTAMP)
+    ON CONFLICT (name) DO UPDATE
+      SET version = content_versions.version + 1,
+          updated_at = CURRENT_TIMESTAMP;
+  END IF;
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
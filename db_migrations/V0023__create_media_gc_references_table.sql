@@ -0,0 +1,5 @@
+-- Снимок ссылок из контента на media_objects: строится один раз на проход GC,
+-- порции объектов сверяются с ним, а не пересканируют контентные таблицы
+CREATE TABLE IF NOT EXISTS media_gc_references (
+  hash CHAR(64) PRIMARY KEY
+);
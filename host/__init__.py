@@ -0,0 +1,10 @@
+'''
+Локальный хост для функций из backend/: все обработчики в одном процессе.
+
+Нужен для нагрузочных тестов и как долгоживущий режим развёртывания, в котором
+инстансы функций (соединения с БД, кэши, пулы) остаются тёплыми.
+
+    python -m host --port 8000 --workers 4 --threads 16
+    gunicorn -w 4 --threads 16 host.app:application
+    uvicorn host.asgi:application --workers 4     # index_async.py, где он есть
+'''
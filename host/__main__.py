@@ -0,0 +1,107 @@
+'''
+Pre-fork сервер: родитель открывает сокет, каждый воркер после fork загружает
+функции заново и обслуживает запросы пулом потоков.
+'''
+import argparse
+import os
+import signal
+import socket
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer
+
+from host.app import create_app
+
+class QuietHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+class PooledWSGIServer(WSGIServer):
+    '''WSGIServer поверх уже открытого сокета, запросы — в ограниченном пуле потоков'''
+    
+    def __init__(self, sock: socket.socket, handler_class, threads: int):
+        super().__init__(sock.getsockname(), handler_class, bind_and_activate=False)
+        self.socket.close()
+        self.socket = sock
+        host, port = sock.getsockname()[:2]
+        self.server_name = socket.getfqdn(host)
+        self.server_port = port
+        self.setup_environ()
+        self.pool = ThreadPoolExecutor(max_workers=threads)
+    
+    def process_request(self, request, client_address):
+        self.pool.submit(self.process_request_thread, request, client_address)
+    
+    def process_request_thread(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+    
+    def server_close(self):
+        super().server_close()
+        self.pool.shutdown(wait=False)
+
+def serve(sock: socket.socket, functions: Optional[List[str]], threads: int, access_log: bool) -> None:
+    server = PooledWSGIServer(sock, WSGIRequestHandler if access_log else QuietHandler, threads)
+    server.set_app(create_app(functions))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(prog='python -m host', description='Все функции backend/ в одном сервере')
+    parser.add_argument('--bind', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--workers', type=int, default=1, help='число процессов')
+    parser.add_argument('--threads', type=int, default=8, help='потоков на процесс')
+    parser.add_argument('--functions', default='', help='через запятую; по умолчанию все')
+    parser.add_argument('--access-log', action='store_true')
+    args = parser.parse_args(argv)
+    
+    functions = [n.strip() for n in args.functions.split(',') if n.strip()] or None
+    
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((args.bind, args.port))
+    sock.listen(1024)
+    print(f'Listening on http://{args.bind}:{args.port} ({args.workers} workers x {args.threads} threads)', file=sys.stderr)
+    
+    if args.workers <= 1:
+        serve(sock, functions, args.threads, args.access_log)
+        return
+    
+    children = []
+    for _ in range(args.workers):
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            serve(sock, functions, args.threads, args.access_log)
+            os._exit(0)
+        children.append(pid)
+    
+    def stop(signum, frame):
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+    
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    for pid in children:
+        try:
+            os.waitpid(pid, 0)
+        except ChildProcessError:
+            pass
+    sock.close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,186 @@
+'''
+WSGI-приложение: все функции из backend/ в одном процессе.
+
+Функция монтируется под /<имя>/ (имена как в backend/func2url.json), остаток
+пути уходит в event['path'], первый сегмент остатка — в pathParams['id'].
+Запрос переводится в event того же вида, что даёт платформа, ответ
+функции — обратно в HTTP.
+'''
+import base64
+import json
+import os
+import sys
+import threading
+import traceback
+import uuid
+from http import HTTPStatus
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import parse_qsl
+
+from host.loader import Handler, load_all
+
+MAX_BODY_BYTES = int(os.environ.get('HOST_MAX_BODY_BYTES', str(20 * 1024 * 1024)))
+
+TEXT_TYPES = ('text/', 'application/json', 'application/x-www-form-urlencoded', 'application/xml')
+
+def split_path(path_info: str) -> Tuple[str, str]:
+    name, _, rest = path_info.lstrip('/').partition('/')
+    return name, '/' + rest
+
+def path_params(path: str) -> Dict[str, str]:
+    segments = [s for s in path.split('/') if s]
+    return {'id': segments[0]} if segments else {}
+
+def request_headers(environ: Dict[str, Any]) -> Dict[str, str]:
+    headers = {}
+    for key, value in environ.items():
+        if key.startswith('HTTP_'):
+            headers['-'.join(part.capitalize() for part in key[5:].split('_'))] = value
+    if environ.get('CONTENT_TYPE'):
+        headers['Content-Type'] = environ['CONTENT_TYPE']
+    if environ.get('CONTENT_LENGTH'):
+        headers['Content-Length'] = environ['CONTENT_LENGTH']
+    return headers
+
+def encode_body(raw: bytes, content_type: str) -> Tuple[str, bool]:
+    if not raw:
+        return '', False
+    if content_type.lower().startswith(TEXT_TYPES):
+        try:
+            return raw.decode('utf-8'), False
+        except UnicodeDecodeError:
+            pass
+    return base64.b64encode(raw).decode('ascii'), True
+
+def read_body(environ: Dict[str, Any]) -> bytes:
+    try:
+        length = int(environ.get('CONTENT_LENGTH') or 0)
+    except ValueError:
+        length = 0
+    if length <= 0:
+        return b''
+    if length > MAX_BODY_BYTES:
+        raise ValueError('Request body too large')
+    return environ['wsgi.input'].read(length)
+
+def make_event(method: str, path: str, query_string: str, headers: Dict[str, str],
+               raw_body: bytes, request_id: str, source_ip: str) -> Dict[str, Any]:
+    body, is_base64 = encode_body(raw_body, headers.get('Content-Type', ''))
+    return {
+        'httpMethod': method,
+        'path': path,
+        'pathParams': path_params(path),
+        'queryStringParameters': dict(parse_qsl(query_string, keep_blank_values=True)),
+        'headers': headers,
+        'body': body,
+        'isBase64Encoded': is_base64,
+        'requestContext': {
+            'requestId': request_id,
+            'identity': {'sourceIp': source_ip}
+        }
+    }
+
+def build_event(environ: Dict[str, Any], path: str, request_id: str) -> Dict[str, Any]:
+    return make_event(
+        environ.get('REQUEST_METHOD', 'GET'), path, environ.get('QUERY_STRING', ''),
+        request_headers(environ), read_body(environ), request_id, environ.get('REMOTE_ADDR', '')
+    )
+
+def make_context(name: str, request_id: str) -> SimpleNamespace:
+    return SimpleNamespace(request_id=request_id, function_name=name, function_version='host')
+
+def status_line(code: int) -> str:
+    try:
+        return f'{code} {HTTPStatus(code).phrase}'
+    except ValueError:
+        return f'{code} Unknown'
+
+def response_body(response: Dict[str, Any]) -> bytes:
+    body = response.get('body')
+    if body is None:
+        return b''
+    if response.get('isBase64Encoded'):
+        return base64.b64decode(body)
+    if isinstance(body, bytes):
+        return body
+    if not isinstance(body, str):
+        body = json.dumps(body, ensure_ascii=False, default=str)
+    return body.encode('utf-8')
+
+def response_headers(response: Dict[str, Any], body: bytes, request_id: str) -> List[Tuple[str, str]]:
+    headers = [(key, str(value)) for key, value in (response.get('headers') or {}).items()
+               if key.lower() != 'content-length']
+    headers.append(('Content-Length', str(len(body))))
+    headers.append(('X-Request-Id', request_id))
+    return headers
+
+def error_response(code: int, payload: Any) -> Dict[str, Any]:
+    return {
+        'statusCode': code,
+        'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+        'body': json.dumps(payload, ensure_ascii=False)
+    }
+
+def json_response(start_response: Callable, code: int, payload: Any) -> List[bytes]:
+    body = response_body(error_response(code, payload))
+    start_response(status_line(code), [
+        ('Content-Type', 'application/json'),
+        ('Content-Length', str(len(body))),
+        ('Access-Control-Allow-Origin', '*')
+    ])
+    return [body]
+
+class Host:
+    '''Маршрутизирует запросы к обработчикам функций'''
+    
+    def __init__(self, handlers: Dict[str, Handler]):
+        self.handlers = handlers
+    
+    def __call__(self, environ: Dict[str, Any], start_response: Callable) -> Iterable[bytes]:
+        name, path = split_path(environ.get('PATH_INFO', '/'))
+        if not name:
+            return json_response(start_response, 200, {'functions': sorted(self.handlers)})
+        
+        handler = self.handlers.get(name)
+        if handler is None:
+            return json_response(start_response, 404, {'error': f'Unknown function: {name}'})
+        
+        request_id = uuid.uuid4().hex
+        try:
+            event = build_event(environ, path, request_id)
+        except ValueError as e:
+            return json_response(start_response, 413, {'error': str(e)})
+        
+        context = make_context(name, request_id)
+        try:
+            response = handler(event, context)
+        except Exception:
+            traceback.print_exc(file=sys.stderr)
+            return json_response(start_response, 502, {'error': f'Function {name} failed', 'request_id': request_id})
+        
+        body = response_body(response)
+        start_response(status_line(int(response.get('statusCode', 200))), response_headers(response, body, request_id))
+        return [body]
+
+def create_app(functions: Optional[List[str]] = None) -> Host:
+    return Host(load_all(functions))
+
+def _env_functions() -> Optional[List[str]]:
+    names = [n.strip() for n in os.environ.get('HOST_FUNCTIONS', '').split(',') if n.strip()]
+    return names or None
+
+_app: Optional[Host] = None
+_app_lock = threading.Lock()
+
+def application(environ: Dict[str, Any], start_response: Callable) -> Iterable[bytes]:
+    '''
+    Точка входа для внешних WSGI-серверов (gunicorn -w 4 --threads 8 host.app:application).
+    Функции загружаются лениво, уже в воркере после fork: соединения с БД не делятся.
+    '''
+    global _app
+    if _app is None:
+        with _app_lock:
+            if _app is None:
+                _app = create_app(_env_functions())
+    return _app(environ, start_response)
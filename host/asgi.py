@@ -0,0 +1,119 @@
+'''
+ASGI-приложение: как host.app, но в одном event loop.
+
+Функции с index_async.py монтируются асинхронным handler-ом (asyncpg, httpx),
+остальные - синхронным, который выполняется в пуле потоков loop-а.
+
+    uvicorn host.asgi:application --workers 4
+'''
+import asyncio
+import inspect
+import sys
+import traceback
+import uuid
+from typing import Any, Dict, List, Optional
+
+from host.app import (
+    MAX_BODY_BYTES, _env_functions, error_response, make_context, make_event,
+    response_body, response_headers, split_path
+)
+from host.loader import Handler, load_all
+
+def scope_headers(scope: Dict[str, Any]) -> Dict[str, str]:
+    headers = {}
+    for key, value in scope.get('headers', []):
+        headers['-'.join(part.capitalize() for part in key.decode('latin-1').split('-'))] = value.decode('latin-1')
+    return headers
+
+async def read_body(receive) -> bytes:
+    chunks = []
+    size = 0
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            break
+        chunk = message.get('body', b'')
+        size += len(chunk)
+        if size > MAX_BODY_BYTES:
+            raise ValueError('Request body too large')
+        chunks.append(chunk)
+        if not message.get('more_body'):
+            break
+    return b''.join(chunks)
+
+class AsyncHost:
+    '''Маршрутизирует запросы к async- и sync-обработчикам функций'''
+    
+    def __init__(self, handlers: Dict[str, Handler]):
+        self.handlers = handlers
+    
+    async def call(self, name: str, event: Dict[str, Any], request_id: str) -> Dict[str, Any]:
+        handler = self.handlers[name]
+        context = make_context(name, request_id)
+        try:
+            if inspect.iscoroutinefunction(handler):
+                return await handler(event, context)
+            return await asyncio.to_thread(handler, event, context)
+        except Exception:
+            traceback.print_exc(file=sys.stderr)
+            return error_response(502, {'error': f'Function {name} failed', 'request_id': request_id})
+    
+    async def __call__(self, scope: Dict[str, Any], receive, send) -> None:
+        if scope['type'] == 'lifespan':
+            await lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            return
+        
+        request_id = uuid.uuid4().hex
+        name, path = split_path(scope.get('path', '/'))
+        
+        if not name:
+            response = error_response(200, {'functions': sorted(self.handlers)})
+        elif name not in self.handlers:
+            response = error_response(404, {'error': f'Unknown function: {name}'})
+        else:
+            headers = scope_headers(scope)
+            try:
+                raw_body = await read_body(receive)
+            except ValueError as e:
+                response = error_response(413, {'error': str(e)})
+            else:
+                event = make_event(
+                    scope.get('method', 'GET'), path, scope.get('query_string', b'').decode('latin-1'),
+                    headers, raw_body, request_id, (scope.get('client') or ('', 0))[0]
+                )
+                response = await self.call(name, event, request_id)
+        
+        body = response_body(response)
+        await send({
+            'type': 'http.response.start',
+            'status': int(response.get('statusCode', 200)),
+            'headers': [(k.encode('latin-1'), v.encode('latin-1')) for k, v in response_headers(response, body, request_id)]
+        })
+        await send({'type': 'http.response.body', 'body': body})
+
+def create_app(functions: Optional[List[str]] = None) -> AsyncHost:
+    return AsyncHost(load_all(functions, prefer_async=True))
+
+_app: Optional[AsyncHost] = None
+
+def get_app() -> AsyncHost:
+    global _app
+    if _app is None:
+        _app = create_app(_env_functions())
+    return _app
+
+async def lifespan(receive, send) -> None:
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            get_app()
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+async def application(scope: Dict[str, Any], receive, send) -> None:
+    '''Точка входа для ASGI-серверов; функции загружаются в воркере при старте'''
+    await get_app()(scope, receive, send)
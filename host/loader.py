@@ -0,0 +1,110 @@
+'''
+Загрузка функций из backend/ в один процесс.
+
+В каждой папке свой index.py и свои одноимённые модули (encoding.py,
+httpcache.py, ...). Поэтому функция импортируется со своей папкой в начале
+sys.path, а её локальные модули после импорта переименовываются в
+sys.modules в fn_<имя>.<модуль>, чтобы следующая функция получила свои копии.
+'''
+import importlib
+import json
+import os
+import sys
+import types
+from typing import Any, Callable, Dict, List, Optional
+
+BACKEND_DIR = os.path.normpath(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+Handler = Callable[[Dict[str, Any], Any], Dict[str, Any]]
+
+def discover(backend_dir: str = BACKEND_DIR) -> List[str]:
+    return sorted(
+        name for name in os.listdir(backend_dir)
+        if os.path.isfile(os.path.join(backend_dir, name, 'index.py'))
+    )
+
+def namespace(name: str) -> str:
+    return 'fn_' + name.replace('-', '_')
+
+def local_modules(directory: str) -> Dict[str, types.ModuleType]:
+    found = {}
+    for module_name, module in list(sys.modules.items()):
+        path = getattr(module, '__file__', None)
+        if path and os.path.dirname(os.path.abspath(path)) == directory:
+            found[module_name] = module
+    return found
+
+def package(prefix: str) -> types.ModuleType:
+    if prefix not in sys.modules:
+        pkg = types.ModuleType(prefix)
+        pkg.__path__ = []
+        sys.modules[prefix] = pkg
+    return sys.modules[prefix]
+
+def rename_module(module: types.ModuleType, old_name: str, new_name: str) -> None:
+    '''
+    Переносит модуль под уникальное имя. __module__ функций и классов тоже
+    меняется: pickle (например, в ProcessPoolExecutor) ищет их по этому имени.
+    '''
+    prefix, _, short_name = new_name.rpartition('.')
+    setattr(package(prefix), short_name, module)
+    module.__name__ = new_name
+    for value in vars(module).values():
+        if isinstance(value, (types.FunctionType, type)) and getattr(value, '__module__', None) == old_name:
+            value.__module__ = new_name
+    sys.modules[new_name] = module
+    sys.modules.pop(old_name, None)
+
+def entry_module(name: str, prefer_async: bool, backend_dir: str = BACKEND_DIR) -> str:
+    '''index_async.py (async def handler), если он есть и нужен, иначе index.py'''
+    if prefer_async and os.path.isfile(os.path.join(backend_dir, name, 'index_async.py')):
+        return 'index_async'
+    return 'index'
+
+def load_function(name: str, backend_dir: str = BACKEND_DIR, entry: str = 'index') -> Handler:
+    directory = os.path.join(backend_dir, name)
+    prefix = namespace(name)
+    
+    sys.path.insert(0, directory)
+    try:
+        for module_name in [m for m in sys.modules if os.path.isfile(os.path.join(directory, m + '.py'))]:
+            sys.modules.pop(module_name)
+        return importlib.import_module(entry).handler
+    finally:
+        sys.path.remove(directory)
+        for module_name, module in local_modules(directory).items():
+            if not module_name.startswith(prefix + '.'):
+                rename_module(module, module_name, f'{prefix}.{module_name}')
+
+def unavailable(name: str, error: Exception) -> Handler:
+    message = f'Function {name} is unavailable: {type(error).__name__}: {error}'
+    
+    def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+        return {
+            'statusCode': 503,
+            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+            'body': json.dumps({'error': message}),
+            'isBase64Encoded': False
+        }
+    return handler
+
+def load_all(names: Optional[List[str]] = None, backend_dir: str = BACKEND_DIR,
+             prefer_async: bool = False) -> Dict[str, Handler]:
+    '''
+    Явно перечисленные функции обязаны загрузиться. При автопоиске функция с
+    неустановленными зависимостями монтируется заглушкой, отвечающей 503.
+    '''
+    if names:
+        return {
+            name: load_function(name, backend_dir, entry_module(name, prefer_async, backend_dir))
+            for name in names
+        }
+    
+    handlers = {}
+    for name in discover(backend_dir):
+        try:
+            handlers[name] = load_function(name, backend_dir, entry_module(name, prefer_async, backend_dir))
+        except ImportError as e:
+            print(f'[host] {name}: {e}', file=sys.stderr)
+            handlers[name] = unavailable(name, e)
+    return handlers
@@ -42,25 +42,12 @@ export const ImageUploader = ({ value, onChange, onClear }: ImageUploaderProps)
     setIsUploading(true);
     
     try {
-      const reader = new FileReader();
-      
-      const readFilePromise = new Promise<string>((resolve, reject) => {
-        reader.onload = () => resolve(reader.result as string);
-        reader.onerror = () => reject(new Error('Ошибка чтения файла'));
-        reader.readAsDataURL(file);
-      });
-      
-      const dataUrl = await readFilePromise;
+      const formData = new FormData();
+      formData.append('file', file, file.name);
       
       const response = await fetch(func2url['upload-image'], {
         method: 'POST',
-        headers: {
-          'Content-Type': 'application/json'
-        },
-        body: JSON.stringify({
-          file: dataUrl,
-          filename: file.name
-        })
+        body: formData
       });
       
       if (!response.ok) {
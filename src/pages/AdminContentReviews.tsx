@@ -3,6 +3,7 @@ import { useNavigate, Link } from "react-router-dom";
 import { Card, CardContent, CardHeader, CardTitle } from "@/components/ui/card";
 import { Button } from "@/components/ui/button";
 import { Badge } from "@/components/ui/badge";
+import { Checkbox } from "@/components/ui/checkbox";
 import Icon from "@/components/ui/icon";
 import { useAuth } from "@/contexts/AuthContext";
 import { useToast } from "@/hooks/use-toast";
@@ -18,6 +19,8 @@ interface Review {
   photos: string[];
   status: "pending" | "approved" | "rejected";
   created_at: string;
+  spam_score?: number | null;
+  spam_reason?: string | null;
 }
 
 const AdminContentReviews = () => {
@@ -27,6 +30,7 @@ const AdminContentReviews = () => {
   const [reviews, setReviews] = useState<Review[]>([]);
   const [filter, setFilter] = useState<"all" | "pending" | "approved" | "rejected">("all");
   const [loading, setLoading] = useState(true);
+  const [selected, setSelected] = useState<number[]>([]);
   const [lightboxOpen, setLightboxOpen] = useState(false);
   const [lightboxImage, setLightboxImage] = useState("");
 
@@ -134,6 +138,41 @@ const AdminContentReviews = () => {
     }
   };
 
+  const handleBulk = async (action: "approved" | "rejected" | "delete") => {
+    if (selected.length === 0) return;
+    try {
+      const response = await fetch(func2url.reviews, {
+        method: action === "delete" ? 'DELETE' : 'PUT',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify(action === "delete" ? { ids: selected } : { ids: selected, status: action })
+      });
+      
+      if (response.ok) {
+        const data = await response.json();
+        setReviews(prev =>
+          action === "delete"
+            ? prev.filter(review => !selected.includes(review.id))
+            : prev.map(review => selected.includes(review.id) ? { ...review, status: action } : review)
+        );
+        setSelected([]);
+        toast({
+          title: "Готово",
+          description: `Обработано отзывов: ${data.affected}`,
+        });
+      }
+    } catch (error) {
+      toast({
+        title: "Ошибка",
+        description: "Не удалось обработать отзывы",
+        variant: "destructive"
+      });
+    }
+  };
+
+  const toggleSelected = (id: number) => {
+    setSelected(prev => prev.includes(id) ? prev.filter(item => item !== id) : [...prev, id]);
+  };
+
   const filteredReviews = filter === "all" 
     ? reviews 
     : reviews.filter(r => r.status === filter);
@@ -189,6 +228,30 @@ const AdminContentReviews = () => {
           </Button>
         </div>
 
+        <div className="flex items-center gap-3 mb-4">
+          <Checkbox
+            checked={filteredReviews.length > 0 && filteredReviews.every(r => selected.includes(r.id))}
+            onCheckedChange={(checked) => setSelected(checked ? filteredReviews.map(r => r.id) : [])}
+          />
+          <span className="text-sm text-muted-foreground">Выбрано: {selected.length}</span>
+          {selected.length > 0 && (
+            <>
+              <Button size="sm" onClick={() => handleBulk("approved")}>
+                <Icon name="Check" size={16} className="mr-2" />
+                Одобрить
+              </Button>
+              <Button size="sm" variant="outline" onClick={() => handleBulk("rejected")}>
+                <Icon name="X" size={16} className="mr-2" />
+                Отклонить
+              </Button>
+              <Button size="sm" variant="destructive" onClick={() => handleBulk("delete")}>
+                <Icon name="Trash2" size={16} className="mr-2" />
+                Удалить
+              </Button>
+            </>
+          )}
+        </div>
+
         <div className="space-y-4">
           {filteredReviews.map((review) => (
             <Card key={review.id}>
@@ -196,6 +259,10 @@ const AdminContentReviews = () => {
                 <div className="flex items-start justify-between">
                   <div className="flex-1">
                     <div className="flex items-center gap-3 mb-2">
+                      <Checkbox
+                        checked={selected.includes(review.id)}
+                        onCheckedChange={() => toggleSelected(review.id)}
+                      />
                       <CardTitle className="text-xl">{review.name}</CardTitle>
                       <Badge
                         variant={
@@ -224,6 +291,12 @@ const AdminContentReviews = () => {
                           {review.phone}
                         </p>
                       )}
+                      {review.spam_reason && (
+                        <p className="flex items-center gap-2 text-orange-600">
+                          <Icon name="ShieldAlert" size={14} />
+                          Похож на спам: {review.spam_reason} ({Math.round((review.spam_score || 0) * 100)}%)
+                        </p>
+                      )}
                     </div>
                     <div className="flex gap-1 mb-2">
                       {[...Array(5)].map((_, i) => (
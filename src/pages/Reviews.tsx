@@ -11,15 +11,18 @@ import func2url from "../../backend/func2url.json";
 interface Review {
   id: number;
   name: string;
-  email: string;
-  phone?: string;
   rating: number;
   text: string;
   photos: string[];
-  status: string;
   created_at: string;
 }
 
+interface RatingSummary {
+  count: number;
+  average: number | null;
+  histogram: Record<string, number>;
+}
+
 const Reviews = () => {
   const { toast } = useToast();
   const [formData, setFormData] = useState({
@@ -33,6 +36,9 @@ const Reviews = () => {
   const [uploadingPhoto, setUploadingPhoto] = useState(false);
   const [reviews, setReviews] = useState<Review[]>([]);
   const [loading, setLoading] = useState(true);
+  const [summary, setSummary] = useState<RatingSummary | null>(null);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [lightboxOpen, setLightboxOpen] = useState(false);
   const [lightboxImage, setLightboxImage] = useState("");
 
@@ -42,9 +48,11 @@ const Reviews = () => {
 
   const fetchReviews = async () => {
     try {
-      const response = await fetch(`${func2url.reviews}?status=approved`);
+      const response = await fetch(`${func2url.reviews}?view=public`);
       const data = await response.json();
       setReviews(data.reviews || []);
+      setSummary(data.summary || null);
+      setNextCursor(data.next_cursor || null);
     } catch (error) {
       console.error('Error fetching reviews:', error);
     } finally {
@@ -52,6 +60,21 @@ const Reviews = () => {
     }
   };
 
+  const fetchMoreReviews = async () => {
+    if (!nextCursor) return;
+    setLoadingMore(true);
+    try {
+      const response = await fetch(`${func2url.reviews}?view=public&cursor=${encodeURIComponent(nextCursor)}`);
+      const data = await response.json();
+      setReviews(prev => [...prev, ...(data.reviews || [])]);
+      setNextCursor(data.next_cursor || null);
+    } catch (error) {
+      console.error('Error fetching reviews:', error);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const handleSubmit = async (e: React.FormEvent) => {
     e.preventDefault();
     
@@ -157,6 +180,34 @@ const Reviews = () => {
 
         <div className="grid lg:grid-cols-3 gap-8">
           <div className="lg:col-span-2 space-y-6">
+            {summary && summary.count > 0 && (
+              <Card>
+                <CardContent className="py-6 flex items-center gap-6">
+                  <div className="text-center">
+                    <p className="text-4xl font-bold">{summary.average?.toFixed(1)}</p>
+                    <p className="text-sm text-muted-foreground">{summary.count} отзывов</p>
+                  </div>
+                  <div className="flex-1 space-y-1">
+                    {[5, 4, 3, 2, 1].map((star) => {
+                      const count = summary.histogram[String(star)] || 0;
+                      return (
+                        <div key={star} className="flex items-center gap-2 text-sm">
+                          <span className="w-3">{star}</span>
+                          <Icon name="Star" size={14} className="fill-yellow-400 text-yellow-400" />
+                          <div className="flex-1 h-2 rounded bg-secondary">
+                            <div
+                              className="h-2 rounded bg-yellow-400"
+                              style={{ width: `${(count / summary.count) * 100}%` }}
+                            />
+                          </div>
+                          <span className="w-8 text-right text-muted-foreground">{count}</span>
+                        </div>
+                      );
+                    })}
+                  </div>
+                </CardContent>
+              </Card>
+            )}
             {loading ? (
               <Card>
                 <CardContent className="py-12 text-center">
@@ -219,6 +270,13 @@ const Reviews = () => {
               </Card>
               ))
             )}
+            {nextCursor && (
+              <div className="text-center">
+                <Button variant="outline" onClick={fetchMoreReviews} disabled={loadingMore}>
+                  {loadingMore ? 'Загрузка...' : 'Показать ещё'}
+                </Button>
+              </div>
+            )}
           </div>
 
           <div>